@@ -0,0 +1,178 @@
+"""
+
+Script protects the API from overload: it limits the schema sizes, bounds the number
+of diffs running and queued, and runs each diff under a cancellable deadline.
+
+"""
+# import packages
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Callable
+
+# import custom modules
+from request_cancellation import CancellationToken, RequestCancelledError, DeadlineExceededError, \
+    cancellation_scope
+
+# configuration, from the environment
+MAX_SCHEMA_BYTES = int(os.getenv('MAX_SCHEMA_BYTES', str(2 * 1024 * 1024)))
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '120'))
+MAX_CONCURRENT_DIFFS = int(os.getenv('MAX_CONCURRENT_DIFFS', '4'))
+MAX_QUEUED_DIFFS = int(os.getenv('MAX_QUEUED_DIFFS', '16'))
+QUEUE_TIMEOUT_SECONDS = float(os.getenv('QUEUE_TIMEOUT_SECONDS', '10'))
+
+# how often a running request checks whether its client disconnected
+DISCONNECT_CHECK_INTERVAL_SECONDS = 0.25
+
+
+class OverloadedError(Exception):
+    """
+    Raised when a request cannot be admitted: 429 if the queue is full,
+    503 if it waited in the queue for too long.
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SchemaTooLargeError(Exception):
+    """
+    Raised when a schema exceeds MAX_SCHEMA_BYTES.
+    """
+
+
+def check_schema_sizes(*schemas: str, max_bytes: int = MAX_SCHEMA_BYTES) -> None:
+    """
+    Check that none of the schema strings exceeds the maximum size.
+
+    Args:
+        schemas (str): The schema strings of the request.
+        max_bytes (int): The maximum size of a schema in bytes.
+
+    Raises:
+        SchemaTooLargeError: If a schema is larger than the maximum size.
+    """
+    for schema_str in schemas:
+        size = len(schema_str.encode("utf-8"))
+        if size > max_bytes:
+            raise SchemaTooLargeError(f"Schema of {size} bytes exceeds the maximum of {max_bytes} bytes")
+
+
+class AdmissionController:
+    """
+    A bounded work queue in front of the diff computations. At most max_concurrency
+    diffs run at once and at most max_queue_depth wait for a slot; further requests
+    are rejected immediately instead of slowing down everyone.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = MAX_CONCURRENT_DIFFS,
+                 max_queue_depth: int = MAX_QUEUED_DIFFS,
+                 queue_timeout_seconds: float = QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.queued = 0
+        self.counters = {
+            "admitted_total": 0,
+            "rejected_total": 0,
+            "queue_timeout_total": 0,
+            "cancelled_total": 0,
+            "deadline_exceeded_total": 0,
+        }
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold one of the diff slots for the duration of the context, queueing for it if needed.
+
+        Raises:
+            OverloadedError: If the queue is full (429), or no slot was freed in time (503).
+        """
+        if self.semaphore.locked() and self.queued >= self.max_queue_depth:
+            self.counters["rejected_total"] += 1
+            raise OverloadedError(429, f"Too many requests: {self.queued} diff(s) already queued")
+
+        if not self.semaphore.locked():
+            # a slot is free, acquiring it does not wait
+            await self.semaphore.acquire()
+        else:
+            self.queued += 1
+            try:
+                async with asyncio.timeout(self.queue_timeout_seconds):
+                    await self.semaphore.acquire()
+            except TimeoutError:
+                self.counters["queue_timeout_total"] += 1
+                raise OverloadedError(503, f"Service overloaded: no diff slot freed in {self.queue_timeout_seconds}s")
+            finally:
+                self.queued -= 1
+
+        self.active += 1
+        self.counters["admitted_total"] += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            dict: The current queue depth, running diffs and the admission counters.
+        """
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            **self.counters
+        }
+
+    async def run(self,
+                  function: Callable,
+                  *args,
+                  is_disconnected: Callable | None = None,
+                  deadline_seconds: float | None = REQUEST_DEADLINE_SECONDS):
+        """
+        Run a blocking diff function on a worker thread under a cancellation token, which is
+        cancelled when the deadline passes or the client disconnects. The function stops at
+        its next cancellation checkpoint, and its slot is only freed once it has stopped.
+
+        Args:
+            function (Callable): The blocking function to run.
+            is_disconnected (Callable | None): Coroutine function returning True once the client disconnected.
+            deadline_seconds (float | None): The deadline of the request.
+
+        Returns:
+            Any: The result of the function.
+
+        Raises:
+            RequestCancelledError: If the client disconnected.
+            DeadlineExceededError: If the deadline passed.
+        """
+        token = CancellationToken(deadline_seconds)
+
+        def run_in_scope():
+            with cancellation_scope(token):
+                return function(*args)
+
+        task = asyncio.create_task(asyncio.to_thread(run_in_scope))
+        while not task.done():
+            await asyncio.wait({task}, timeout=DISCONNECT_CHECK_INTERVAL_SECONDS)
+            if not task.done() and is_disconnected is not None and await is_disconnected():
+                token.cancel("Client disconnected")
+
+        try:
+            return task.result()
+        except DeadlineExceededError:
+            self.counters["deadline_exceeded_total"] += 1
+            logging.warning("Diff stopped: request deadline exceeded.")
+            raise
+        except RequestCancelledError:
+            self.counters["cancelled_total"] += 1
+            logging.warning("Diff stopped: request cancelled.")
+            raise
@@ -0,0 +1,211 @@
+"""
+
+Script builds a compact in-memory model of a GraphQL schema, holding only what
+the schema comparison needs, and measures its memory footprint.
+
+"""
+# import packages
+import gc
+import sys
+from types import FunctionType, MappingProxyType, ModuleType
+from graphql import GraphQLSchema, GraphQLList, GraphQLNonNull, Undefined, introspection_types, \
+    specified_directives, specified_scalar_types
+
+# shared read-only mapping for types, fields and arguments without members
+EMPTY_MAPPING = MappingProxyType({})
+
+# markers of the wrapping types in a tuple-encoded type reference
+NON_NULL = '!'
+LIST = '['
+
+
+class CompactArgument:
+    """
+    An argument of a field: its name, type reference and default value
+    (graphql's Undefined if it has none).
+    """
+    __slots__ = ("name", "type_ref", "default")
+
+    def __init__(self, name: str, type_ref: tuple, default):
+        self.name = name
+        self.type_ref = type_ref
+        self.default = default
+
+
+class CompactField:
+    """
+    A field of an object or interface type: its name, type reference and arguments.
+    """
+    __slots__ = ("name", "type_ref", "args")
+
+    def __init__(self, name: str, type_ref: tuple, args):
+        self.name = name
+        self.type_ref = type_ref
+        self.args = args
+
+    @property
+    def type_name(self) -> str:
+        """
+        The name of the field type, as get_field_type_name reports it for graphql-core fields:
+        the named type, the named type followed by '!' if it is wrapped once, or an empty
+        string if it is wrapped more than once.
+        """
+        if len(self.type_ref) == 1:
+            return self.type_ref[0]
+        elif len(self.type_ref) == 2:
+            return self.type_ref[1] + '!'
+
+        return ""
+
+
+class CompactType:
+    """
+    A named type: its name, kind (as identify_graphql_type names it), fields and enum values.
+    """
+    __slots__ = ("name", "kind", "fields", "values")
+
+    def __init__(self, name: str, kind: str, fields=EMPTY_MAPPING, values: tuple = ()):
+        self.name = name
+        self.kind = kind
+        self.fields = fields
+        self.values = values
+
+
+class CompactSchema:
+    """
+    The named types of a schema, without the built-in scalars and introspection types.
+    It provides the type_map and get_type interface compare_types relies on.
+    """
+    __slots__ = ("type_map",)
+
+    def __init__(self, type_map: dict[str, CompactType]):
+        self.type_map = type_map
+
+    def get_type(self, type_name: str) -> CompactType | None:
+        return self.type_map.get(type_name)
+
+
+def encode_type_ref(graphql_type) -> tuple:
+    """
+    Encode a (possibly wrapped) graphql-core type as a tuple of interned strings:
+    the wrapping markers from the outside in, followed by the named type.
+    For example [Int!]! is encoded as ('!', '[', '!', 'Int').
+
+    Args:
+        graphql_type: The graphql-core type.
+
+    Returns:
+        tuple: The encoded type reference.
+    """
+    markers = []
+    while isinstance(graphql_type, (GraphQLNonNull, GraphQLList)):
+        markers.append(NON_NULL if isinstance(graphql_type, GraphQLNonNull) else LIST)
+        graphql_type = graphql_type.of_type
+    markers.append(sys.intern(graphql_type.name))
+
+    return tuple(markers)
+
+
+def compact_schema(schema: GraphQLSchema) -> CompactSchema:
+    """
+    Build the compact model of a parsed schema, interning every name.
+
+    Args:
+        schema (GraphQLSchema): The parsed GraphQL schema.
+
+    Returns:
+        CompactSchema: The compact model of the schema.
+    """
+    # imported here, as schema_changes runs against this module's records
+    from schema_changes import identify_graphql_type
+
+    type_map = {}
+    for type_name, graphql_type in schema.type_map.items():
+        if type_name.startswith("__") or type_name in specified_scalar_types:
+            continue
+
+        type_name = sys.intern(type_name)
+        kind = sys.intern(identify_graphql_type(graphql_type))
+
+        fields = EMPTY_MAPPING
+        if kind in ("GraphQLObjectType", "GraphQLInterfaceType"):
+            fields = {}
+            for field_name, field in graphql_type.fields.items():
+                args = EMPTY_MAPPING
+                if field.args:
+                    args = {sys.intern(arg_name): CompactArgument(sys.intern(arg_name),
+                                                                  encode_type_ref(arg.type),
+                                                                  arg.default_value)
+                            for arg_name, arg in field.args.items()}
+                field_name = sys.intern(field_name)
+                fields[field_name] = CompactField(field_name, encode_type_ref(field.type), args)
+
+        values = ()
+        if kind == "GraphQLEnumType":
+            values = tuple(sys.intern(value_name) for value_name in graphql_type.values)
+
+        type_map[type_name] = CompactType(type_name, kind, fields, values)
+
+    return CompactSchema(type_map)
+
+
+# ----  memory footprint ---- #
+
+def shared_graphql_objects() -> set[int]:
+    """
+    Returns:
+        set[int]: The ids of the graphql-core objects shared by every schema (built-in
+            scalars, introspection types and directives), which no schema owns.
+    """
+    shared = [*specified_scalar_types.values(), *introspection_types.values(), *specified_directives, Undefined]
+    return {id(obj) for obj in shared}
+
+
+def deep_sizeof(root, skip: set[int] | None = None) -> int:
+    """
+    Measure the memory held by an object graph, counting each object once.
+    Classes, modules and functions are not counted, nor traversed.
+
+    Args:
+        root: The root of the object graph.
+        skip (set[int] | None): The ids of objects neither counted nor traversed.
+
+    Returns:
+        int: The size of the object graph in bytes.
+    """
+    seen = set(skip or ())
+    stack = [root]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, ModuleType, FunctionType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+
+    return size
+
+
+def memory_footprint(schema: GraphQLSchema, compact: CompactSchema | None = None) -> dict:
+    """
+    Compare the memory footprint of a graphql-core schema with its compact model.
+
+    Args:
+        schema (GraphQLSchema): The parsed GraphQL schema.
+        compact (CompactSchema | None): Its compact model, built if not provided.
+
+    Returns:
+        dict: The size in bytes of both models and the ratio between them.
+    """
+    compact = compact_schema(schema) if compact is None else compact
+    skip = shared_graphql_objects()
+
+    graphql_core_bytes = deep_sizeof(schema, skip)
+    compact_bytes = deep_sizeof(compact, skip)
+
+    return {
+        "graphql_core_bytes": graphql_core_bytes,
+        "compact_bytes": compact_bytes,
+        "compact_to_graphql_core_ratio": compact_bytes / graphql_core_bytes
+    }
@@ -0,0 +1,100 @@
+"""
+
+Script checks whether a new version of a GraphQL schema is backwards compatible, for
+CI gates: the changes are traversed lazily and the traversal stops at the first
+breaking change (or after a given number of them), without building the full change
+list or the release summary. Only the verdict and the offending changes are returned.
+
+"""
+# import packages
+import logging
+from graphql import GraphQLSchema
+
+# import custom modules
+from schema_diff_report import parse_schema, normalize_schema_str, check_graphql_parsing_failure
+from schema_diff_engine import iter_schema_changes
+from schema_digest import schema_digest
+from diff_stages import diff_stage
+from tracing import traced_diff_report
+
+
+def find_breaking_changes(schema_version1: GraphQLSchema,
+                          schema_version2: GraphQLSchema,
+                          max_breaking: int | None = 1,
+                          extended: bool = True) -> tuple[list[dict], bool]:
+    """
+    Find the breaking changes between two parsed schemas, stopping the traversal once
+    max_breaking of them were found.
+
+    Args:
+        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        max_breaking (int | None): The number of breaking changes to stop at, None for all of them.
+        extended (bool): Also check the change kinds only the 'single-pass' technique detects.
+
+    Returns:
+        tuple[list[dict], bool]: The breaking changes found, and whether the traversal stopped
+            early, i.e. there may be more of them.
+    """
+    breaking_changes = []
+    if schema_digest(schema_version1) == schema_digest(schema_version2):
+        return breaking_changes, False
+
+    for change in iter_schema_changes(schema_version1, schema_version2, extended):
+        if change["breaking"]:
+            breaking_changes.append(change)
+            if max_breaking is not None and len(breaking_changes) >= max_breaking:
+                return breaking_changes, True
+
+    return breaking_changes, False
+
+
+@traced_diff_report
+def check_compatibility(schema_v1_str: str,
+                        schema_v2_str: str,
+                        max_breaking: int | None = 1,
+                        identify_changes_technique: str = 'single-pass') -> dict | list:
+    """
+    Check whether the second version of a GraphQL schema is backwards compatible with the first.
+
+    Args:
+        schema_v1_str (str): the string of the first version of the GraphQL schema
+        schema_v2_str (str): the string of the second version of the GraphQL schema
+        max_breaking (int | None): The number of breaking changes to stop at, None for all of them.
+        identify_changes_technique (str): The technique for identifying the schema changes
+            could be: 'algorithmic' or 'single-pass'
+
+    Returns:
+        dict | list: The verdict ('compatible'), the breaking changes found and whether the
+            check stopped early ('stopped_early'), or the parsing failure.
+    """
+    if identify_changes_technique not in ('algorithmic', 'single-pass'):
+        error_message = f"Compatibility checks need an algorithmic technique, not '{identify_changes_technique}'"
+        logging.error(error_message)
+        return {"status": "Failed", "reason": [error_message]}
+
+    with diff_stage("normalization"):
+        schema_v1_str = normalize_schema_str(schema_v1_str)
+        schema_v2_str = normalize_schema_str(schema_v2_str)
+
+    breaking_changes, stopped_early = [], False
+    if schema_v1_str != schema_v2_str:
+        with diff_stage("parse_schema"):
+            schema_version1 = parse_schema(schema_v1_str)
+            schema_version2 = parse_schema(schema_v2_str)
+
+        parsing_failure = check_graphql_parsing_failure(schema_version1, schema_version2)
+        if parsing_failure is not None:
+            return parsing_failure
+
+        with diff_stage("identify_changes"):
+            breaking_changes, stopped_early = find_breaking_changes(
+                schema_version1, schema_version2, max_breaking,
+                extended=identify_changes_technique == 'single-pass'
+            )
+
+    return {
+        "compatible": not breaking_changes,
+        "breaking_changes": breaking_changes,
+        "stopped_early": stopped_early
+    }
@@ -0,0 +1,234 @@
+"""
+
+Script profiles the CPU time of a single diff report, to find out why a specific pair
+of schemas is slow: either with cProfile ('deterministic', exact call counts but slowing
+the diff down about twice), or by sampling the stack of the diff thread ('sampling',
+approximate but with little overhead). The profile aggregates the time of the hottest
+functions (e.g. get_field_type_name, compare_arguments or build_schema) and of each stage.
+
+Only the thread running the diff is profiled, so the GPT3.5 summaries of chunks running
+on their own threads are only seen as the time the diff waits for them. Profiled runs are
+serialized. On the API, profiling requires the X-Profile-Token header to match the
+PROFILE_TOKEN env var, and is disabled if it is not set.
+
+"""
+# import packages
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable
+
+# import custom modules
+from diff_stages import listen_to_stages
+from schema_diff_report import graphql_diff_report
+
+# the token authorizing the profiling of API requests, profiling is disabled without it
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+# the interval between two stack samples of the sampling profiler
+PROFILE_SAMPLING_INTERVAL_SECONDS = float(os.getenv('PROFILE_SAMPLING_INTERVAL_SECONDS', '0.001'))
+# the number of hottest functions reported
+TOP_FUNCTIONS = 20
+
+PROFILERS = ("deterministic", "sampling")
+
+_profile_lock = threading.Lock()
+
+
+class ProfilingNotAuthorizedError(Exception):
+    """
+    Raised when a request asks for a profile without a valid profile token.
+    """
+
+
+def check_profile_token(token: str | None, expected_token: str | None = None) -> None:
+    """
+    Check that a request is authorized to profile the CPU.
+
+    Args:
+        token (str | None): The token sent with the request.
+        expected_token (str | None): The expected token, defaults to the PROFILE_TOKEN env var.
+
+    Raises:
+        ProfilingNotAuthorizedError: If profiling is disabled, or the token does not match.
+    """
+    expected_token = PROFILE_TOKEN if expected_token is None else expected_token
+    if not expected_token:
+        raise ProfilingNotAuthorizedError("CPU profiling is disabled, set PROFILE_TOKEN to enable it")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), expected_token.encode("utf-8")):
+        raise ProfilingNotAuthorizedError("CPU profiling requires a valid X-Profile-Token header")
+
+
+def function_name(filename: str, lineno: int, name: str) -> tuple[str, str]:
+    """
+    The name and location of a profiled function, e.g. 'schema_changes.py:get_field_type_name'
+    and 'src/schema_changes.py:120'; built-in functions have no location.
+    """
+    if filename == "~":
+        return name, ""
+
+    return f"{os.path.basename(filename)}:{name}", f"{os.path.join(*filename.split(os.sep)[-2:])}:{lineno}"
+
+
+class StageTimer:
+    """
+    Stage listener recording the wall clock time of each stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+class StackSampler:
+    """
+    Sample the stack of a thread at a fixed interval from a background thread, counting for
+    each function the samples it was running in (self) and the samples it was on the stack (cumulative).
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float = PROFILE_SAMPLING_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.samples = 0
+        self.self_samples = Counter()
+        self.cumulative_samples = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="cpu-profile-sampler", daemon=True)
+
+    def run(self) -> None:
+        while not self.stop_event.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            code = frame.f_code
+            self.self_samples[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+            on_stack = set()
+            while frame is not None:
+                code = frame.f_code
+                on_stack.add((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.cumulative_samples.update(on_stack)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def deterministic_functions(profiler: cProfile.Profile, top: int) -> list[dict]:
+    """
+    The functions with the most self time in a cProfile profile.
+    """
+    functions = []
+    for (filename, lineno, name), (_, calls, self_seconds, cumulative_seconds, _) in pstats.Stats(profiler).stats.items():
+        function, location = function_name(filename, lineno, name)
+        functions.append({
+            "function": function,
+            "location": location,
+            "calls": calls,
+            "self_seconds": self_seconds,
+            "cumulative_seconds": cumulative_seconds
+        })
+
+    return sorted(functions, key=lambda function: function["self_seconds"], reverse=True)[:top]
+
+
+def sampled_functions(sampler: StackSampler, seconds: float, top: int) -> list[dict]:
+    """
+    The functions sampled running the most, with their time estimated from their share of the samples.
+    """
+    seconds_per_sample = seconds / sampler.samples if sampler.samples else 0.0
+    functions = []
+    for key, cumulative_samples in sampler.cumulative_samples.items():
+        function, location = function_name(*key)
+        functions.append({
+            "function": function,
+            "location": location,
+            "samples": sampler.self_samples[key],
+            "self_seconds": sampler.self_samples[key] * seconds_per_sample,
+            "cumulative_seconds": cumulative_samples * seconds_per_sample
+        })
+
+    return sorted(functions, key=lambda function: (function["self_seconds"], function["cumulative_seconds"]),
+                  reverse=True)[:top]
+
+
+def profile_cpu(function: Callable, *args, profiler: str = "deterministic", top: int = TOP_FUNCTIONS,
+                **kwargs) -> tuple:
+    """
+    Run a function, typically graphql_diff_report, under a CPU profiler.
+
+    Args:
+        function (Callable): The function to profile.
+        profiler (str): The profiler could be: 'deterministic' (cProfile) or 'sampling'.
+        top (int): The number of hottest functions reported.
+
+    Returns:
+        tuple: The result of the function, and its CPU profile: the profiler, the wall clock
+            and CPU time of the run, the time of each stage and the hottest functions, sorted
+            by their own (self) time.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected one of: {', '.join(PROFILERS)}")
+
+    stage_timer = StageTimer()
+    with _profile_lock:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        if profiler == "deterministic":
+            cpu_profiler = cProfile.Profile()
+            with listen_to_stages(stage_timer.stage):
+                cpu_profiler.enable()
+                try:
+                    result = function(*args, **kwargs)
+                finally:
+                    cpu_profiler.disable()
+            seconds = time.perf_counter() - start
+            functions = deterministic_functions(cpu_profiler, top)
+        else:
+            with StackSampler(threading.get_ident()) as sampler, listen_to_stages(stage_timer.stage):
+                result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            functions = sampled_functions(sampler, seconds, top)
+        cpu_seconds = time.thread_time() - cpu_start
+
+    profile = {
+        "profiler": profiler,
+        "seconds": seconds,
+        "cpu_seconds": cpu_seconds,
+        "stages": stage_timer.stages,
+        "functions": functions
+    }
+    if profiler == "sampling":
+        profile["samples"] = sampler.samples
+
+    return result, profile
+
+
+def cpu_profiled_diff_report(*args, profiler: str = "deterministic", **kwargs) -> dict | list:
+    """
+    Generate a diff report with graphql_diff_report, adding its CPU profile to it.
+
+    Returns:
+        dict: The diff report, with its CPU profile under 'cpu_profile'.
+    """
+    report, profile = profile_cpu(graphql_diff_report, *args, profiler=profiler, **kwargs)
+    if isinstance(report, dict):
+        return {**report, "cpu_profile": profile}
+
+    return report
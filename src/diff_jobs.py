@@ -0,0 +1,303 @@
+"""
+
+Script runs diff reports as asynchronous jobs: jobs are queued in a local SQLite
+database, claimed and run by worker processes, and their status, progress and
+result are persisted, so that long diffs outlive the request that submitted them.
+
+Run the workers alongside the app with JOB_WORKERS, or separately with:
+    python src/diff_jobs.py worker --processes 4
+
+"""
+# import packages
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+
+# import custom modules
+from schema_diff_report import graphql_diff_report
+from diff_stages import DIFF_STAGES, listen_to_stages
+from request_cancellation import CancellationToken, cancellation_scope
+
+# the SQLite database of the jobs
+DIFF_JOBS_PATH = os.getenv("DIFF_JOBS_PATH", "diff_jobs.sqlite3")
+# the number of worker processes started by the app (0 to run the workers separately)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# the deadline of a single job
+JOB_DEADLINE_SECONDS = float(os.getenv("JOB_DEADLINE_SECONDS", "3600"))
+# a running job whose worker has not sent a heartbeat for this long is queued again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = JOB_STALE_SECONDS / 4
+# the number of times a job is queued again before it fails
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobNotFoundError(KeyError):
+    """
+    Raised when a job does not exist.
+    """
+
+
+class JobQueue:
+    """
+    The diff jobs of a SQLite database, shared by the app and the worker processes.
+    Each operation opens its own connection, and jobs are claimed in a write transaction,
+    so that each job is run by a single worker.
+    """
+
+    def __init__(self, path: str = DIFF_JOBS_PATH):
+        self.path = path
+        with closing(self.connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def submit(self, request: dict) -> str:
+        """
+        Queue a diff job.
+
+        Args:
+            request (dict): The keyword arguments of graphql_diff_report.
+
+        Returns:
+            str: The id of the job.
+        """
+        job_id = uuid.uuid4().hex
+        with closing(self.connect()) as connection:
+            connection.execute("INSERT INTO jobs (id, status, request, created_at) VALUES (?, ?, ?, ?)",
+                               (job_id, QUEUED, json.dumps(request), time.time()))
+
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        """
+        The status, progress and result of a job.
+
+        Args:
+            job_id (str): The id of the job.
+
+        Returns:
+            dict: The job, with its result once it succeeded or its error once it failed.
+        """
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT id, status, stage, result, error, attempts, created_at, started_at, "
+                                     "finished_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+
+        job_id, status, stage, result, error, attempts, created_at, started_at, finished_at = row
+        completed_stages = DIFF_STAGES.index(stage) if stage in DIFF_STAGES else 0
+        if status == SUCCEEDED:
+            completed_stages = len(DIFF_STAGES)
+
+        return {
+            "id": job_id,
+            "status": status,
+            "progress": {
+                "stage": stage,
+                "completed_stages": completed_stages,
+                "total_stages": len(DIFF_STAGES)
+            },
+            "attempts": attempts,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "result": json.loads(result) if result is not None else None,
+            "error": error
+        }
+
+    def claim(self, worker: str) -> tuple[str, dict] | None:
+        """
+        Claim the oldest queued job, first queueing again the jobs of unresponsive workers.
+
+        Args:
+            worker (str): The name of the claiming worker.
+
+        Returns:
+            tuple[str, dict] | None: The id and request of the claimed job, or None if no job is queued.
+        """
+        now = time.time()
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                                   "error = CASE WHEN attempts >= ? THEN 'Worker stopped responding' END, "
+                                   "finished_at = CASE WHEN attempts >= ? THEN ? END "
+                                   "WHERE status = ? AND heartbeat_at < ?",
+                                   (JOB_MAX_ATTEMPTS, FAILED, QUEUED, JOB_MAX_ATTEMPTS, JOB_MAX_ATTEMPTS, now,
+                                    RUNNING, now - JOB_STALE_SECONDS))
+                row = connection.execute("SELECT id, request FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                                         (QUEUED,)).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                                       "started_at = ?, heartbeat_at = ?, stage = NULL WHERE id = ?",
+                                       (RUNNING, worker, now, now, row[0]))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def update(self, job_id: str, **columns) -> None:
+        """
+        Update the columns of a job, refreshing its heartbeat.
+        """
+        columns["heartbeat_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with closing(self.connect()) as connection:
+            connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+    def succeed(self, job_id: str, result) -> None:
+        self.update(job_id, status=SUCCEEDED, result=json.dumps(result), finished_at=time.time())
+
+    def fail(self, job_id: str, error: str) -> None:
+        self.update(job_id, status=FAILED, error=error, finished_at=time.time())
+
+
+# ----  workers ---- #
+
+def run_job(queue: JobQueue, job_id: str, request: dict) -> None:
+    """
+    Run a claimed job, recording the stage it reached and a heartbeat while it runs.
+
+    Args:
+        queue (JobQueue): The job queue.
+        job_id (str): The id of the job.
+        request (dict): The keyword arguments of graphql_diff_report.
+    """
+    @contextmanager
+    def record_stage(stage: str):
+        queue.update(job_id, stage=stage)
+        yield
+
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+            queue.update(job_id)
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        with listen_to_stages(record_stage), cancellation_scope(CancellationToken(JOB_DEADLINE_SECONDS)):
+            result = graphql_diff_report(**request)
+        queue.succeed(job_id, result)
+        logging.info(f"Job {job_id} succeeded.")
+
+    except Exception as e:
+        logging.error(f"Job {job_id} failed: {e}")
+        queue.fail(job_id, f"{type(e).__name__}: {e}")
+
+    finally:
+        stopped.set()
+        heartbeat_thread.join()
+
+
+def run_worker(path: str = DIFF_JOBS_PATH,
+               poll_interval_seconds: float = 0.5,
+               stop_event=None,
+               max_jobs: int | None = None) -> int:
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        path (str): The SQLite database of the jobs.
+        poll_interval_seconds (float): The waiting time when no job is queued.
+        stop_event: Event stopping the worker once set (threading or multiprocessing).
+        max_jobs (int | None): Stop after running this many jobs.
+
+    Returns:
+        int: The number of jobs run.
+    """
+    queue = JobQueue(path)
+    worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    jobs_run = 0
+    while (stop_event is None or not stop_event.is_set()) and (max_jobs is None or jobs_run < max_jobs):
+        claimed = queue.claim(worker)
+        if claimed is None:
+            time.sleep(poll_interval_seconds)
+            continue
+
+        run_job(queue, *claimed)
+        jobs_run += 1
+
+    return jobs_run
+
+
+def start_worker_pool(processes: int = JOB_WORKERS, path: str = DIFF_JOBS_PATH) -> tuple[list, object]:
+    """
+    Start worker processes, independent of the request handling threads.
+
+    Args:
+        processes (int): The number of worker processes.
+        path (str): The SQLite database of the jobs.
+
+    Returns:
+        tuple[list, Event]: The worker processes, and the event stopping them.
+    """
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    workers = [context.Process(target=run_worker, args=(path, 0.5, stop_event), daemon=True, name=f"diff-worker-{i}")
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+
+    return workers, stop_event
+
+
+def stop_worker_pool(workers: list, stop_event, timeout_seconds: float = 5.0) -> None:
+    """
+    Stop the worker processes once their current job is done, terminating them after the timeout.
+    """
+    stop_event.set()
+    for process in workers:
+        process.join(timeout_seconds)
+        if process.is_alive():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run the diff job workers.")
+    parser.add_argument("command", choices=["worker"])
+    parser.add_argument("--processes", type=int, default=1, help="The number of worker processes.")
+    parser.add_argument("--path", default=DIFF_JOBS_PATH, help="The SQLite database of the jobs.")
+    args = parser.parse_args()
+
+    workers, stop_event = start_worker_pool(args.processes, args.path)
+    logging.info(f"Started {args.processes} diff worker(s) on {args.path}.")
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        stop_worker_pool(workers, stop_event)
@@ -0,0 +1,53 @@
+"""
+
+Script marks the stages of a diff report (normalization, parsing, identifying the
+changes and summarizing them), so that progress reporting and instrumentation can
+observe them without being threaded through every function signature.
+
+"""
+# import packages
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Callable, ContextManager, Iterator
+
+# the stages of graphql_diff_report, in order
+DIFF_STAGES = ("normalization", "parse_schema", "identify_changes", "generate_release_summary")
+
+# the listeners of the current context: callables taking the stage name and returning
+# a context manager, entered for the duration of the stage
+stage_listeners: ContextVar[tuple[Callable[[str], ContextManager], ...]] = ContextVar("stage_listeners", default=())
+
+
+@contextmanager
+def diff_stage(name: str) -> Iterator[None]:
+    """
+    Run a block of code as a stage of the diff, inside the context manager of every listener.
+
+    Args:
+        name (str): The name of the stage.
+    """
+    listeners = stage_listeners.get()
+    if not listeners:
+        yield
+        return
+
+    with ExitStack() as stack:
+        for listener in listeners:
+            stack.enter_context(listener(name))
+        yield
+
+
+@contextmanager
+def listen_to_stages(listener: Callable[[str], ContextManager]) -> Iterator[None]:
+    """
+    Make a listener observe the diff stages run in the current context.
+
+    Args:
+        listener (Callable[[str], ContextManager]): Callable taking the stage name, and
+            returning a context manager entered for the duration of the stage.
+    """
+    reset_token = stage_listeners.set((*stage_listeners.get(), listener))
+    try:
+        yield
+    finally:
+        stage_listeners.reset(reset_token)
@@ -0,0 +1,241 @@
+"""
+
+Script persists computed diff reports in a local SQLite database, with their changes
+indexed by type, field, change kind and breaking flag, so that filtered and paginated
+slices of a report can be served without recomputing or re-sending the whole report.
+
+"""
+# import packages
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+# the SQLite database of the stored diffs
+DIFF_STORE_PATH = os.getenv("DIFF_STORE_PATH", "diff_store.sqlite3")
+
+# the default and maximum number of changes in a page
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# the kind of a change, identified by its change message
+CHANGE_KINDS = [
+    ("type_renamed", re.compile(r"Type '.*' was renamed to ")),
+    ("type_removed", re.compile(r"Type '.*' was removed")),
+    ("type_added", re.compile(r"Added new type ")),
+    ("type_kind_changed", re.compile(r"Type changed from ")),
+    ("field_renamed", re.compile(r"Renamed field ")),
+    ("field_removed", re.compile(r"Field '.*' was removed")),
+    ("field_added", re.compile(r"Added new field ")),
+    ("field_type_changed", re.compile(r"Field type changed from ")),
+    ("field_deprecation_changed", re.compile(r"Field '.*' (was deprecated|is no longer deprecated)")),
+    ("argument_renamed", re.compile(r"Renamed input parameter ")),
+    ("argument_removed", re.compile(r"Renamed or removed argument ")),
+    ("argument_added", re.compile(r"Added new input parameter ")),
+    ("argument_type_changed", re.compile(r"Argument '.*' type changed from ")),
+    ("argument_default_changed", re.compile(r"Default value of argument ")),
+    ("enum_value_removed", re.compile(r"Value '.*' was removed")),
+    ("enum_value_added", re.compile(r"Added new value ")),
+    ("enum_value_deprecation_changed", re.compile(r"Value '.*' (was deprecated|is no longer deprecated)")),
+    ("input_field_removed", re.compile(r"Input field '.*' was removed")),
+    ("input_field_added", re.compile(r"Added new (required )?input field ")),
+    ("input_field_default_changed", re.compile(r"Default value of input field ")),
+    ("union_member_removed", re.compile(r"Member '.*' was removed from union")),
+    ("union_member_added", re.compile(r"Added new union member ")),
+    ("directive_removed", re.compile(r"Directive '.*' was removed")),
+    ("directive_added", re.compile(r"Added new directive ")),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS diffs (
+    id TEXT PRIMARY KEY,
+    request_key TEXT,
+    created_at REAL NOT NULL,
+    change_count INTEGER NOT NULL,
+    breaking_count INTEGER NOT NULL,
+    release_notes TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS diffs_request_key ON diffs (request_key);
+
+CREATE TABLE IF NOT EXISTS changes (
+    diff_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT,
+    field TEXT,
+    kind TEXT NOT NULL,
+    breaking INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (diff_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS changes_type ON changes (diff_id, type, position);
+CREATE INDEX IF NOT EXISTS changes_field ON changes (diff_id, field, position);
+CREATE INDEX IF NOT EXISTS changes_kind ON changes (diff_id, kind, position);
+CREATE INDEX IF NOT EXISTS changes_breaking ON changes (diff_id, breaking, position);
+"""
+
+
+class DiffNotFoundError(KeyError):
+    """
+    Raised when a stored diff does not exist.
+    """
+
+
+def is_storable_report(report) -> bool:
+    """
+    Returns:
+        bool: Whether a report holds identified changes, rather than a parsing or comparison failure.
+    """
+    if not isinstance(report, dict) or not isinstance(report.get("changes"), list):
+        return False
+    changes = report["changes"]
+
+    return not (len(changes) == 1 and 'status' in changes[0].keys())
+
+
+def classify_change(change: dict) -> str:
+    """
+    Identify the kind of a change from its change message.
+
+    Args:
+        change (dict): The change record.
+
+    Returns:
+        str: The kind of the change, e.g. 'field_removed', or 'other' if it is not recognised.
+    """
+    message = str(change.get("change", ""))
+    for kind, pattern in CHANGE_KINDS:
+        if pattern.match(message):
+            return kind
+
+    return "other"
+
+
+class DiffStore:
+    """
+    The stored diffs of a SQLite database. Each operation opens its own connection,
+    so the store can be shared between threads.
+    """
+
+    def __init__(self, path: str = DIFF_STORE_PATH):
+        self.path = path
+        with closing(self.connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save_report(self, report: dict, request_key: str | None = None) -> str:
+        """
+        Store a diff report.
+
+        Args:
+            report (dict): The diff report, with its changes and release notes.
+            request_key (str | None): The key of the request that produced the report,
+                to find it again with find_diff.
+
+        Returns:
+            str: The id of the stored diff.
+        """
+        diff_id = uuid.uuid4().hex
+        changes = report["changes"]
+        rows = [(diff_id, position, change.get("type"), change.get("field"), classify_change(change),
+                 int(bool(change.get("breaking"))), json.dumps(change))
+                for position, change in enumerate(changes)]
+
+        with closing(self.connect()) as connection, connection:
+            connection.execute("INSERT INTO diffs VALUES (?, ?, ?, ?, ?, ?)",
+                               (diff_id, request_key, time.time(), len(rows),
+                                sum(row[5] for row in rows), json.dumps(report["release_notes"])))
+            connection.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        return diff_id
+
+    def find_diff(self, request_key: str) -> str | None:
+        """
+        Returns:
+            str | None: The id of the latest diff stored for a request key, or None.
+        """
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT id FROM diffs WHERE request_key = ? ORDER BY created_at DESC LIMIT 1",
+                                     (request_key,)).fetchone()
+
+        return row[0] if row else None
+
+    def get_diff(self, diff_id: str) -> dict:
+        """
+        The summary of a stored diff, without its changes.
+
+        Args:
+            diff_id (str): The id of the diff.
+
+        Returns:
+            dict: The id, creation time, change counts and release notes of the diff.
+        """
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT id, created_at, change_count, breaking_count, release_notes "
+                                     "FROM diffs WHERE id = ?", (diff_id,)).fetchone()
+        if row is None:
+            raise DiffNotFoundError(diff_id)
+
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "change_count": row[2],
+            "breaking_count": row[3],
+            "release_notes": json.loads(row[4])
+        }
+
+    def query_changes(self,
+                      diff_id: str,
+                      breaking: bool | None = None,
+                      type_name: str | None = None,
+                      field_name: str | None = None,
+                      kind: str | None = None,
+                      limit: int = DEFAULT_PAGE_SIZE,
+                      cursor: str | None = None) -> dict:
+        """
+        A page of the changes of a stored diff matching the filters, in report order.
+        Pages are read from the position after the cursor, so deep pages cost no more than the first.
+
+        Args:
+            diff_id (str): The id of the diff.
+            breaking (bool | None): Only the breaking, or non-breaking, changes.
+            type_name (str | None): Only the changes of this type.
+            field_name (str | None): Only the changes of this field.
+            kind (str | None): Only the changes of this kind, as classify_change names it.
+            limit (int): The maximum number of changes in the page, up to MAX_PAGE_SIZE.
+            cursor (str | None): The next_cursor of the previous page.
+
+        Returns:
+            dict: The changes of the page, and the cursor of the next page (None on the last page).
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"The limit must be between 1 and {MAX_PAGE_SIZE}.")
+        try:
+            after = int(cursor) if cursor is not None else -1
+        except ValueError:
+            raise ValueError(f"Invalid cursor '{cursor}'.")
+
+        conditions, parameters = ["diff_id = ?", "position > ?"], [diff_id, after]
+        for column, value in (("breaking", None if breaking is None else int(breaking)),
+                              ("type", type_name), ("field", field_name), ("kind", kind)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+
+        with closing(self.connect()) as connection:
+            if connection.execute("SELECT 1 FROM diffs WHERE id = ?", (diff_id,)).fetchone() is None:
+                raise DiffNotFoundError(diff_id)
+            rows = connection.execute(f"SELECT position, record FROM changes WHERE {' AND '.join(conditions)} "
+                                      f"ORDER BY position LIMIT ?", (*parameters, limit + 1)).fetchall()
+
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+
+        return {
+            "changes": [json.loads(record) for _, record in rows[:limit]],
+            "next_cursor": next_cursor
+        }
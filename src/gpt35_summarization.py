@@ -10,7 +10,7 @@ from langchain.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
 
 
-def initialize_langchain(api_key: str) -> LLMChain:
+def initialize_langchain(api_key: str, request_timeout: float | None = None) -> LLMChain:
     """
     Initializes the LangChain components for combining GraphQL schema change descriptions
     using the OpenAI language model.
@@ -22,6 +22,8 @@ def initialize_langchain(api_key: str) -> LLMChain:
     Args:
         api_key (str): The API key for accessing the OpenAI service. This key is required
                        for authenticating requests to the OpenAI API.
+        request_timeout (float | None): The timeout of each request to the OpenAI API
+                       in seconds. Defaults to the client's own timeout.
 
     Returns:
         LLMChain: An instance of the LangChain LLMChain configured with the initialized
@@ -33,6 +35,8 @@ def initialize_langchain(api_key: str) -> LLMChain:
         model="gpt-3.5-turbo",
         openai_api_key=api_key,  # Use the provided OpenAI API key
         temperature=0.3,  # Adjust for more or less creativity in responses
+        request_timeout=request_timeout,
+        max_retries=0,  # the retries are made by llm_resilience
     )
 
     # Define a prompt template to guide the model in combining the sentences
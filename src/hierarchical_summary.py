@@ -0,0 +1,179 @@
+"""
+
+Script summarizes any number of change messages with a language model of limited
+context, by packing them into token-budgeted chunks, summarizing the chunks
+concurrently (map), and summarizing the partial summaries until one is left (reduce).
+
+"""
+# import packages
+import contextvars
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+# import custom modules
+from request_cancellation import check_cancelled
+
+# optional exact token counts of the OpenAI models
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# the token budget of the changes sent in a single prompt, leaving room in the
+# context of gpt-3.5-turbo for the prompt template and the answer
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '2500'))
+# the maximum number of concurrent model calls
+SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', '4'))
+
+# the average number of characters per token of English text, without tiktoken
+CHARACTERS_PER_TOKEN = 4
+
+_encoding = None
+
+
+def token_estimator() -> str:
+    """
+    Returns:
+        str: The name of the method estimating the token counts.
+    """
+    return "tiktoken" if tiktoken is not None else f"characters/{CHARACTERS_PER_TOKEN}"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text, exactly with tiktoken if it is installed,
+    otherwise from its number of characters.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        return len(_encoding.encode(text))
+
+    return math.ceil(len(text) / CHARACTERS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Shorten a text to at most max_tokens tokens.
+    """
+    while estimate_tokens(text) > max_tokens:
+        text = text[:min(len(text) - 1, len(text) * max_tokens // estimate_tokens(text))]
+
+    return text
+
+
+def pack_messages(messages: list[str], max_tokens: int) -> list[list[str]]:
+    """
+    Pack messages, in order, into chunks of at most max_tokens tokens each once joined by
+    new lines. A message longer than the budget is truncated into a chunk of its own.
+
+    Args:
+        messages (list[str]): The messages.
+        max_tokens (int): The token budget of a chunk.
+
+    Returns:
+        list[list[str]]: The chunks of messages.
+    """
+    chunks, chunk, chunk_tokens = [], [], 0
+    for message in messages:
+        message_tokens = estimate_tokens(message)
+        if message_tokens > max_tokens:
+            message = truncate_to_tokens(message, max_tokens)
+            message_tokens = estimate_tokens(message)
+
+        # one more token for the new line joining it to the previous message
+        if chunk and chunk_tokens + 1 + message_tokens > max_tokens:
+            chunks.append(chunk)
+            chunk, chunk_tokens = [], 0
+        chunk_tokens += message_tokens + (1 if chunk else 0)
+        chunk.append(message)
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+
+def summarize_chunks(chunks: list[list[str]],
+                     summarize: Callable[[str], str],
+                     max_workers: int) -> list[str]:
+    """
+    Summarize each chunk of messages concurrently, keeping their order. The calls run
+    in the caller's context, so that they observe the cancellation of the request.
+    """
+    def summarize_chunk(chunk: list[str]) -> str:
+        check_cancelled()
+        return summarize("\n".join(chunk))
+
+    if len(chunks) <= 1:
+        return [summarize_chunk(chunk) for chunk in chunks]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, summarize_chunk, chunk) for chunk in chunks]
+        return [future.result() for future in futures]
+
+
+def summarize_hierarchically(messages: list[str],
+                             summarize: Callable[[str], str],
+                             max_chunk_tokens: int = SUMMARY_CHUNK_TOKENS,
+                             max_workers: int = SUMMARY_MAX_WORKERS) -> dict:
+    """
+    Summarize messages that may not fit in a single prompt: summarize token-budgeted
+    chunks of them concurrently, then summarize the partial summaries, in as many
+    rounds as needed, until a single summary is left.
+
+    Args:
+        messages (list[str]): The messages to summarize.
+        summarize (Callable[[str], str]): The model call, summarizing new line separated messages.
+        max_chunk_tokens (int): The token budget of the messages of a single model call.
+        max_workers (int): The maximum number of concurrent model calls.
+
+    Returns:
+        dict: The summary, and the statistics of the summarization: the estimated token counts,
+            the number of chunks and model calls, and the latency of each stage.
+    """
+    start = time.perf_counter()
+    stats = {
+        "messages": len(messages),
+        "token_estimator": token_estimator(),
+        "input_tokens": sum(estimate_tokens(message) for message in messages),
+        "prompt_tokens": 0,
+        "map_calls": 0,
+        "reduce_rounds": 0,
+        "reduce_calls": 0,
+        "stage_seconds": {"map": 0.0, "reduce": 0.0}
+    }
+
+    # map
+    chunks = pack_messages(messages, max_chunk_tokens)
+    stats["prompt_tokens"] += sum(estimate_tokens("\n".join(chunk)) for chunk in chunks)
+    stats["map_calls"] = len(chunks)
+    summaries = summarize_chunks(chunks, summarize, max_workers)
+    stats["stage_seconds"]["map"] = time.perf_counter() - start
+
+    # reduce, with each summary at most half the budget so every chunk combines at least two
+    reduce_start = time.perf_counter()
+    while len(summaries) > 1:
+        summaries = [truncate_to_tokens(summary, max_chunk_tokens // 2 - 1) for summary in summaries]
+        chunks = pack_messages(summaries, max_chunk_tokens)
+        stats["prompt_tokens"] += sum(estimate_tokens("\n".join(chunk)) for chunk in chunks)
+        stats["reduce_rounds"] += 1
+        stats["reduce_calls"] += len(chunks)
+        summaries = summarize_chunks(chunks, summarize, max_workers)
+    stats["stage_seconds"]["reduce"] = time.perf_counter() - reduce_start
+    stats["stage_seconds"]["total"] = time.perf_counter() - start
+
+    return {
+        "summary": summaries[0] if summaries else "",
+        "stats": stats
+    }
@@ -0,0 +1,118 @@
+"""
+
+Script parses a JSON array of objects incrementally, as the chunks of a streamed LLM
+completion arrive: each object is emitted as soon as its closing brace is received,
+and a malformed object is skipped instead of discarding the whole array.
+
+Text before the array, such as a ```json fence, and after its closing bracket is ignored.
+
+"""
+# import packages
+import json
+import logging
+from typing import Iterable, Iterator
+
+
+class IncrementalJSONArrayParser:
+    """
+    Incremental parser of the objects of a JSON array. The text is scanned once: the
+    parser keeps its position, the nesting depth and whether it is inside a string
+    between the chunks fed to it.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.malformed = 0
+
+    def feed(self, chunk: str) -> list:
+        """
+        Parse the next chunk of the text.
+
+        Args:
+            chunk (str): The next characters of the text.
+
+        Returns:
+            list: The objects of the array completed by the chunk.
+        """
+        if self.finished:
+            return []
+        self.buffer += chunk
+
+        completed = []
+        buffer, position = self.buffer, self.position
+        while position < len(buffer):
+            character = buffer[position]
+            position += 1
+
+            if not self.started:
+                self.started = character == "["
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif character == "\\":
+                    self.escaped = True
+                elif character == '"':
+                    self.in_string = False
+            elif character == '"':
+                self.in_string = True
+            elif character in "{[":
+                if self.depth == 0 and character == "{":
+                    self.object_start = position - 1
+                self.depth += 1
+            elif character in "}]":
+                if self.depth == 0:  # the end of the array
+                    self.finished = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    completed.extend(self.parse_object(buffer[self.object_start:position]))
+                    self.object_start = None
+
+        # keep only the text of the object being received
+        if self.object_start is not None:
+            self.buffer = buffer[self.object_start:]
+            position -= self.object_start
+            self.object_start = 0
+        else:
+            self.buffer = ""
+            position = 0
+        self.position = position
+
+        return completed
+
+    def parse_object(self, text: str) -> list:
+        """
+        Parse the text of a complete object, skipping it if it is malformed.
+        """
+        try:
+            return [json.loads(text)]
+        except json.JSONDecodeError as e:
+            self.malformed += 1
+            logging.error(f"Skipped a malformed object of the JSON array: {e}")
+            return []
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    """
+    Yield the objects of a JSON array as soon as they are complete in a stream of text chunks.
+
+    Args:
+        chunks (Iterable[str]): The chunks of the text.
+
+    Yields:
+        The objects of the array, in order.
+    """
+    parser = IncrementalJSONArrayParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.finished:
+            break
@@ -0,0 +1,347 @@
+"""
+
+Script bounds the latency of the calls to the OpenAI API: each attempt has a timeout
+(within the deadline of the request), failed attempts are retried with jittered
+exponential backoff, a duplicate (hedged) request can be sent when an attempt is
+slower than a percentile of the recent latencies, and a circuit breaker stops calling
+the API after consecutive failures, so that the callers fall back to the algorithmic
+technique instead of waiting for a failing upstream.
+
+Configured with the env vars LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS,
+LLM_BACKOFF_MAX_SECONDS, LLM_HEDGE_PERCENTILE, LLM_BREAKER_FAILURES and LLM_BREAKER_RESET_SECONDS.
+
+"""
+# import packages
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+import openai
+
+# import custom modules
+from request_cancellation import RequestCancelledError, check_cancelled, remaining_seconds
+
+# configuration, from the environment
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_BACKOFF_BASE_SECONDS', '0.5'))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_BACKOFF_MAX_SECONDS', '8'))
+# e.g. 0.95 to hedge the attempts slower than the 95th percentile, 0 disables hedging
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '0'))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# the number of recent latencies the hedging percentile is computed on, and the minimum to hedge
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+
+# the HTTP status codes worth retrying
+RETRYABLE_STATUS_CODES = frozenset([408, 409, 429, 500, 502, 503, 504])
+
+T = TypeVar("T")
+
+# the attempts run on these threads, so that a slow attempt can be hedged or abandoned
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-call")
+
+
+class LLMUnavailableError(Exception):
+    """
+    Raised when the LLM could not answer: its retries were exhausted, or the circuit breaker is open.
+    """
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """
+    Raised without calling the LLM while the circuit breaker is open.
+    """
+
+
+def is_retryable(e: Exception) -> bool:
+    """
+    Whether a failed attempt may succeed if retried: timeouts, connection errors,
+    rate limiting and server errors.
+    """
+    if isinstance(e, (TimeoutError, ConnectionError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+
+    return getattr(e, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def backoff_seconds(attempt: int,
+                    base_seconds: float = LLM_BACKOFF_BASE_SECONDS,
+                    max_seconds: float = LLM_BACKOFF_MAX_SECONDS) -> float:
+    """
+    The delay before retrying an attempt: exponential, with full jitter so that the
+    retries of concurrent requests do not hit the API at the same time.
+
+    Args:
+        attempt (int): The number of the failed attempt, from 0.
+        base_seconds (float): The maximum delay after the first attempt.
+        max_seconds (float): The cap of the maximum delay.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+
+class LatencyTracker:
+    """
+    The latencies of the recent successful attempts.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = LATENCY_MIN_SAMPLES):
+        self.latencies = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def percentile(self, fraction: float) -> float | None:
+        """
+        Args:
+            fraction (float): The percentile, e.g. 0.95.
+
+        Returns:
+            float | None: The latency at the percentile, or None while there are too few samples.
+        """
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing upstream: after failure_threshold consecutive failed attempts
+    the breaker opens, and calls fail immediately for reset_seconds. A single trial call
+    is then let through (half-open); its success closes the breaker, its failure reopens it.
+    """
+
+    def __init__(self,
+                 failure_threshold: int = LLM_BREAKER_FAILURES,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+
+        return "half_open"
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpenError: If the breaker is open, or its trial call is already running.
+        """
+        with self.lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self.trial_running):
+                raise CircuitOpenError(f"The LLM circuit breaker is open after {self.failures} consecutive failures")
+            if state == "half_open":
+                self.trial_running = True
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release_trial(self) -> None:
+        """
+        Let another call through, when the trial call stopped without an answer (e.g. cancelled).
+        """
+        with self.lock:
+            self.trial_running = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.trial_running:
+                    logging.warning(f"LLM circuit breaker opened after {self.failures} consecutive failures.")
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+def attempt_timeout(timeout_seconds: float = LLM_TIMEOUT_SECONDS) -> float:
+    """
+    The timeout of the next attempt: the configured timeout, within the deadline of the request.
+    """
+    remaining = remaining_seconds()
+
+    return timeout_seconds if remaining is None else min(timeout_seconds, remaining)
+
+
+class ResilientLLM:
+    """
+    Calls to an LLM API with timeouts, retries, hedging and a circuit breaker, and their counters.
+    """
+
+    def __init__(self,
+                 timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base_seconds: float = LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max_seconds: float = LLM_BACKOFF_MAX_SECONDS,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 breaker: CircuitBreaker | None = None,
+                 latencies: LatencyTracker | None = None):
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = latencies or LatencyTracker()
+        self.counters_lock = threading.Lock()
+        self.counters = {
+            "calls_total": 0,
+            "attempts_total": 0,
+            "retries_total": 0,
+            "hedges_total": 0,
+            "hedge_wins_total": 0,
+            "failures_total": 0,
+            "breaker_rejections_total": 0,
+        }
+
+    def count(self, counter: str) -> None:
+        with self.counters_lock:
+            self.counters[counter] += 1
+
+    def metrics(self) -> dict:
+        """
+        Returns:
+            dict: The state of the circuit breaker, the hedging delay and the call counters.
+        """
+        return {
+            "breaker_state": self.breaker.state,
+            "hedge_delay_seconds": self.latencies.percentile(self.hedge_percentile) if self.hedge_percentile else None,
+            **self.counters
+        }
+
+    def call(self, request: Callable[[float], T], discard: Callable[[T], None] | None = None) -> T:
+        """
+        Call the LLM, retrying the failed attempts that may succeed.
+
+        Args:
+            request (Callable[[float], T]): Makes one attempt, given its timeout in seconds.
+            discard (Callable[[T], None] | None): Releases the result of a losing hedged attempt,
+                e.g. closes its stream.
+
+        Returns:
+            T: The result of the first successful attempt.
+
+        Raises:
+            LLMUnavailableError: If the attempts failed, or the circuit breaker is open.
+            RequestCancelledError: If the request was cancelled or its deadline passed.
+        """
+        self.count("calls_total")
+        for attempt in range(self.max_retries + 1):
+            check_cancelled()
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.count("breaker_rejections_total")
+                raise
+
+            try:
+                result = self.hedged_attempt(request, attempt_timeout(self.timeout_seconds), discard)
+            except RequestCancelledError:
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                self.count("failures_total")
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise LLMUnavailableError(f"The LLM call failed after {attempt + 1} attempt(s): {e}") from e
+
+                delay = backoff_seconds(attempt, self.backoff_base_seconds, self.backoff_max_seconds)
+                logging.warning(f"LLM attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s.")
+                remaining = remaining_seconds()
+                time.sleep(delay if remaining is None else min(delay, remaining))
+                self.count("retries_total")
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def hedged_attempt(self, request: Callable[[float], T], timeout: float,
+                       discard: Callable[[T], None] | None = None) -> T:
+        """
+        Make an attempt, sending a duplicate request if it is slower than the hedging
+        percentile of the recent latencies; the first successful request wins.
+
+        Raises:
+            TimeoutError: If no request succeeded within the timeout.
+        """
+        start = time.monotonic()
+        hedge_delay = self.latencies.percentile(self.hedge_percentile) if self.hedge_percentile else None
+
+        def submit() -> Future:
+            self.count("attempts_total")
+            return _executor.submit(contextvars.copy_context().run, request, timeout)
+
+        def discard_when_done(future: Future) -> None:
+            if discard is not None:
+                future.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+
+        first = submit()
+        pending = {first}
+        error = None
+        while pending:
+            elapsed = time.monotonic() - start
+            wait_seconds = timeout - elapsed
+            if hedge_delay is not None and len(pending) == 1 and first in pending:
+                wait_seconds = min(wait_seconds, hedge_delay - elapsed)
+            done, pending = wait(pending, timeout=max(0.0, wait_seconds), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.record(time.monotonic() - start)
+                    if future is not first:
+                        self.count("hedge_wins_total")
+                    for loser in pending:
+                        discard_when_done(loser)
+                    return future.result()
+                error = future.exception()
+
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                for loser in pending:
+                    discard_when_done(loser)
+                raise TimeoutError(f"The LLM did not answer within {timeout:.2f}s")
+
+            # hedge the first request once it is slower than the percentile
+            if hedge_delay is not None and pending == {first} and elapsed >= hedge_delay:
+                self.count("hedges_total")
+                pending.add(submit())
+                hedge_delay = None
+
+        raise error
+
+
+# the circuit breaker of the OpenAI API, shared by all its calls
+openai_breaker = CircuitBreaker()
+
+# the calls to the OpenAI API, one per kind of call so that each is hedged on its own latencies:
+# the streamed change identification is timed to its first chunk, the summary to its full completion
+identification_calls = ResilientLLM(breaker=openai_breaker)
+summarization_calls = ResilientLLM(breaker=openai_breaker)
@@ -5,12 +5,29 @@ to test the changes between 2 versions fo a GraphQL schema.
 
 """
 # import packages
-from fastapi import FastAPI, HTTPException, Query
-from starlette.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from contextlib import AsyncExitStack
+import asyncio
+import functools
 import logging
 
 # import custom method
-from schema_diff_report import graphql_diff_report
+from request_coalescing import coalesced_graphql_diff_report, diff_requests, request_key
+from subgraph_diff import diff_subgraphs
+from three_way_diff import three_way_diff_report
+from report_serialization import report_response, server_sent_event
+from diff_store import DiffStore, DiffNotFoundError, is_storable_report
+from memory_profiling import memory_profiled_diff_report
+from cpu_profiling import PROFILERS, ProfilingNotAuthorizedError, check_profile_token, cpu_profiled_diff_report
+from speculative_diff import speculative_diff
+from llm_resilience import identification_calls, summarization_calls
+from compatibility_check import check_compatibility
+from diff_jobs import JobQueue, JobNotFoundError, JOB_WORKERS, start_worker_pool, stop_worker_pool
+from request_cancellation import RequestCancelledError, DeadlineExceededError
+from admission_control import AdmissionController, OverloadedError, SchemaTooLargeError, check_schema_sizes
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -19,12 +36,86 @@ logger = logging.getLogger(__name__)
 # Set the title of the FastAPI application
 app = FastAPI(title="graph-schema-difference-Georgios-Etsias")
 
+# bounded queue of the diff computations
+admission = AdmissionController()
+
+# the stored diffs served by the /diffs/ endpoints, opened on startup
+diff_store: DiffStore | None = None
+
+# the asynchronous diff jobs, run by worker processes, opened on startup
+job_queue: JobQueue | None = None
+job_workers = None
+
+
+class SubgraphSchemas(BaseModel):
+    """
+    The two versions of a single federated subgraph schema.
+    """
+    name: str
+    schema1: str
+    schema2: str
+
+
+class DiffRequest(BaseModel):
+    """
+    The two versions of a schema to diff and store.
+    """
+    schema1: str
+    schema2: str
+    identify_changes_technique: str = "algorithmic"
+    summarization_technique: str = "algorithmic"
+    rename_detection: bool = False
+    impact_analysis: bool = False
+
+
+class ThreeWayDiffRequest(BaseModel):
+    """
+    Two branches of a schema to compare against their merge base.
+    """
+    base: str
+    schema_a: str
+    schema_b: str
+    identify_changes_technique: str = "single-pass"
+    summarization_technique: str = "algorithmic"
+    rename_detection: bool = False
+
+
+def admission_http_error(e: Exception) -> HTTPException | None:
+    """
+    Map the admission control and cancellation errors to their HTTP error.
+
+    Args:
+        e (Exception): The error raised while handling a request.
+
+    Returns:
+        HTTPException | None: The HTTP error, or None if the error is not an admission error.
+    """
+    if isinstance(e, SchemaTooLargeError):
+        return HTTPException(status_code=413, detail=str(e))
+    elif isinstance(e, OverloadedError):
+        return HTTPException(status_code=e.status_code, detail=str(e),
+                             headers={"Retry-After": "1", "X-Queue-Depth": str(admission.queued)})
+    elif isinstance(e, DeadlineExceededError):
+        return HTTPException(status_code=504, detail=str(e))
+    elif isinstance(e, RequestCancelledError):
+        # the client is gone, nobody reads this response
+        return HTTPException(status_code=499, detail=str(e))
+
+    return None
+
+
 @app.get("/compare-schemas/")
-def compare_schemas_endpoint(
+async def compare_schemas_endpoint(
+    request: Request,
     schema1: str,
     schema2: str,
-    identify_changes_technique: str = Query("algorithmic", enum=["algorithmic", "GPT3.5"]),
-    summarization_technique: str = Query("algorithmic", enum=["algorithmic", "GPT3.5"])
+    identify_changes_technique: str = Query("algorithmic", enum=["algorithmic", "single-pass", "GPT3.5"]),
+    summarization_technique: str = Query("algorithmic", enum=["algorithmic", "GPT3.5"]),
+    rename_detection: bool = False,
+    impact_analysis: bool = False,
+    profile_memory: bool = False,
+    profile_cpu: str | None = Query(None, enum=list(PROFILERS)),
+    x_profile_token: str | None = Header(None)
 ):
     try:
         # Log the received schemas for debugging
@@ -34,18 +125,349 @@ def compare_schemas_endpoint(
         logger.debug(f"Technique of identifying schema changes: {identify_changes_technique}")
         logger.debug(f"Summarization Technique: {summarization_technique}")
 
-        # Pass the summarization technique to the graphql_diff_report
-        result = graphql_diff_report(schema1, schema2, identify_changes_technique, summarization_technique)
+        check_schema_sizes(schema1, schema2)
+
+        # Pass the summarization technique to the graphql_diff_report,
+        # sharing the computation of concurrent identical requests.
+        # The diff waits for a slot in the bounded queue, and is cancelled
+        # on deadline or client disconnect.
+        # A profiled diff is never shared, its profile would not be its own.
+        diff_report = memory_profiled_diff_report if profile_memory else coalesced_graphql_diff_report
+        if profile_cpu is not None:
+            if profile_memory:
+                raise HTTPException(status_code=400, detail="Profile either the memory or the CPU of a diff")
+            check_profile_token(x_profile_token)
+            diff_report = functools.partial(cpu_profiled_diff_report, profiler=profile_cpu)
+        async with admission.admit():
+            result = await admission.run(diff_report,
+                                         schema1, schema2, identify_changes_technique, summarization_technique,
+                                         rename_detection, impact_analysis,
+                                         is_disconnected=request.is_disconnected)
 
-        # Return the comparison result
-        return JSONResponse(content=result)
+        # Return the comparison result, compressed if the client accepts it
+        return report_response(result, request.headers.get("accept-encoding"))
+
+    except HTTPException:
+        raise
+
+    except ProfilingNotAuthorizedError as e:
+        logger.warning(f"Unauthorized CPU profiling request: {str(e)}")
+        raise HTTPException(status_code=403, detail=str(e))
 
     except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
         # Log the error for debugging
         logger.error(f"Error comparing schemas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing schemas: {str(e)}")
 
 
+@app.get("/check-compatibility/")
+async def check_compatibility_endpoint(
+    request: Request,
+    schema1: str,
+    schema2: str,
+    max_breaking: int | None = Query(1, ge=1),
+    identify_changes_technique: str = Query("single-pass", enum=["algorithmic", "single-pass"])
+):
+    """
+    Check whether schema2 is backwards compatible with schema1, stopping at the first
+    max_breaking breaking changes; returns the verdict and the breaking changes found.
+    """
+    try:
+        check_schema_sizes(schema1, schema2)
+
+        async with admission.admit():
+            result = await admission.run(check_compatibility,
+                                         schema1, schema2, max_breaking, identify_changes_technique,
+                                         is_disconnected=request.is_disconnected)
+
+        return report_response(result, request.headers.get("accept-encoding"))
+
+    except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
+        logger.error(f"Error checking the compatibility: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing schemas: {str(e)}")
+
+
+@app.get("/compare-schemas/stream")
+async def compare_schemas_stream_endpoint(
+    request: Request,
+    schema1: str,
+    schema2: str,
+    identify_changes_technique: str = Query("GPT3.5", enum=["algorithmic", "single-pass", "GPT3.5"]),
+    summarization_technique: str = Query("GPT3.5", enum=["algorithmic", "GPT3.5"]),
+    rename_detection: bool = False,
+    impact_analysis: bool = False
+):
+    """
+    Stream the diff of two schema versions as server-sent events: the algorithmic report
+    first, computed while GPT3.5 runs, then each change identified by GPT3.5 and the
+    LLM-enriched report once they arrive, and a final 'done' (or 'error') event.
+    """
+    # hold the diff slot before the response starts, so that rejections are real HTTP errors
+    slot = AsyncExitStack()
+    try:
+        check_schema_sizes(schema1, schema2)
+        await slot.enter_async_context(admission.admit())
+    except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
+        logger.error(f"Error streaming the schema comparison: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing schemas: {str(e)}")
+
+    async def events():
+        # the events are emitted from the diff's threads, and sent from the event loop
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def emit(event: str, data: dict | list) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+        try:
+            async with slot:
+                diff = asyncio.create_task(admission.run(speculative_diff,
+                                                         schema1, schema2, identify_changes_technique,
+                                                         summarization_technique, rename_detection,
+                                                         impact_analysis, emit,
+                                                         is_disconnected=request.is_disconnected))
+                while not (diff.done() and queue.empty()):
+                    next_event = asyncio.create_task(queue.get())
+                    await asyncio.wait({next_event, diff}, return_when=asyncio.FIRST_COMPLETED)
+                    if next_event.done():
+                        yield server_sent_event(*next_event.result())
+                    else:
+                        next_event.cancel()
+                diff.result()
+            yield server_sent_event("done", {})
+
+        except Exception as e:
+            # the deadline or the client disconnecting stopped the diff after the response started
+            http_error = admission_http_error(e)
+            if http_error is None:
+                logger.error(f"Error streaming the schema comparison: {str(e)}")
+            status_code = http_error.status_code if http_error is not None else 500
+            yield server_sent_event("error", {"status_code": status_code, "detail": str(e)})
+
+    # the slot is also released if the client disconnected before the stream started
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                             background=BackgroundTask(slot.aclose))
+
+
+@app.post("/compare-subgraphs/")
+async def compare_subgraphs_endpoint(
+    request: Request,
+    subgraphs: list[SubgraphSchemas],
+    summarization_technique: str = Query("algorithmic", enum=["algorithmic", "GPT3.5"])
+):
+    try:
+        logger.info(f"Received {len(subgraphs)} subgraph(s) for comparison.")
+
+        check_schema_sizes(*[schema for subgraph in subgraphs for schema in (subgraph.schema1, subgraph.schema2)])
+
+        # diff the subgraphs concurrently and aggregate their summary
+        async with admission.admit():
+            result = await admission.run(diff_subgraphs,
+                                         [(subgraph.name, subgraph.schema1, subgraph.schema2) for subgraph in subgraphs],
+                                         summarization_technique,
+                                         is_disconnected=request.is_disconnected)
+
+        return report_response(result, request.headers.get("accept-encoding"))
+
+    except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
+        logger.error(f"Error comparing subgraphs: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing subgraphs: {str(e)}")
+
+
+@app.post("/compare-three-way/")
+async def compare_three_way_endpoint(request: Request, diff_request: ThreeWayDiffRequest):
+    """
+    Compare two branches of a schema against their merge base, reporting the changes
+    of each branch and their conflicting edits.
+    """
+    try:
+        check_schema_sizes(diff_request.base, diff_request.schema_a, diff_request.schema_b)
+
+        async with admission.admit():
+            result = await admission.run(three_way_diff_report,
+                                         diff_request.base, diff_request.schema_a, diff_request.schema_b,
+                                         diff_request.identify_changes_technique,
+                                         diff_request.summarization_technique,
+                                         diff_request.rename_detection,
+                                         is_disconnected=request.is_disconnected)
+
+        return report_response(result, request.headers.get("accept-encoding"))
+
+    except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
+        logger.error(f"Error comparing the branches: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing schemas: {str(e)}")
+
+
+@app.post("/diffs/", status_code=201)
+async def create_diff_endpoint(request: Request, diff_request: DiffRequest):
+    """
+    Compute and store the diff of two schema versions, returning its id and release notes.
+    An identical request returns the stored diff instead of recomputing it.
+    """
+    try:
+        check_schema_sizes(diff_request.schema1, diff_request.schema2)
+
+        key = request_key(diff_request.schema1, diff_request.schema2,
+                          diff_request.identify_changes_technique, diff_request.summarization_technique,
+                          diff_request.rename_detection, diff_request.impact_analysis)
+        diff_id = await asyncio.to_thread(diff_store.find_diff, key)
+        if diff_id is None:
+            async with admission.admit():
+                result = await admission.run(coalesced_graphql_diff_report,
+                                             diff_request.schema1, diff_request.schema2,
+                                             diff_request.identify_changes_technique,
+                                             diff_request.summarization_technique,
+                                             diff_request.rename_detection,
+                                             diff_request.impact_analysis,
+                                             is_disconnected=request.is_disconnected)
+            if not is_storable_report(result):
+                raise HTTPException(status_code=422, detail=result)
+            diff_id = await asyncio.to_thread(diff_store.save_report, result, key)
+
+        return await asyncio.to_thread(diff_store.get_diff, diff_id)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        http_error = admission_http_error(e)
+        if http_error is not None:
+            raise http_error
+
+        logger.error(f"Error storing the diff: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing schemas: {str(e)}")
+
+
+@app.get("/diffs/{diff_id}")
+def get_diff_endpoint(diff_id: str):
+    """
+    Return the release notes and change counts of a stored diff.
+    """
+    try:
+        return diff_store.get_diff(diff_id)
+    except DiffNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Diff '{diff_id}' not found.")
+
+
+@app.get("/diffs/{diff_id}/changes")
+def diff_changes_endpoint(
+    request: Request,
+    diff_id: str,
+    breaking: bool | None = None,
+    type: str | None = None,
+    field: str | None = None,
+    kind: str | None = None,
+    limit: int = 100,
+    cursor: str | None = None
+):
+    """
+    Return a page of the changes of a stored diff, filtered by breaking flag, type, field
+    and change kind. Pass the returned next_cursor to get the following page.
+    """
+    try:
+        page = diff_store.query_changes(diff_id, breaking=breaking, type_name=type, field_name=field,
+                                        kind=kind, limit=limit, cursor=cursor)
+    except DiffNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Diff '{diff_id}' not found.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return report_response(page, request.headers.get("accept-encoding"))
+
+
+@app.on_event("startup")
+def open_stores():
+    """
+    Open the SQLite databases of the stored diffs and of the diff jobs (DIFF_STORE_PATH and
+    DIFF_JOBS_PATH), on startup rather than on import, so importing the app creates no files.
+    """
+    global diff_store, job_queue
+    diff_store = DiffStore()
+    job_queue = JobQueue()
+
+
+@app.on_event("startup")
+def start_job_workers():
+    """
+    Start the local diff job workers, unless they run separately (JOB_WORKERS=0).
+    """
+    global job_workers
+    if JOB_WORKERS > 0:
+        job_workers = start_worker_pool(JOB_WORKERS, job_queue.path)
+        logger.info(f"Started {JOB_WORKERS} diff job worker(s).")
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    if job_workers is not None:
+        stop_worker_pool(*job_workers)
+
+
+@app.post("/jobs/", status_code=202)
+def create_job_endpoint(diff_request: DiffRequest):
+    """
+    Queue the diff of two schema versions, returning the id to poll its status with.
+    """
+    try:
+        check_schema_sizes(diff_request.schema1, diff_request.schema2)
+    except SchemaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    job_id = job_queue.submit({
+        "schema_v1_str": diff_request.schema1,
+        "schema_v2_str": diff_request.schema2,
+        "identify_changes_technique": diff_request.identify_changes_technique,
+        "summarization_technique": diff_request.summarization_technique,
+        "rename_detection": diff_request.rename_detection,
+        "impact_analysis": diff_request.impact_analysis
+    })
+
+    return {"id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+def get_job_endpoint(request: Request, job_id: str):
+    """
+    Return the status and progress of a diff job, and its report once it succeeded.
+    """
+    try:
+        job = job_queue.get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+
+    return report_response(job, request.headers.get("accept-encoding"))
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Report the queue depth, the admission control counters and the state of the OpenAI calls.
+    """
+    return {**admission.metrics(), "coalesced_in_flight": diff_requests.in_flight(),
+            "llm": {"identification": identification_calls.metrics(), "summarization": summarization_calls.metrics()}}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,177 @@
+"""
+
+Script profiles the memory allocated by a diff report with tracemalloc: the peak
+and the allocations of each stage (normalization, parsing, identifying the changes
+and summarizing them), with the source lines allocating the most.
+
+tracemalloc traces the whole process, so allocations of diffs running concurrently
+in other threads are included; profiled runs themselves are serialized. Profiling
+slows the diff down about three times.
+
+"""
+# import packages
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable
+
+# import custom modules
+from diff_stages import listen_to_stages
+from schema_diff_report import graphql_diff_report
+
+# the number of frames stored per allocation
+TRACEMALLOC_FRAMES = int(os.getenv('TRACEMALLOC_FRAMES', '1'))
+# the number of top allocating source lines reported
+TOP_ALLOCATIONS = 10
+
+_profile_lock = threading.Lock()
+
+# the allocations of the profiling itself
+_ignored_files = {tracemalloc.__file__, __file__}
+
+# how to read the peak of a profile
+PEAK_BYTES_NOTE = ("peak_bytes is an upper bound: it adds the peak of each stage to the memory allocated by "
+                   "the previous stages, ignoring what they freed since.")
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, top: int,
+                    baseline: tracemalloc.Snapshot | None = None) -> list[dict]:
+    """
+    The source lines holding the most memory in a snapshot, or allocated the most since a baseline snapshot.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): The snapshot.
+        top (int): The number of source lines.
+        baseline (tracemalloc.Snapshot | None): The snapshot to subtract, if the traces were not cleared.
+
+    Returns:
+        list[dict]: The location, size and number of allocations of each line.
+    """
+    if baseline is None:
+        statistics = [(statistic.traceback[0], statistic.size, statistic.count)
+                      for statistic in snapshot.statistics('lineno')]
+    else:
+        statistics = [(statistic.traceback[0], statistic.size_diff, statistic.count_diff)
+                      for statistic in snapshot.compare_to(baseline, 'lineno') if statistic.size_diff > 0]
+    statistics = [statistic for statistic in statistics if statistic[0].filename not in _ignored_files]
+
+    return [
+        {
+            "location": f"{os.path.join(*frame.filename.split(os.sep)[-2:])}:{frame.lineno}",
+            "size_bytes": size,
+            "count": count
+        }
+        for frame, size, count in statistics[:top]
+    ]
+
+
+def merge_allocations(allocations: list[list[dict]], top: int) -> list[dict]:
+    """
+    Merge the top allocations of the stages, by source line.
+    """
+    merged = {}
+    for stage_allocations in allocations:
+        for allocation in stage_allocations:
+            total = merged.setdefault(allocation["location"], {**allocation, "size_bytes": 0, "count": 0})
+            total["size_bytes"] += allocation["size_bytes"]
+            total["count"] += allocation["count"]
+
+    return sorted(merged.values(), key=lambda allocation: allocation["size_bytes"], reverse=True)[:top]
+
+
+class MemoryProfiler:
+    """
+    Stage listener recording the memory allocated by each stage and still held at its end,
+    and the peak within it. If the profiler owns the tracing, the traces are cleared when a
+    stage starts, so that snapshots, which are slow to take on large heaps, only hold the
+    allocations of the stage. Otherwise the traces of the caller are kept, and the memory
+    traced when the stage starts is subtracted; the peak of the stage is then an upper bound,
+    as the caller's peak may predate it.
+    """
+
+    def __init__(self, top: int = TOP_ALLOCATIONS, clear_traces: bool = True):
+        self.top = top
+        self.clear_traces = clear_traces
+        self.stages = {}
+        self.held_bytes = 0
+        self.peak_bytes = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        baseline = None
+        if self.clear_traces:
+            tracemalloc.clear_traces()
+        else:
+            baseline = tracemalloc.take_snapshot()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            traced_bytes, traced_peak_bytes = tracemalloc.get_traced_memory()
+            allocated_bytes = traced_bytes - start_bytes
+            peak_bytes = max(traced_peak_bytes - start_bytes, allocated_bytes)
+            # the memory still held from the previous stages (ignoring its release) plus this stage's peak
+            self.peak_bytes = max(self.peak_bytes, self.held_bytes + peak_bytes)
+            self.held_bytes += allocated_bytes
+            self.stages[name] = {
+                "allocated_bytes": allocated_bytes,
+                "peak_bytes": peak_bytes,
+                "seconds": seconds,
+                "top_allocations": top_allocations(tracemalloc.take_snapshot(), self.top, baseline)
+            }
+
+
+def profile_memory(function: Callable, *args, top: int = TOP_ALLOCATIONS, **kwargs) -> tuple:
+    """
+    Run a function, typically graphql_diff_report, while tracing the memory allocations of its stages.
+
+    Args:
+        function (Callable): The function to profile.
+        top (int): The number of top allocating source lines reported per stage and overall.
+
+    Returns:
+        tuple: The result of the function, and its memory profile: the estimated (upper
+            bound) peak, the memory held at the end and the top allocations of the whole
+            run, and the allocations, peak and top allocations of each stage.
+    """
+    with _profile_lock:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+        # the traces of a caller tracing the memory itself are kept
+        profiler = MemoryProfiler(top, clear_traces=not was_tracing)
+        try:
+            with listen_to_stages(profiler.stage):
+                result = function(*args, **kwargs)
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+    profile = {
+        "peak_bytes": profiler.peak_bytes,
+        "peak_bytes_note": PEAK_BYTES_NOTE,
+        "allocated_bytes": profiler.held_bytes,
+        "stages": profiler.stages,
+        "top_allocations": merge_allocations([stage["top_allocations"] for stage in profiler.stages.values()], top)
+    }
+
+    return result, profile
+
+
+def memory_profiled_diff_report(*args, **kwargs) -> dict | list:
+    """
+    Generate a diff report with graphql_diff_report, adding its memory profile to it.
+
+    Returns:
+        dict: The diff report, with its memory profile under 'memory_profile'.
+    """
+    report, profile = profile_memory(graphql_diff_report, *args, **kwargs)
+    if isinstance(report, dict):
+        return {**report, "memory_profile": profile}
+
+    return report
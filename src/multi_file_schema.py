@@ -0,0 +1,308 @@
+"""
+
+Script loads a version of a GraphQL schema split across many SDL files (e.g. with
+`extend type` definitions in separate files), given as files, directories or glob
+patterns. Each file is parsed on its own, in parallel, and its parsed document is
+cached by path, modification time and content digest, so that when a single file
+changes only that file is parsed again. The documents are then merged before
+building the schema.
+
+"""
+# import packages
+import glob
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from graphql import DocumentNode, GraphQLSchema, build_ast_schema, parse
+
+# import custom modules
+from schema_diff_report import normalize_schema_str, check_graphql_parsing_failure, parsed_schemas_diff_report
+from schema_digest import schema_digest
+from request_cancellation import check_cancelled
+from diff_stages import diff_stage
+from tracing import traced_diff_report
+
+# the files of a directory input that are schema files
+SCHEMA_FILE_EXTENSIONS = (".graphql", ".graphqls", ".gql")
+# the number of parsed files kept in the cache
+SCHEMA_FILE_CACHE_SIZE = int(os.getenv('SCHEMA_FILE_CACHE_SIZE', '10000'))
+# the number of built schemas kept in the cache, keyed by the digests of their files
+SCHEMA_CACHE_SIZE = 8
+# fewer files than this are parsed inline, as starting a worker pool costs more than it saves
+PARALLEL_PARSE_MIN_FILES = 8
+
+
+def expand_schema_paths(inputs: list[str]) -> list[str]:
+    """
+    Expand the schema inputs into the paths of their files: a directory stands for the
+    schema files below it, and a glob pattern (e.g. 'schema/**/*.graphql') for the files
+    it matches, both in path order. Other inputs are file paths, kept as given.
+
+    Args:
+        inputs (list[str]): The files, directories and glob patterns.
+
+    Returns:
+        list[str]: The file paths, without duplicates.
+    """
+    paths = []
+    for schema_input in inputs:
+        if os.path.isdir(schema_input):
+            paths.extend(sorted(os.path.join(directory, file_name)
+                                for directory, _, file_names in os.walk(schema_input)
+                                for file_name in file_names if file_name.endswith(SCHEMA_FILE_EXTENSIONS)))
+        elif any(character in schema_input for character in "*?["):
+            paths.extend(sorted(path for path in glob.glob(schema_input, recursive=True) if os.path.isfile(path)))
+        else:
+            paths.append(schema_input)
+
+    return list(dict.fromkeys(paths))
+
+
+def read_schema_inputs(inputs: list[str]) -> str:
+    """
+    Read and concatenate the files of the schema inputs, in path order.
+
+    Args:
+        inputs (list[str]): The files, directories and glob patterns.
+
+    Returns:
+        str: The concatenated schema string.
+    """
+    schema_parts = []
+    for path in expand_schema_paths(inputs):
+        with open(path, encoding="utf-8") as schema_file:
+            schema_parts.append(schema_file.read())
+
+    return "\n".join(schema_parts)
+
+
+def parse_document(schema_str: str) -> DocumentNode:
+    """
+    Parse the SDL of a single file, without the locations the schema does not need.
+    """
+    if not schema_str.strip():
+        return DocumentNode(definitions=())
+
+    return parse(schema_str, no_location=True)
+
+
+class SchemaFileCache:
+    """
+    The parsed documents of schema files by path, valid while the modification time and
+    size of the file are unchanged, or else while the digest of its normalized content is,
+    so that touching or reformatting a file does not parse it again. The last schemas built
+    from the documents are kept as well, keyed by the paths and digests of their files.
+    """
+
+    def __init__(self, max_files: int = SCHEMA_FILE_CACHE_SIZE, max_schemas: int = SCHEMA_CACHE_SIZE):
+        self.max_files = max_files
+        self.max_schemas = max_schemas
+        # path -> (mtime_ns, size, digest, normalized content, document)
+        self.files = OrderedDict()
+        self.schemas = OrderedDict()
+        self.counters = {"file_hits": 0, "files_parsed": 0, "schema_hits": 0, "schemas_built": 0}
+        self.lock = threading.Lock()
+
+    def lookup(self, path: str) -> tuple[str, tuple]:
+        """
+        The cached entry of a file, if still valid, otherwise the file stat and content to parse.
+
+        Returns:
+            tuple[str, tuple]: ('hit', entry) or ('miss', (mtime_ns, size, digest, normalized content, content)).
+        """
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.files.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self.files.move_to_end(path)
+                self.counters["file_hits"] += 1
+                return "hit", entry
+
+        with open(path, encoding="utf-8") as schema_file:
+            content = schema_file.read()
+        schema_str = normalize_schema_str(content)
+        digest = hashlib.sha256(schema_str.encode("utf-8")).hexdigest()
+
+        if entry is not None and entry[2] == digest:
+            # touched or reformatted, but not changed
+            entry = (stat.st_mtime_ns, stat.st_size, *entry[2:])
+            self.store(path, entry)
+            with self.lock:
+                self.counters["file_hits"] += 1
+            return "hit", entry
+
+        return "miss", (stat.st_mtime_ns, stat.st_size, digest, schema_str, content)
+
+    def store(self, path: str, entry: tuple) -> None:
+        with self.lock:
+            self.files[path] = entry
+            self.files.move_to_end(path)
+            while len(self.files) > self.max_files:
+                self.files.popitem(last=False)
+
+    def get_schema(self, key: tuple) -> GraphQLSchema | None:
+        with self.lock:
+            schema = self.schemas.get(key)
+            if schema is not None:
+                self.schemas.move_to_end(key)
+                self.counters["schema_hits"] += 1
+            return schema
+
+    def store_schema(self, key: tuple, schema: GraphQLSchema) -> None:
+        with self.lock:
+            self.schemas[key] = schema
+            self.counters["schemas_built"] += 1
+            while len(self.schemas) > self.max_schemas:
+                self.schemas.popitem(last=False)
+
+
+# the cache shared by the loads that do not pass their own
+schema_file_cache = SchemaFileCache()
+
+
+def parse_files(misses: dict[str, tuple],
+                use_processes: bool = True,
+                max_workers: int | None = None) -> tuple[dict, dict]:
+    """
+    Parse the changed files, on a worker pool if there are many of them.
+
+    Args:
+        misses (dict[str, tuple]): The stat, digest, normalized content and content of each file to parse, by path.
+        use_processes (bool): Parse on worker processes, so that the CPU bound parsing runs
+            in parallel. If False, worker threads are used.
+        max_workers (int | None): The size of the worker pool. Defaults to the executor's own default.
+
+    Returns:
+        tuple[dict, dict]: The parsed document of each file, and the parsing error of the others, by path.
+    """
+    documents, errors = {}, {}
+    if len(misses) < PARALLEL_PARSE_MIN_FILES:
+        for path, (*_, content) in misses.items():
+            try:
+                documents[path] = parse_document(content)
+            except Exception as e:
+                errors[path] = e
+        return documents, errors
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = {path: executor.submit(parse_document, content) for path, (*_, content) in misses.items()}
+        for path, future in futures.items():
+            try:
+                documents[path] = future.result()
+            except Exception as e:
+                errors[path] = e
+
+    return documents, errors
+
+
+def load_schema(inputs: list[str],
+                cache: SchemaFileCache | None = None,
+                use_processes: bool = True,
+                max_workers: int | None = None) -> tuple[str, GraphQLSchema | dict]:
+    """
+    Load a version of a GraphQL schema from its files: parse the files that changed since
+    they were cached, merge the documents of all the files and build the schema.
+
+    Args:
+        inputs (list[str]): The files, directories and glob patterns of the schema.
+        cache (SchemaFileCache | None): The cache of the parsed files, defaults to the shared one.
+        use_processes (bool): Parse the files on worker processes rather than threads.
+        max_workers (int | None): The size of the worker pool.
+
+    Returns:
+        tuple[str, GraphQLSchema | dict]: The normalized schema string, the concatenation of
+            the files, and the parsed schema, or the failure output if it could not be parsed.
+    """
+    cache = schema_file_cache if cache is None else cache
+    paths = expand_schema_paths(inputs)
+    if not paths:
+        error_message = f"No schema files found in: {', '.join(inputs)}"
+        logging.error(error_message)
+        return "", {"status": "Failed", "reason": [error_message]}
+
+    entries, misses = {}, {}
+    for path in paths:
+        outcome, entry = cache.lookup(path)
+        if outcome == "hit":
+            entries[path] = entry
+        else:
+            misses[path] = entry
+
+    if misses:
+        documents, errors = parse_files(misses, use_processes, max_workers)
+        for path, document in documents.items():
+            entries[path] = (*misses[path][:4], document)
+            cache.store(path, entries[path])
+        with cache.lock:
+            cache.counters["files_parsed"] += len(misses)
+
+        if errors:
+            schema_str = " ".join(entries[path][3] if path in entries else misses[path][3] for path in paths)
+            error_message = "; ".join(f"Error parsing schema file {path}. Exception: {e}" for path, e in errors.items())
+            logging.error(error_message)
+            return schema_str, {"status": "Failed", "reason": [error_message]}
+
+    schema_str = " ".join(entries[path][3] for path in paths if entries[path][3])
+
+    key = tuple((path, entries[path][2]) for path in paths)
+    schema = cache.get_schema(key)
+    if schema is None:
+        document = DocumentNode(definitions=tuple(definition for path in paths
+                                                  for definition in entries[path][4].definitions))
+        try:
+            schema = build_ast_schema(document)
+            # compute the digest of the schema once, while it is built
+            schema_digest(schema)
+        except Exception as e:
+            error_message = f"Error building the schema of {len(paths)} file(s). Exception: {e}"
+            logging.error(error_message)
+            return schema_str, {"status": "Failed", "reason": [error_message]}
+        cache.store_schema(key, schema)
+
+    return schema_str, schema
+
+
+@traced_diff_report
+def multi_file_diff_report(schema_v1_inputs: list[str],
+                           schema_v2_inputs: list[str],
+                           identify_changes_technique: str,
+                           summarization_technique: str,
+                           rename_detection: bool = False,
+                           impact_analysis: bool = False,
+                           cache: SchemaFileCache | None = None) -> dict | list:
+    """
+    Generate the diff report of two versions of a GraphQL schema split across files.
+
+    Args:
+        schema_v1_inputs (list[str]): The files, directories and glob patterns of the first version.
+        schema_v2_inputs (list[str]): The files, directories and glob patterns of the second version.
+        identify_changes_technique (str): The technique for identifying the schema changes
+            could be: 'algorithmic', 'single-pass' or 'GPT3.5' based
+        summarization_technique (str): The technique for generating the summary could
+            be: 'algorithmic' or 'GPT3.5' based
+        rename_detection (bool): Whether to report the renamed types, fields and arguments as renames
+        impact_analysis (bool): Whether to annotate each change with the root operation fields reaching it
+        cache (SchemaFileCache | None): The cache of the parsed files, defaults to the shared one.
+
+    Returns:
+        dict | list: The diff report, or the parsing failure output.
+    """
+    with diff_stage("parse_schema"):
+        schema_v1_str, schema_version1 = load_schema(schema_v1_inputs, cache)
+        schema_v2_str, schema_version2 = load_schema(schema_v2_inputs, cache)
+
+    parsing_failure = check_graphql_parsing_failure(schema_version1, schema_version2)
+    if parsing_failure is not None:
+        return parsing_failure
+
+    # stop here if the request was cancelled while parsing
+    check_cancelled()
+
+    return parsed_schemas_diff_report(schema_version1, schema_version2,
+                                      schema_v1_str, schema_v2_str,
+                                      identify_changes_technique, summarization_technique,
+                                      rename_detection, impact_analysis)
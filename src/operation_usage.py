@@ -0,0 +1,232 @@
+"""
+
+Script indexes the usage of a GraphQL schema by a corpus of client operations,
+to rank the identified breaking changes by their impact.
+
+"""
+# import packages
+import logging
+import re
+from pathlib import Path
+from graphql import GraphQLSchema, TypeInfo, TypeInfoVisitor, Visitor, get_named_type, parse, visit
+
+# key of the usage index: (type name, field name or None, argument name or None)
+UsageKey = tuple[str, str | None, str | None]
+
+# the argument of the argument changes of compare_schemas, which is only named in their change message
+ARGUMENT_CHANGE = re.compile(r"(Renamed or removed argument|Renamed input parameter|Added new input parameter) '([^']*)'")
+
+
+class UsageCollector(Visitor):
+    """
+    Collect the (type, field, argument) keys a single operation document uses.
+    """
+
+    def __init__(self, type_info: TypeInfo):
+        super().__init__()
+        self.type_info = type_info
+        self.keys: set[UsageKey] = set()
+        # names of the fields enclosing the visited node
+        self.field_names: list[str] = []
+
+    def add_type(self, graphql_type) -> None:
+        named_type = get_named_type(graphql_type)
+        if named_type is not None:
+            self.keys.add((named_type.name, None, None))
+
+    def enter_operation_definition(self, node, *_args):
+        self.add_type(self.type_info.get_type())
+
+    def enter_inline_fragment(self, node, *_args):
+        self.add_type(self.type_info.get_type())
+
+    def enter_fragment_definition(self, node, *_args):
+        self.add_type(self.type_info.get_type())
+
+    def enter_variable_definition(self, node, *_args):
+        self.add_type(self.type_info.get_input_type())
+
+    def enter_field(self, node, *_args):
+        self.field_names.append(node.name.value)
+        parent_type = self.type_info.get_parent_type()
+        if parent_type is None or self.type_info.get_field_def() is None:
+            return
+        self.keys.add((parent_type.name, node.name.value, None))
+        self.add_type(self.type_info.get_type())
+
+    def leave_field(self, node, *_args):
+        self.field_names.pop()
+
+    def enter_argument(self, node, *_args):
+        # directive arguments are not arguments of the schema fields
+        if self.type_info.get_directive() is not None:
+            return
+        parent_type = self.type_info.get_parent_type()
+        if parent_type is None or self.type_info.get_argument() is None:
+            return
+        self.keys.add((parent_type.name, self.field_names[-1], node.name.value))
+
+
+class OperationUsageIndex:
+    """
+    Inverted index from the (type, field, argument) members of a schema to the IDs
+    of the client operations using them. The index is built once, and each change
+    is then annotated with constant time lookups.
+    """
+
+    def __init__(self, schema: GraphQLSchema):
+        self.schema = schema
+        self.index: dict[UsageKey, set[str]] = {}
+        self.operation_count = 0
+        self.failed_operations: dict[str, str] = {}
+
+    def add_operation(self, operation_id: str, document_str: str) -> None:
+        """
+        Parse a client operation document and add its usages to the index.
+
+        Args:
+            operation_id (str): The ID of the persisted operation.
+            document_str (str): The GraphQL query document of the operation.
+        """
+        try:
+            document = parse(document_str)
+        except Exception as e:
+            logging.error(f"Unable to parse operation '{operation_id}'. Exception: {e}")
+            self.failed_operations[operation_id] = str(e)
+            return
+
+        type_info = TypeInfo(self.schema)
+        collector = UsageCollector(type_info)
+        visit(document, TypeInfoVisitor(type_info, collector))
+
+        for key in collector.keys:
+            self.index.setdefault(key, set()).add(operation_id)
+        self.operation_count += 1
+
+    def operations_using(self, type_name: str, field_name: str | None = None,
+                         argument_name: str | None = None) -> set[str]:
+        """
+        Look up the operations using a type, a field of a type or an argument of a field.
+
+        Returns:
+            set[str]: The IDs of the operations using the schema member.
+        """
+        return self.index.get((type_name, field_name, argument_name), set())
+
+    def operations_affected_by(self, change: dict) -> set[str]:
+        """
+        Look up the operations affected by a single change record.
+
+        Args:
+            change (dict): A change record, as returned by compare_schemas.
+
+        Returns:
+            set[str]: The IDs of the operations using the changed schema member.
+        """
+        type_name = change.get('type')
+        if type_name is None:
+            return set()
+
+        argument_name = change.get('argument')
+        if argument_name is None and change.get('field') is not None:
+            argument_change = ARGUMENT_CHANGE.match(change.get('change', ''))
+            if argument_change is not None:
+                argument_name = argument_change.group(2)
+
+        return self.operations_using(type_name, change.get('field'), argument_name)
+
+
+def build_operation_usage_index(schema: GraphQLSchema, operations: dict[str, str]) -> OperationUsageIndex:
+    """
+    Build the usage index of a schema from a corpus of client operations.
+
+    Args:
+        schema (GraphQLSchema): The schema the operations are executed against.
+        operations (dict[str, str]): The operation documents, keyed by operation ID.
+
+    Returns:
+        OperationUsageIndex: The inverted usage index.
+    """
+    usage_index = OperationUsageIndex(schema)
+    for operation_id, document_str in operations.items():
+        usage_index.add_operation(operation_id, document_str)
+
+    logging.info(f'Usage index built from {usage_index.operation_count} operation(s).')
+
+    return usage_index
+
+
+def load_operations(directory: str, pattern: str = "**/*.graphql") -> dict[str, str]:
+    """
+    Load a corpus of persisted operations, using each file's relative path as its ID.
+
+    Args:
+        directory (str): The directory containing the operation documents.
+        pattern (str): The glob pattern of the operation documents.
+
+    Returns:
+        dict[str, str]: The operation documents, keyed by operation ID.
+    """
+    root = Path(directory)
+    return {path.relative_to(root).as_posix(): path.read_text(encoding="utf-8")
+            for path in sorted(root.glob(pattern)) if path.is_file()}
+
+
+def annotate_changes_with_usage(changes: list[dict], usage_index: OperationUsageIndex) -> list[dict]:
+    """
+    Annotate each breaking change with the client operations it breaks.
+
+    Args:
+        changes (list[dict]): The changes, as returned by compare_schemas.
+        usage_index (OperationUsageIndex): The usage index of the first schema version.
+
+    Returns:
+        list[dict]: The changes, each with the 'affected_operations' it breaks.
+    """
+    annotated_changes = []
+    for change in changes:
+        # failed comparisons are passed through untouched
+        if 'status' in change:
+            annotated_changes.append(change)
+            continue
+
+        affected_operations = usage_index.operations_affected_by(change) if change['breaking'] else set()
+        annotated_changes.append({**change, "affected_operations": sorted(affected_operations)})
+
+    return annotated_changes
+
+
+def rank_changes_by_impact(changes: list[dict], usage_index: OperationUsageIndex) -> list[dict]:
+    """
+    Rank the changes by the number of client operations they break, most urgent first.
+    Changes with the same impact keep their original order.
+
+    Args:
+        changes (list[dict]): The changes, as returned by compare_schemas.
+        usage_index (OperationUsageIndex): The usage index of the first schema version.
+
+    Returns:
+        list[dict]: The annotated changes, ordered by descending impact.
+    """
+    annotated_changes = annotate_changes_with_usage(changes, usage_index)
+
+    return sorted(annotated_changes, key=lambda change: -len(change.get("affected_operations", ())))
+
+
+if __name__ == "__main__":
+    import json
+    from schema_changes import compare_schemas
+    from schema_diff_report import parse_schema
+
+    schema_v1 = parse_schema("""
+    type Book { id: ID! title: String! }
+    type Query { getBookById(id: ID!): Book getAllBooks: [Book] }""")
+    schema_v2 = parse_schema("""
+    type Book { id: Int title: String! }
+    type Query { getBookById(id: ID!): Book }""")
+
+    usage = build_operation_usage_index(schema_v1, {
+        "book.graphql": "query Book($id: ID!) { getBookById(id: $id) { id title } }",
+        "books.graphql": "query Books { getAllBooks { title } }",
+    })
+    print(json.dumps(rank_changes_by_impact(compare_schemas(schema_v1, schema_v2), usage), indent=4))
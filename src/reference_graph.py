@@ -0,0 +1,218 @@
+"""
+
+Script indexes which fields and arguments reference each type of a GraphQL schema,
+and annotates changes with the root operation fields (of Query, Mutation and
+Subscription) that can reach the changed type, i.e. the operations they affect.
+
+The index is built once per schema, in a single pass over its types; the root fields
+reaching every type are then propagated over the index in linear time.
+
+"""
+# import packages
+import weakref
+from graphql import GraphQLSchema, get_named_type
+
+_indexes: "weakref.WeakKeyDictionary[GraphQLSchema, ReferenceIndex]" = weakref.WeakKeyDictionary()
+
+
+class ReferenceIndex:
+    """
+    The reverse references of a schema: for each type, the (type, field) pairs referencing
+    it through the type of a field, argument or input field. Union members are referenced
+    by the union and the implementations of an interface by the interface, with no field.
+    """
+
+    def __init__(self, schema: GraphQLSchema):
+        self.root_type_fields = {root_type.name: list(root_type.fields) for root_type in
+                                 (schema.query_type, schema.mutation_type, schema.subscription_type)
+                                 if root_type is not None}
+        self.root_types = frozenset(self.root_type_fields)
+        self.referrers: dict[str, list[tuple[str, str | None]]] = {}
+        self._root_field_names: list[str] = []
+        self._reaching_root_fields: dict[str, int] | None = None
+        self._root_fields: dict[str, list[str]] = {}
+
+        for type_name, graphql_type in schema.type_map.items():
+            if type_name.startswith("__"):
+                continue
+
+            for field_name, field in (getattr(graphql_type, "fields", None) or {}).items():
+                self.add_reference(get_named_type(field.type).name, type_name, field_name)
+                for argument in (getattr(field, "args", None) or {}).values():
+                    self.add_reference(get_named_type(argument.type).name, type_name, field_name)
+
+            for interface in getattr(graphql_type, "interfaces", None) or ():
+                self.add_reference(type_name, interface.name, None)
+
+            for member_type in getattr(graphql_type, "types", None) or ():
+                self.add_reference(member_type.name, type_name, None)
+
+    def add_reference(self, type_name: str, referrer_type: str, referrer_field: str | None) -> None:
+        self.referrers.setdefault(type_name, []).append((referrer_type, referrer_field))
+
+    def reaching_root_fields(self) -> dict[str, int]:
+        """
+        The root fields reaching each type, as bitsets over the root field names. The types of
+        each strongly connected component reach each other, so the components are visited in
+        topological order, each inheriting the root fields of the components referencing it.
+
+        Returns:
+            dict[str, int]: The bitset of the root fields reaching each referenced type.
+        """
+        if self._reaching_root_fields is not None:
+            return self._reaching_root_fields
+
+        root_field_bits = {}
+        for type_name, field_names in self.root_type_fields.items():
+            for field_name in field_names:
+                root_field_bits[(type_name, field_name)] = 1 << len(self._root_field_names)
+                self._root_field_names.append(f"{type_name}.{field_name}")
+
+        reaching = {}
+        for component in strongly_connected_components(self.referrers):
+            members = set(component)
+            bits = 0
+            for type_name in component:
+                for referrer_type, referrer_field in self.referrers.get(type_name, ()):
+                    if referrer_type in self.root_types:
+                        bits |= root_field_bits.get((referrer_type, referrer_field), 0)
+                    if referrer_type not in members:
+                        bits |= reaching.get(referrer_type, 0)
+            for type_name in component:
+                reaching[type_name] = bits
+
+        self._reaching_root_fields = reaching
+        return reaching
+
+    def root_fields(self, type_name: str, field_name: str | None = None) -> list[str]:
+        """
+        The root fields that can reach a type, or the root field itself for a field of a root type.
+
+        Args:
+            type_name (str): The name of the type.
+            field_name (str | None): The name of the field of the type, if any.
+
+        Returns:
+            list[str]: The root fields, e.g. 'Query.book', of Query, Mutation then Subscription.
+        """
+        if type_name in self.root_types:
+            if field_name is not None:
+                return [f"{type_name}.{field_name}"]
+            # a change of a root type itself affects all its fields
+            return [f"{type_name}.{name}" for name in self.root_type_fields[type_name]]
+
+        root_fields = self._root_fields.get(type_name)
+        if root_fields is None:
+            bits = self.reaching_root_fields().get(type_name, 0)
+            root_fields = []
+            while bits:
+                lowest_bit = bits & -bits
+                root_fields.append(self._root_field_names[lowest_bit.bit_length() - 1])
+                bits ^= lowest_bit
+            self._root_fields[type_name] = root_fields
+
+        return list(root_fields)
+
+
+def strongly_connected_components(referrers: dict[str, list[tuple[str, str | None]]]) -> list[list[str]]:
+    """
+    The strongly connected components of the reference graph, iteratively (Tarjan), in
+    topological order: each component comes after the components referencing it.
+
+    Args:
+        referrers (dict): The referrers of each type.
+
+    Returns:
+        list[list[str]]: The type names of each component.
+    """
+    index_of, low_link = {}, {}
+    stack, on_stack = [], set()
+    components = []
+
+    for start in referrers:
+        if start in index_of:
+            continue
+
+        # depth-first search over the referrers, with an explicit stack of iterators
+        index_of[start] = low_link[start] = len(index_of)
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(referrers.get(start, ())))]
+        while work:
+            type_name, referrer_iterator = work[-1]
+            for referrer_type, _ in referrer_iterator:
+                if referrer_type not in index_of:
+                    index_of[referrer_type] = low_link[referrer_type] = len(index_of)
+                    stack.append(referrer_type)
+                    on_stack.add(referrer_type)
+                    work.append((referrer_type, iter(referrers.get(referrer_type, ()))))
+                    break
+                if referrer_type in on_stack:
+                    low_link[type_name] = min(low_link[type_name], index_of[referrer_type])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[type_name])
+                if low_link[type_name] == index_of[type_name]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == type_name:
+                            break
+                    components.append(component)
+
+    # the search follows the references backwards, so the components referencing a
+    # component are completed before it
+    return components
+
+
+def reference_index(schema: GraphQLSchema) -> ReferenceIndex:
+    """
+    The reference index of a schema, built once for the lifetime of the schema.
+
+    Args:
+        schema (GraphQLSchema): The parsed GraphQL schema.
+
+    Returns:
+        ReferenceIndex: The index of the schema.
+    """
+    index = _indexes.get(schema)
+    if index is None:
+        index = _indexes[schema] = ReferenceIndex(schema)
+
+    return index
+
+
+def annotate_impact(schema_version1: GraphQLSchema,
+                    schema_version2: GraphQLSchema,
+                    changes: list[dict]) -> list[dict]:
+    """
+    Annotate each change with the root operation fields reaching the changed type, in the
+    first version of the schema, or in the second one for the types it added.
+
+    Args:
+        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        changes (list[dict]): The changes between the two versions.
+
+    Returns:
+        list[dict]: The changes, with their 'affected_root_fields'.
+    """
+    index_v1 = reference_index(schema_version1)
+    index_v2 = reference_index(schema_version2)
+
+    annotated = []
+    for change in changes:
+        type_name = change.get("type")
+        if type_name in schema_version1.type_map:
+            affected = index_v1.root_fields(type_name, change.get("field"))
+        elif type_name in schema_version2.type_map:
+            affected = index_v2.root_fields(type_name, change.get("field"))
+        else:
+            affected = []
+        annotated.append({**change, "affected_root_fields": affected})
+
+    return annotated
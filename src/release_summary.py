@@ -4,11 +4,16 @@ Script generates the release summary, for a given release changes
 list of dictionaries.
 
 """
+import logging
 import os
 from dotenv import load_dotenv
 
 # import packages
 from gpt35_summarization import initialize_langchain
+from request_cancellation import check_cancelled
+from hierarchical_summary import summarize_hierarchically
+from tracing import trace_llm_call
+from llm_resilience import LLMUnavailableError, summarization_calls
 
 # Load environment variables from .env file
 load_dotenv()
@@ -73,17 +78,44 @@ def generate_release_summary(changes: list, summarization: str) -> dict:
 
         # calling LLM to create a summary
         elif summarization == 'GPT3.5':
-            # call the GPT3.5 chain
-            chain = initialize_langchain(api_key=MY_API_KEY)
-
-            if breaking_change_messages:
-                breaking_changes = "\n".join(breaking_change_messages)
-                breaking_summary = chain.run({"schema_changes": breaking_changes})
-                summary += f"Breaking changes: {breaking_summary}. "
-            if non_breaking_change_messages:
-                non_breaking_changes = "\n".join(non_breaking_change_messages)
-                non_breaking_summary = chain.run({"schema_changes": non_breaking_changes})
-                summary += f"Non-breaking changes: {non_breaking_summary}."
+            # call the GPT3.5 chain, on token-budgeted chunks of the messages,
+            # each call with timeouts, retries and hedging
+            def summarize_attempt(schema_changes: str, timeout: float) -> str:
+                # the chain of each attempt is bounded by the attempt's timeout, within the deadline
+                chain = initialize_langchain(api_key=MY_API_KEY, request_timeout=timeout)
+                return chain.run({"schema_changes": schema_changes})
+
+            def summarize(schema_changes: str) -> str:
+                with trace_llm_call("summarize", "gpt-3.5-turbo", schema_changes):
+                    return summarization_calls.call(lambda timeout: summarize_attempt(schema_changes, timeout))
+            summarization_stats = {}
+
+            try:
+                if breaking_change_messages:
+                    check_cancelled()
+                    breaking_summary = summarize_hierarchically(breaking_change_messages, summarize)
+                    summarization_stats["breaking"] = breaking_summary["stats"]
+                    summary += f"Breaking changes: {breaking_summary['summary']}. "
+                if non_breaking_change_messages:
+                    check_cancelled()
+                    non_breaking_summary = summarize_hierarchically(non_breaking_change_messages, summarize)
+                    summarization_stats["non_breaking"] = non_breaking_summary["stats"]
+                    summary += f"Non-breaking changes: {non_breaking_summary['summary']}."
+
+            except LLMUnavailableError as e:
+                # fall back to the algorithmic summary, rather than failing the report
+                logging.warning(f"GPT3.5 summarization unavailable, falling back to the algorithmic one: {e}")
+                changes_with_summary = generate_release_summary(changes, 'algorithmic')
+                changes_with_summary["release_notes"]["fallback"] = {"technique": "algorithmic", "reason": str(e)}
+                return changes_with_summary
+
+            return {
+                "changes": changes,
+                "release_notes": {
+                    "summary": summary,
+                    "summarization_stats": summarization_stats
+                }
+            }
 
         return {
             "changes": changes,
@@ -0,0 +1,410 @@
+"""
+
+Script detects the types, fields and arguments renamed between two versions of
+a GraphQL schema, which the comparison otherwise reports as a removal and an
+addition, and replaces those change pairs with rename changes.
+
+Candidate pairs are found through an index instead of comparing every removed
+member with every added one: types are bucketed by a signature of their rarest
+members (prefix filtering), fields and arguments by their type and then by
+the trigrams of their name.
+
+"""
+# import packages
+import math
+from collections import Counter, defaultdict
+from graphql import GraphQLSchema, get_named_type
+
+# import custom modules
+from schema_changes import identify_graphql_type, \
+    type_removed_change, type_added_change, field_removed_change, new_field_added_change, \
+    argument_renamed_change, argument_removed_change, argument_added_change
+from schema_diff_engine import BUILT_IN_SCALARS, OBJECT_KINDS, diff_type, diff_field
+from request_cancellation import check_cancelled
+
+# the minimum Jaccard similarity of the members of two types to be considered a rename
+TYPE_SIMILARITY_THRESHOLD = 0.5
+
+# the minimum trigram similarity of the names of two fields or arguments of the same
+# type, when more than one of them was removed or added, to be considered a rename
+NAME_SIMILARITY_THRESHOLD = 0.3
+
+
+def type_renamed_change(old_type_name: str, new_type_name: str) -> dict:
+    """
+    Create a change record for a renamed type.
+
+    Args:
+        old_type_name (str): Old name of the type.
+        new_type_name (str): New name of the type.
+
+    Returns:
+        Dict: A change record indicating a type rename.
+    """
+    return {
+        "type": new_type_name,
+        "change": f"Type '{old_type_name}' was renamed to '{new_type_name}'",
+        "breaking": True,
+        "release_note": f"The type '{old_type_name}' has been renamed to '{new_type_name}'. This is a breaking change, so make sure to update any queries and fragments that use `{old_type_name}`."
+    }
+
+
+def field_renamed_change(type_name: str, old_field_name: str, new_field_name: str) -> dict:
+    """
+    Create a change record for a renamed field.
+
+    Args:
+        type_name (str): Name of the type.
+        old_field_name (str): Old name of the field.
+        new_field_name (str): New name of the field.
+
+    Returns:
+        Dict: A change record indicating a field rename.
+    """
+    return {
+        "type": type_name,
+        "field": new_field_name,
+        "change": f"Renamed field '{old_field_name}' to '{new_field_name}'",
+        "breaking": True,
+        "release_note": f"The field '{old_field_name}' on type '{type_name}' has been renamed to '{new_field_name}'. This is a breaking change, so make sure to update any queries that use `{old_field_name}`."
+    }
+
+
+# ----  similarity ---- #
+
+def type_members(graphql_type) -> frozenset[str]:
+    """
+    The members describing the structure of a type: its fields with their types,
+    its enum values or its union members. Scalars have none.
+    """
+    kind = identify_graphql_type(graphql_type)
+    if kind in (*OBJECT_KINDS, "GraphQLInputObjectType"):
+        return frozenset(f"{field_name}:{field.type}" for field_name, field in graphql_type.fields.items())
+    elif kind == "GraphQLEnumType":
+        return frozenset(graphql_type.values)
+    elif kind == "GraphQLUnionType":
+        return frozenset(member.name for member in graphql_type.types)
+
+    return frozenset()
+
+
+def argument_members(field) -> frozenset[str]:
+    """
+    The arguments of a field with their types.
+    """
+    return frozenset(f"{arg_name}:{arg.type}" for arg_name, arg in getattr(field, "args", {}).items())
+
+
+def name_trigrams(name: str) -> frozenset[str]:
+    """
+    The character trigrams of a name, ignoring case, with markers at its start and end.
+    """
+    name = f"^{name.lower()}$"
+    return frozenset(name[i:i + 3] for i in range(len(name) - 2))
+
+
+def jaccard_similarity(members_v1: frozenset, members_v2: frozenset) -> float:
+    """
+    The Jaccard similarity of two sets, 1.0 if both are empty.
+    """
+    if not members_v1 and not members_v2:
+        return 1.0
+
+    return len(members_v1 & members_v2) / len(members_v1 | members_v2)
+
+
+def name_similarity(name_v1: str, name_v2: str) -> float:
+    """
+    The similarity of two names between 0 and 1, as the Jaccard similarity of their trigrams.
+    """
+    return jaccard_similarity(name_trigrams(name_v1), name_trigrams(name_v2))
+
+
+def greedy_matching(candidates: list[tuple[tuple, str, str]]) -> list[tuple[str, str]]:
+    """
+    Pair removed with added names, taking the most similar candidate pairs first.
+
+    Args:
+        candidates (list[tuple[tuple, str, str]]): The (score, removed name, added name) candidate pairs.
+
+    Returns:
+        list[tuple[str, str]]: The (removed name, added name) pairs, each name used once.
+    """
+    matched_removed, matched_added, pairs = set(), set(), []
+    for _, removed_name, added_name in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+        if removed_name in matched_removed or added_name in matched_added:
+            continue
+        matched_removed.add(removed_name)
+        matched_added.add(added_name)
+        pairs.append((removed_name, added_name))
+
+    return pairs
+
+
+# ----  candidate index ---- #
+
+def signature_prefix(members: frozenset[str], rank: dict[str, tuple], threshold: float) -> list[str]:
+    """
+    The rarest members of a set, just enough that any set with a Jaccard similarity
+    of at least the threshold shares one of them with it.
+
+    Args:
+        members (frozenset[str]): The members of a set.
+        rank (dict[str, tuple]): The global order of the members, rarest first.
+        threshold (float): The minimum Jaccard similarity.
+
+    Returns:
+        list[str]: The signature of the set.
+    """
+    prefix_length = len(members) - math.ceil(threshold * len(members)) + 1
+
+    return sorted(members, key=rank.__getitem__)[:prefix_length]
+
+
+def similar_pairs(removed_sets: dict[str, frozenset], added_sets: dict[str, frozenset],
+                  threshold: float) -> list[tuple[float, str, str]]:
+    """
+    Find the pairs of removed and added sets with a Jaccard similarity of at least the
+    threshold. The candidates are the pairs sharing a member of their signature, so
+    that members common to many sets (like an 'id' field) do not make every pair a candidate.
+
+    Args:
+        removed_sets (dict[str, frozenset]): The non-empty sets of the removed members, by name.
+        added_sets (dict[str, frozenset]): The non-empty sets of the added members, by name.
+        threshold (float): The minimum Jaccard similarity, above 0.
+
+    Returns:
+        list[tuple[float, str, str]]: The (similarity, removed name, added name) pairs.
+    """
+    frequency = Counter()
+    for sets in (removed_sets, added_sets):
+        for members in sets.values():
+            frequency.update(members)
+    rank = {member: (count, member) for member, count in frequency.items()}
+
+    buckets = defaultdict(lambda: ([], []))
+    for side, sets in enumerate((removed_sets, added_sets)):
+        for name, members in sets.items():
+            for member in signature_prefix(members, rank, threshold):
+                buckets[member][side].append(name)
+
+    compared, pairs = set(), []
+    for removed_names, added_names in buckets.values():
+        for removed_name in removed_names:
+            for added_name in added_names:
+                if (removed_name, added_name) in compared:
+                    continue
+                compared.add((removed_name, added_name))
+                similarity = jaccard_similarity(removed_sets[removed_name], added_sets[added_name])
+                if similarity >= threshold:
+                    pairs.append((similarity, removed_name, added_name))
+
+    return pairs
+
+
+def match_renamed_types(removed_types: dict, added_types: dict,
+                        threshold: float = TYPE_SIMILARITY_THRESHOLD) -> list[tuple[str, str]]:
+    """
+    Match removed with added types of the same kind whose members are similar.
+
+    Args:
+        removed_types (dict): The types only in the first version, by name.
+        added_types (dict): The types only in the second version, by name.
+        threshold (float): The minimum Jaccard similarity of the members of a renamed type.
+
+    Returns:
+        list[tuple[str, str]]: The (old name, new name) pairs of the renamed types.
+    """
+    kinds = defaultdict(lambda: ({}, {}))
+    for side, types in enumerate((removed_types, added_types)):
+        for type_name, graphql_type in types.items():
+            members = type_members(graphql_type)
+            if members:
+                kinds[identify_graphql_type(graphql_type)][side][type_name] = members
+
+    candidates = []
+    for removed_sets, added_sets in kinds.values():
+        for similarity, removed_name, added_name in similar_pairs(removed_sets, added_sets, threshold):
+            candidates.append(((similarity, name_similarity(removed_name, added_name)), removed_name, added_name))
+
+    return greedy_matching(candidates)
+
+
+def type_key(graphql_type, type_renames: dict[str, str]) -> str:
+    """
+    The type of a field or argument as a string, under the new name of its named type if it was renamed.
+    """
+    type_name = get_named_type(graphql_type).name
+    if type_name in type_renames:
+        return str(graphql_type).replace(type_name, type_renames[type_name])
+
+    return str(graphql_type)
+
+
+def match_renamed_members(removed_members: dict, added_members: dict,
+                          type_renames: dict[str, str]) -> list[tuple[str, str]]:
+    """
+    Match removed with added fields or arguments of the same type. A pair is a rename
+    if it is the only removed and added member of its type, or if the names are similar.
+
+    Args:
+        removed_members (dict): The fields or arguments only in the first version, by name.
+        added_members (dict): The fields or arguments only in the second version, by name.
+        type_renames (dict[str, str]): The new names of the renamed types, by old name.
+
+    Returns:
+        list[tuple[str, str]]: The (old name, new name) pairs of the renamed members.
+    """
+    buckets = defaultdict(lambda: ({}, {}))
+    for side, members in enumerate((removed_members, added_members)):
+        for name, member in members.items():
+            buckets[type_key(member.type, type_renames if side == 0 else {})][side][name] = name_trigrams(name)
+
+    candidates = []
+    for removed_names, added_names in buckets.values():
+        if len(removed_names) == 1 and len(added_names) == 1:
+            pairs = [(name_similarity(*removed_names, *added_names), *removed_names, *added_names)]
+        else:
+            pairs = similar_pairs(removed_names, added_names, NAME_SIMILARITY_THRESHOLD)
+
+        for similarity, removed_name, added_name in pairs:
+            # prefer the fields keeping their arguments
+            args_similarity = jaccard_similarity(argument_members(removed_members[removed_name]),
+                                                 argument_members(added_members[added_name]))
+            candidates.append(((similarity, args_similarity), removed_name, added_name))
+
+    return greedy_matching(candidates)
+
+
+# ----  rewrite the changes ---- #
+
+def record_key(change: dict) -> frozenset:
+    """
+    A hashable key of a change record.
+    """
+    return frozenset(change.items())
+
+
+def apply_renames(changes: list[dict], renames: list[tuple[dict, dict, list[dict]]]) -> list[dict]:
+    """
+    Replace the removal of each renamed member with its rename changes and drop its addition.
+    Renames whose removal or addition is not among the changes are ignored.
+
+    Args:
+        changes (list[dict]): The detected changes.
+        renames (list[tuple[dict, dict, list[dict]]]): The removal and addition records
+            of each renamed member, with the records replacing them.
+
+    Returns:
+        list[dict]: The changes with the renames applied.
+    """
+    keys = {record_key(change) for change in changes}
+    replaced, dropped = {}, set()
+    for removed_change, added_change, rename_changes in renames:
+        removed_key, added_key = record_key(removed_change), record_key(added_change)
+        if removed_key in keys and added_key in keys:
+            replaced[removed_key] = rename_changes
+            dropped.add(added_key)
+
+    if not replaced:
+        return changes
+
+    renamed_changes = []
+    for change in changes:
+        key = record_key(change)
+        if key in replaced:
+            renamed_changes.extend(replaced[key])
+        elif key not in dropped:
+            renamed_changes.append(change)
+
+    return renamed_changes
+
+
+def custom_types(schema: GraphQLSchema) -> dict:
+    """
+    The named types of a schema, without the built-in scalars and introspection types.
+    """
+    return {type_name: graphql_type for type_name, graphql_type in schema.type_map.items()
+            if not type_name.startswith("__") and type_name not in BUILT_IN_SCALARS}
+
+
+def detect_renames(schema_version1: GraphQLSchema,
+                   schema_version2: GraphQLSchema,
+                   changes: list[dict],
+                   extended: bool = False) -> list[dict]:
+    """
+    Detect the types, fields and arguments renamed between two versions of a schema,
+    and replace their removal and addition changes with rename changes. The field and
+    argument changes of renamed types and fields are added after their rename change.
+
+    Args:
+        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        changes (list[dict]): The changes detected by compare_schemas or diff_schemas.
+        extended (bool): The changes were detected by diff_schemas, so the changes of
+            renamed types and fields include the change kinds compare_schemas does not detect.
+
+    Returns:
+        list[dict]: The changes with the renames.
+    """
+    types_v1 = custom_types(schema_version1)
+    types_v2 = custom_types(schema_version2)
+
+    # types
+    removed_types = {type_name: graphql_type for type_name, graphql_type in types_v1.items() if type_name not in types_v2}
+    added_types = {type_name: graphql_type for type_name, graphql_type in types_v2.items() if type_name not in types_v1}
+    renamed_types = match_renamed_types(removed_types, added_types)
+    type_renames = dict(renamed_types)
+
+    changes = apply_renames(changes, [
+        (type_removed_change(old_name), type_added_change(new_name),
+         [type_renamed_change(old_name, new_name),
+          *diff_type(new_name, identify_graphql_type(types_v2[new_name]), types_v1[old_name], types_v2[new_name],
+                     extended)])
+        for old_name, new_name in renamed_types])
+
+    # the type pairs, under their new name
+    type_pairs = [(type_name, types_v1[type_name], types_v2[type_name]) for type_name in types_v1
+                  if type_name in types_v2]
+    type_pairs.extend((new_name, types_v1[old_name], types_v2[new_name]) for old_name, new_name in renamed_types)
+
+    # fields
+    field_renames, field_pairs = [], []
+    for type_name, type_v1, type_v2 in type_pairs:
+        check_cancelled()
+        if identify_graphql_type(type_v1) not in OBJECT_KINDS or identify_graphql_type(type_v2) not in OBJECT_KINDS:
+            continue
+
+        fields_v1, fields_v2 = type_v1.fields, type_v2.fields
+        field_pairs.extend((type_name, field_name, fields_v1[field_name], fields_v2[field_name])
+                           for field_name in fields_v1 if field_name in fields_v2)
+
+        removed_fields = {name: field for name, field in fields_v1.items() if name not in fields_v2}
+        added_fields = {name: field for name, field in fields_v2.items() if name not in fields_v1}
+        if not removed_fields or not added_fields:
+            continue
+
+        for old_name, new_name in match_renamed_members(removed_fields, added_fields, type_renames):
+            field_renames.append((field_removed_change(type_name, old_name), new_field_added_change(type_name, new_name),
+                                  [field_renamed_change(type_name, old_name, new_name),
+                                   *diff_field(type_name, new_name, fields_v1[old_name], fields_v2[new_name],
+                                               extended, compare_type=False)]))
+            field_pairs.append((type_name, new_name, fields_v1[old_name], fields_v2[new_name]))
+
+    changes = apply_renames(changes, field_renames)
+
+    # arguments, compare_arguments already reports a single removed and added argument as a rename
+    argument_renames = []
+    for type_name, field_name, field_v1, field_v2 in field_pairs:
+        args_v1, args_v2 = field_v1.args, field_v2.args
+        removed_args = {name: arg for name, arg in args_v1.items() if name not in args_v2}
+        added_args = {name: arg for name, arg in args_v2.items() if name not in args_v1}
+        if not removed_args or not added_args or (len(removed_args) == 1 and len(added_args) == 1):
+            continue
+
+        for old_name, new_name in match_renamed_members(removed_args, added_args, type_renames):
+            argument_renames.append((argument_removed_change(type_name, field_name, old_name),
+                                     argument_added_change(type_name, field_name, new_name),
+                                     [argument_renamed_change(type_name, field_name, old_name, new_name)]))
+
+    return apply_renames(changes, argument_renames)
@@ -0,0 +1,164 @@
+"""
+
+Script serializes the diff reports to JSON, and compresses the large ones
+according to the encodings accepted by the client.
+
+"""
+# import packages
+import gzip
+import json
+import logging
+import os
+from starlette.responses import Response
+
+# optional faster JSON encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# optional brotli compression
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# responses smaller than this are not worth compressing
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
+# a single encoder instance, compact and without the circular reference check
+# (reports are trees of plain dicts and lists)
+_json_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(',', ':'))
+
+
+def encode_changes(changes: list) -> bytes:
+    """
+    Encode a list of change records to JSON, one record at a time.
+
+    Args:
+        changes (list): The change records.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON array.
+    """
+    encode = _json_encoder.encode
+    return ('[' + ','.join([encode(change) for change in changes]) + ']').encode('utf-8')
+
+
+def encode_report(report: dict | list) -> bytes:
+    """
+    Encode a diff report to JSON, with orjson if it is installed.
+
+    Args:
+        report (dict | list): The diff report, as returned by graphql_diff_report.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(report)
+        except TypeError as e:
+            logging.debug(f"orjson could not encode the report, falling back to json. Exception: {e}")
+
+    # encode the (potentially huge) change list record by record
+    if isinstance(report, dict) and isinstance(report.get('changes'), list):
+        encoded_changes = encode_changes(report['changes'])
+        rest = {key: value for key, value in report.items() if key != 'changes'}
+        encoded_rest = _json_encoder.encode(rest).encode('utf-8')
+        if rest:
+            return b'{"changes":' + encoded_changes + b',' + encoded_rest[1:]
+        return b'{"changes":' + encoded_changes + b'}'
+
+    return _json_encoder.encode(report).encode('utf-8')
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Choose the content encoding of a response from the client's Accept-Encoding header,
+    preferring brotli over gzip.
+
+    Args:
+        accept_encoding (str | None): The value of the Accept-Encoding header.
+
+    Returns:
+        str | None: 'br', 'gzip' or None if the body should not be compressed.
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    for coding in supported:
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+
+    return None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a response body with the negotiated encoding.
+
+    Args:
+        body (bytes): The response body.
+        encoding (str): 'br' or 'gzip'.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def report_response(report: dict | list, accept_encoding: str | None = None, status_code: int = 200) -> Response:
+    """
+    Build the HTTP response of a diff report, compressing bodies above COMPRESSION_MIN_BYTES.
+
+    Args:
+        report (dict | list): The diff report.
+        accept_encoding (str | None): The value of the client's Accept-Encoding header.
+        status_code (int): The HTTP status code of the response.
+
+    Returns:
+        Response: The JSON response.
+    """
+    body = encode_report(report)
+    headers = {"Vary": "Accept-Encoding"}
+
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESSION_MIN_BYTES else None
+    if encoding is not None:
+        body = compress_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def server_sent_event(event: str, data: dict | list) -> bytes:
+    """
+    Encode a report, or a part of it, as a server-sent event.
+
+    Args:
+        event (str): The name of the event.
+        data (dict | list): The data of the event.
+
+    Returns:
+        bytes: The event, in the text/event-stream format.
+    """
+    # the compact JSON encoding has no line breaks, the data fits a single 'data:' line
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + encode_report(data) + b"\n\n"
@@ -0,0 +1,105 @@
+"""
+
+Script provides cooperative cancellation of diff requests, through per-request
+deadlines and cancellation tokens checked between units of work.
+
+"""
+# import packages
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class RequestCancelledError(Exception):
+    """
+    Raised at a cancellation checkpoint, once the request has been cancelled.
+    """
+
+
+class DeadlineExceededError(RequestCancelledError):
+    """
+    Raised at a cancellation checkpoint, once the deadline of the request has passed.
+    """
+
+
+class CancellationToken:
+    """
+    Track whether a request was cancelled (e.g. its client disconnected) or ran out of time.
+    The work of the request polls the token at its checkpoints and stops there.
+    """
+
+    def __init__(self, deadline_seconds: float | None = None):
+        self.deadline = None if deadline_seconds is None else time.monotonic() + deadline_seconds
+        self.reason: str | None = None
+
+    def cancel(self, reason: str = "Request cancelled") -> None:
+        """
+        Cancel the request; the work stops at its next checkpoint.
+        """
+        if self.reason is None:
+            self.reason = reason
+
+    def remaining(self) -> float | None:
+        """
+        Returns:
+            float | None: The seconds left until the deadline, or None if there is no deadline.
+        """
+        if self.deadline is None:
+            return None
+
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self) -> bool:
+        """
+        Returns:
+            bool: True if the deadline has passed.
+        """
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self) -> None:
+        """
+        Raise if the request was cancelled or its deadline has passed.
+        """
+        if self.reason is not None:
+            raise RequestCancelledError(self.reason)
+        if self.expired():
+            raise DeadlineExceededError("Request deadline exceeded")
+
+
+# the cancellation token of the request executed in the current context
+current_token: ContextVar[CancellationToken | None] = ContextVar("current_token", default=None)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """
+    Make a token the cancellation token of the work executed in the current context.
+    """
+    reset_token = current_token.set(token)
+    try:
+        yield token
+    finally:
+        current_token.reset(reset_token)
+
+
+def check_cancelled() -> None:
+    """
+    Cancellation checkpoint: raise if the current request was cancelled or timed out.
+    It is a no-op outside a cancellation scope.
+    """
+    token = current_token.get()
+    if token is not None:
+        token.check()
+
+
+def remaining_seconds() -> float | None:
+    """
+    Returns:
+        float | None: The seconds left until the current request's deadline, or None
+            if there is no deadline. Used as the timeout of blocking upstream calls.
+    """
+    token = current_token.get()
+    if token is None:
+        return None
+
+    return token.remaining()
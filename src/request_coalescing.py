@@ -0,0 +1,155 @@
+"""
+
+Script coalesces concurrent identical diff requests, so that the same
+schema pair is only computed once while the computation is in flight.
+
+"""
+# import packages
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable
+
+# import custom modules
+from schema_diff_report import graphql_diff_report, normalize_schema_str
+from request_cancellation import RequestCancelledError, check_cancelled, remaining_seconds
+
+# how often a waiting caller checks whether its own request was cancelled
+WAIT_CHECK_INTERVAL_SECONDS = 0.25
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time. Callers arriving while a computation
+    with the same key is in flight wait for it and share its result (or exception),
+    instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+
+    def do(self, key: str, function: Callable, *args, **kwargs) -> tuple[Any, bool]:
+        """
+        Run a function, or wait for the in-flight run with the same key.
+
+        Args:
+            key (str): The key identifying identical computations.
+            function (Callable): The computation to run.
+
+        Returns:
+            tuple[Any, bool]: The result of the computation, and whether it was shared
+                with an in-flight call rather than computed by this one.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not leader:
+            try:
+                return self.wait(future), True
+            except RequestCancelledError:
+                # re-raise if this caller was cancelled, otherwise the cancelled
+                # computation was another caller's: take it over
+                check_cancelled()
+                return self.do(key, function, *args, **kwargs)
+
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        return future.result(), False
+
+    @staticmethod
+    def wait(future: Future) -> Any:
+        """
+        Wait for an in-flight computation, while honouring the cancellation of the waiting request.
+
+        Args:
+            future (Future): The future of the in-flight computation.
+
+        Returns:
+            Any: The result of the computation.
+        """
+        while True:
+            check_cancelled()
+            remaining = remaining_seconds()
+            timeout = WAIT_CHECK_INTERVAL_SECONDS if remaining is None else min(WAIT_CHECK_INTERVAL_SECONDS, remaining)
+            try:
+                return future.result(timeout=timeout)
+            except TimeoutError:
+                continue
+
+    def in_flight(self) -> int:
+        """
+        Returns:
+            int: The number of computations currently in flight.
+        """
+        with self._lock:
+            return len(self._in_flight)
+
+
+def request_key(schema_v1_str: str,
+                schema_v2_str: str,
+                identify_changes_technique: str,
+                summarization_technique: str,
+                *options) -> str:
+    """
+    Build the coalescing key of a diff request, from the digests of its normalized
+    schema strings, its techniques and any other option changing the report.
+
+    Returns:
+        str: The key of the request.
+    """
+    schema_v1_digest = hashlib.sha256(normalize_schema_str(schema_v1_str).encode("utf-8")).hexdigest()
+    schema_v2_digest = hashlib.sha256(normalize_schema_str(schema_v2_str).encode("utf-8")).hexdigest()
+
+    return ":".join([schema_v1_digest, schema_v2_digest, identify_changes_technique, summarization_technique,
+                     *map(str, options)])
+
+
+# the diff requests in flight in this process
+diff_requests = SingleFlight()
+
+
+def coalesced_graphql_diff_report(schema_v1_str: str,
+                                  schema_v2_str: str,
+                                  identify_changes_technique: str,
+                                  summarization_technique: str,
+                                  rename_detection: bool = False,
+                                  impact_analysis: bool = False) -> dict | list:
+    """
+    Generate the diff report of two schema versions, sharing the in-flight computation
+    of any concurrent identical request. The shared report must not be mutated.
+
+    Args:
+        schema_v1_str (str): the string of the first version of the GraphQL schema
+        schema_v2_str (str): the string of the second version of the GraphQL schema
+        identify_changes_technique (str): The technique for identifying the schema changes
+            could be: 'algorithmic' or 'GPT3.5' based
+        summarization_technique (str): The technique for generating the summary could
+            be: 'algorithmic' or 'GPT3.5' based
+        rename_detection (bool): Whether to report the renamed types, fields and arguments as renames
+        impact_analysis (bool): Whether to annotate each change with the root operation fields reaching it
+
+    Returns:
+        dict: A dictionary with the changes and the summary report.
+    """
+    key = request_key(schema_v1_str, schema_v2_str, identify_changes_technique, summarization_technique,
+                      rename_detection, impact_analysis)
+    report, shared = diff_requests.do(key, graphql_diff_report,
+                                      schema_v1_str, schema_v2_str,
+                                      identify_changes_technique, summarization_technique,
+                                      rename_detection, impact_analysis)
+    if shared:
+        logging.info('Diff report shared with a concurrent identical request.')
+
+    return report
@@ -9,16 +9,22 @@ from graphql import GraphQLSchema, GraphQLObjectType, GraphQLInterfaceType, Grap
 import logging
 from typing import List, Dict
 
+# import custom modules
+from request_cancellation import RequestCancelledError, check_cancelled
+from compact_schema import CompactSchema, CompactType, CompactField
+from tracing import trace_type_comparison
+
 
 # ----  check types ---- #
 
-def compare_types(schema_version1: GraphQLSchema, schema_version2: GraphQLSchema) -> list[dict]:
+def compare_types(schema_version1: GraphQLSchema | CompactSchema,
+                  schema_version2: GraphQLSchema | CompactSchema) -> list[dict]:
     """
     Compare types between two schemas and detect type-level changes.
 
     Args:
-        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
-        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        schema_version1 (GraphQLSchema | CompactSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema | CompactSchema): The second version of the GraphQL schema.
 
     Returns:
         List[Dict]: List of changes detected at the type level.
@@ -26,6 +32,9 @@ def compare_types(schema_version1: GraphQLSchema, schema_version2: GraphQLSchema
 
     changes = []
     for type_name, type_v1 in schema_version1.type_map.items():
+        # stop here if the request was cancelled
+        check_cancelled()
+
         if type_name.startswith("__"):  # Skip internal types (e.g., introspection types)
             continue
 
@@ -52,7 +61,8 @@ def compare_types(schema_version1: GraphQLSchema, schema_version2: GraphQLSchema
 
             else:
                 # if the 2 types have identical GraphQL type check their fields
-                changes.extend(compare_type_fields(type_name, type_v1, type_v2))
+                with trace_type_comparison(type_name, type_v1):
+                    changes.extend(compare_type_fields(type_name, type_v1, type_v2))
 
     # Check for new types in schema_version2
     for type_name in schema_version2.type_map:
@@ -75,7 +85,9 @@ def identify_graphql_type(graphql_type):
     :param graphql_type:
     :return:
     """
-    if isinstance(graphql_type, GraphQLObjectType):
+    if isinstance(graphql_type, CompactType):
+        return graphql_type.kind
+    elif isinstance(graphql_type, GraphQLObjectType):
         return "GraphQLObjectType"
     elif isinstance(graphql_type, GraphQLInterfaceType):
         return "GraphQLInterfaceType"
@@ -162,13 +174,15 @@ def compare_type_fields(type_name: str, type_v1, type_v2) -> list[dict]:
         List[Dict]: List of changes detected at the field level.
     """
     changes = []
+    type_v1_type = identify_graphql_type(type_v1)
+    type_v2_type = identify_graphql_type(type_v2)
 
-    if isinstance(type_v1, (GraphQLObjectType, GraphQLInterfaceType)) and isinstance(type_v2, (
-    GraphQLObjectType, GraphQLInterfaceType)):
+    if type_v1_type in ("GraphQLObjectType", "GraphQLInterfaceType") and type_v2_type in (
+    "GraphQLObjectType", "GraphQLInterfaceType"):
         changes.extend(compare_existing_fields(type_name, type_v1, type_v2))
         changes.extend(compare_new_fields(type_name, type_v1, type_v2))
 
-    elif isinstance(type_v1, GraphQLEnumType):
+    elif type_v1_type == "GraphQLEnumType":
         changes.extend(compare_enum_type_values(type_name, type_v1, type_v2))
 
 
@@ -247,6 +261,10 @@ def get_field_type_name(field_v1) -> str:
     Returns:
         str: The name of the field type, or an empty string if no name is found.
     """
+    # the compact model derives it from its tuple-encoded type reference
+    if isinstance(field_v1, CompactField):
+        return field_v1.type_name
+
     # Declare the main variable type
     field_name: str = ""
 
@@ -420,13 +438,7 @@ def compare_arguments(type_name: str, field_name: str, field_v1, field_v2) -> li
 
         # Check for newly added parameters
         for new_param_name in only_new_args:
-            changes.append({
-                    "type": type_name,
-                    "field": field_name,
-                    "change": f"Added new input parameter '{new_param_name}'",
-                    "breaking": False,
-                    "release_note": f"The input parameter `{new_param_name}` has been added."
-                })
+            changes.append(argument_added_change(type_name, field_name, new_param_name))
 
     return changes
 
@@ -453,6 +465,27 @@ def argument_renamed_change(type_name: str, field_name: str, old_param_name: str
     }
 
 
+def argument_added_change(type_name: str, field_name: str, arg_name: str) -> dict:
+    """
+    Create a change record for a new argument.
+
+    Args:
+        type_name (str): Name of the type.
+        field_name (str): Name of the field.
+        arg_name (str): Name of the new argument.
+
+    Returns:
+        Dict: A change record indicating an argument addition.
+    """
+    return {
+        "type": type_name,
+        "field": field_name,
+        "change": f"Added new input parameter '{arg_name}'",
+        "breaking": False,
+        "release_note": f"The input parameter `{arg_name}` has been added."
+    }
+
+
 def argument_removed_change(type_name: str, field_name: str, arg_name: str) -> dict:
     """
     Create a change record for a removed or renamed argument.
@@ -475,14 +508,15 @@ def argument_removed_change(type_name: str, field_name: str, arg_name: str) -> d
 
 
 # ---- main method --- #
-def compare_schemas(schema_version1: GraphQLSchema,
-                    schema_version2: GraphQLSchema) -> list[dict]:
+def compare_schemas(schema_version1: GraphQLSchema | CompactSchema,
+                    schema_version2: GraphQLSchema | CompactSchema) -> list[dict]:
     """
     Compare two GraphQL schemas and detect breaking/non-breaking changes.
+    The schemas can be either graphql-core schemas or their compact models.
 
     Args:
-        schema_version1 (GraphQLSchema): The GraphQL schema in version 1 as a string.
-        schema_version2 (GraphQLSchema): The GraphQL schema in version 2 as a string.
+        schema_version1 (GraphQLSchema | CompactSchema): The GraphQL schema in version 1 as a string.
+        schema_version2 (GraphQLSchema | CompactSchema): The GraphQL schema in version 2 as a string.
 
     Returns:
         List[Dict]: List of changes detected between the two schemas.
@@ -491,6 +525,8 @@ def compare_schemas(schema_version1: GraphQLSchema,
         changes = compare_types(schema_version1, schema_version2)
         logging.info('Schema differences successfully identified.')
 
+    except RequestCancelledError:
+        raise
 
     except Exception as e:
         message = f"Unable to check differences in schema. Error comparing schemas: {e}"
@@ -1,24 +1,67 @@
 """
 
-Script calls GPT3.5 model to identify changes in a GraphQL schema.
+Script calls GPT3.5 model to identify changes in a GraphQL schema. The completion is
+streamed, and each change is parsed as soon as it is complete.
 
 """
 # import packages
 import openai
 import json
 import os
+from typing import Callable, Iterator
 from dotenv import load_dotenv
 
+# import custom modules
+from request_cancellation import RequestCancelledError, check_cancelled
+from tracing import trace_llm_call
+from incremental_json import IncrementalJSONArrayParser
+from llm_resilience import LLMUnavailableError, identification_calls
+
 # Load environment variables from .env file
 load_dotenv()
 
 # get the api key
 MY_API_KEY = os.getenv('MY_API_KEY')
 
-# Initialize the OpenAI client
-client = openai.OpenAI(api_key=MY_API_KEY)
+# Initialize the OpenAI client, the retries are made by llm_resilience
+client = openai.OpenAI(api_key=MY_API_KEY, max_retries=0)
+
 
-def analyze_schema_changes(schema_v1, schema_v2):
+def read_completion_stream(first_chunk, chunks: Iterator) -> Iterator:
+    """
+    Yield the chunks of a streamed completion, raising LLMUnavailableError if the
+    stream breaks once it started (it is not retried, its changes were already emitted).
+    """
+    if first_chunk is None:
+        return
+    yield first_chunk
+
+    try:
+        yield from chunks
+    except RequestCancelledError:
+        raise
+    except Exception as e:
+        identification_calls.breaker.record_failure()
+        raise LLMUnavailableError(f"The completion stream of the LLM broke: {e}") from e
+
+
+def analyze_schema_changes(schema_v1, schema_v2, on_change: Callable[[dict], None] | None = None):
+    """
+    Identify the changes between two versions of a GraphQL schema with GPT3.5. The
+    completion is streamed and parsed incrementally, so that each change is available as
+    soon as the model wrote it, and a malformed change does not discard the others.
+
+    Args:
+        schema_v1 (str): The first version of the GraphQL schema.
+        schema_v2 (str): The second version of the GraphQL schema.
+        on_change (Callable[[dict], None] | None): Called with each change as soon as it is parsed.
+
+    Returns:
+        list[dict] | dict: The changes, or an error if the output holds no JSON array.
+
+    Raises:
+        LLMUnavailableError: If the model did not answer, see llm_resilience.
+    """
     # Prepare the messages for the chat
     messages = [
         {"role": "user", "content": "Forget all previous interactions."},
@@ -54,28 +97,51 @@ def analyze_schema_changes(schema_v1, schema_v2):
         """}
     ]
 
-    # Make the API call using the new chat completion method
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        max_tokens=4096,
-        temperature=0
-    )
-
-    # Access the response content
-    changes = response.choices[0].message.content.strip()
-
-    # Parse the response text to JSON
-    try:
-        # Remove the 'json' prefix
-        changes = changes.replace("json", "", 1).strip()
-        # Replace backticks with nothing
-        changes = changes.replace('```', '').strip()
-        # Parse the JSON string
-        changes = json.loads(changes)
-
-    except json.JSONDecodeError:
-        changes = {"error": "Failed to parse the response. Please check the model's output format."}
+    # do not call the model if the request was already cancelled
+    check_cancelled()
+
+    def open_stream(timeout: float):
+        # an attempt lasts until the first chunk of the completion, the latency that is
+        # retried and hedged, each read of the stream is then bounded by the timeout
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=4096,
+            temperature=0,
+            timeout=timeout,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        chunks = iter(stream)
+        return stream, next(chunks, None), chunks
+
+    # Make the API call using the new chat completion method, streaming the completion,
+    # bounded by the deadline of the request if there is one
+    changes = []
+    parser = IncrementalJSONArrayParser()
+    with trace_llm_call("identify_changes", "gpt-3.5-turbo", messages[-1]["content"]) as span:
+        stream, first_chunk, chunks = identification_calls.call(open_stream, discard=lambda opened: opened[0].close())
+        with stream:
+            for chunk in read_completion_stream(first_chunk, chunks):
+                # stop reading the completion if the request was cancelled
+                check_cancelled()
+
+                if span is not None and chunk.usage is not None:
+                    span.set_attributes(**{"gen_ai.usage.input_tokens": chunk.usage.prompt_tokens,
+                                           "gen_ai.usage.output_tokens": chunk.usage.completion_tokens})
+
+                for choice in chunk.choices:
+                    # parse the changes completed by the chunk
+                    for change in parser.feed(choice.delta.content or ""):
+                        changes.append(change)
+                        if on_change is not None:
+                            on_change(change)
+
+        if span is not None:
+            span.set_attributes(**{"llm.changes": len(changes), "llm.malformed_changes": parser.malformed})
+
+    if not parser.started:
+        return {"error": "Failed to parse the response. Please check the model's output format."}
 
     return changes
 
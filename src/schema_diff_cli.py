@@ -0,0 +1,188 @@
+"""
+
+Script provides a command line interface, to generate the diff report of two
+versions of a GraphQL schema stored in files.
+
+"""
+# import packages
+import argparse
+import json
+import logging
+import os
+import threading
+
+# import custom modules
+from schema_watch import SchemaWatcher, read_schema_files, serve_reports
+from memory_profiling import memory_profiled_diff_report
+from cpu_profiling import PROFILERS, cpu_profiled_diff_report
+from schema_lifetime import EVENTS, SchemaLifetime
+from compatibility_check import check_compatibility
+from multi_file_schema import multi_file_diff_report, read_schema_inputs
+
+SUMMARIZATION_TECHNIQUES = ["algorithmic", "GPT3.5"]
+IDENTIFY_CHANGES_TECHNIQUES = ["algorithmic", "single-pass", "GPT3.5"]
+
+
+def positive_int(value: str) -> int:
+    """
+    Parse a command line argument that must be a positive integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser of the command line interface.
+
+    Returns:
+        argparse.ArgumentParser: The parser of the 'diff', 'watch' and 'lifetime' commands.
+    """
+    parser = argparse.ArgumentParser(description="Identify the changes between two versions of a GraphQL schema.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="Generate the diff report once.")
+    diff_parser.add_argument("schema1", help="The file, directory or quoted glob pattern of the first version "
+                                             "of the schema.")
+    diff_parser.add_argument("schema2", nargs="+", help="The file(s), directories or quoted glob patterns of the "
+                                                        "second version of the schema.")
+    # the check and the profiled diffs each generate their own report, so only one of them is run
+    diff_mode = diff_parser.add_mutually_exclusive_group()
+    diff_mode.add_argument("--profile-memory", action="store_true",
+                           help="Add the peak and per stage memory allocations to the report.")
+    diff_mode.add_argument("--profile-cpu", choices=PROFILERS, nargs="?", const="deterministic",
+                           help="Add the hottest functions and the time of each stage to the report, "
+                                "profiled with cProfile (default) or by sampling.")
+    diff_mode.add_argument("--check", type=positive_int, nargs="?", const=1, metavar="N",
+                           help="Only check for breaking changes, stopping at the first N (default 1); "
+                                "exits with status 1 if there are any.")
+
+    watch_parser = subparsers.add_parser("watch", help="Re-generate the diff report whenever the second version changes.")
+    watch_parser.add_argument("schema1", help="The file, directory or quoted glob pattern of the baseline version "
+                                              "of the schema.")
+    watch_parser.add_argument("schema2", nargs="+", help="The watched file(s), directories or quoted glob patterns "
+                                                         "of the second version of the schema.")
+    watch_parser.add_argument("--interval", type=float, default=0.5, help="The polling interval in seconds.")
+    watch_parser.add_argument("--debounce", type=float, default=0.3,
+                              help="The time in seconds the files must be stable before re-diffing.")
+    watch_parser.add_argument("--serve", type=int, metavar="PORT",
+                              help="Also serve the latest report as JSON over HTTP on this port.")
+
+    for subparser in (diff_parser, watch_parser):
+        subparser.add_argument("--identify-changes-technique", choices=IDENTIFY_CHANGES_TECHNIQUES, default="algorithmic")
+        subparser.add_argument("--summarization-technique", choices=SUMMARIZATION_TECHNIQUES, default="algorithmic")
+        subparser.add_argument("--detect-renames", action="store_true", dest="rename_detection",
+                               help="Report renamed types, fields and arguments as renames.")
+        subparser.add_argument("--impact-analysis", action="store_true",
+                               help="Annotate each change with the root operation fields reaching it.")
+
+    lifetime_parser = subparsers.add_parser("lifetime", help="Query the history of the members of many schema versions.")
+    lifetime_parser.add_argument("versions", nargs="+",
+                                 help="The schema file of each version, in release order, labelled by file name.")
+    lifetime_parser.add_argument("--event", choices=EVENTS, default="removed",
+                                 help="The event to list, e.g. the removed members.")
+    lifetime_parser.add_argument("--last", type=int, help="Only the events of the last versions.")
+    lifetime_parser.add_argument("--kind", choices=["type", "field", "argument", "input_field", "enum_value"],
+                                 help="Only the members of a kind.")
+    lifetime_parser.add_argument("--oldest-deprecated", type=int, metavar="LIMIT",
+                                 help="List the oldest deprecated members still present instead.")
+    lifetime_parser.add_argument("--member", help="Show the history of a single member instead, e.g. 'Book.title'.")
+
+    return parser
+
+
+def print_report(report: dict | list) -> None:
+    """
+    Print a diff report as JSON.
+    """
+    print(json.dumps(report, indent=4), flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Run the command line interface.
+
+    Args:
+        argv (list[str] | None): The command line arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit status, 1 if a compatibility check failed.
+    """
+    args = build_parser().parse_args(argv)
+
+    if args.command == "diff" and args.check is not None:
+        result = check_compatibility(read_schema_inputs([args.schema1]),
+                                     read_schema_inputs(args.schema2),
+                                     args.check,
+                                     args.identify_changes_technique)
+        print_report(result)
+        return 0 if isinstance(result, dict) and result.get("compatible") else 1
+
+    elif args.command == "diff" and args.profile_memory:
+        report = memory_profiled_diff_report(read_schema_inputs([args.schema1]),
+                                             read_schema_inputs(args.schema2),
+                                             args.identify_changes_technique,
+                                             args.summarization_technique,
+                                             args.rename_detection,
+                                             args.impact_analysis)
+        print_report(report)
+
+    elif args.command == "diff" and args.profile_cpu is not None:
+        report = cpu_profiled_diff_report(read_schema_inputs([args.schema1]),
+                                          read_schema_inputs(args.schema2),
+                                          args.identify_changes_technique,
+                                          args.summarization_technique,
+                                          args.rename_detection,
+                                          args.impact_analysis,
+                                          profiler=args.profile_cpu)
+        print_report(report)
+
+    elif args.command == "diff":
+        # the files of each version are parsed separately, and merged
+        report = multi_file_diff_report([args.schema1],
+                                        args.schema2,
+                                        args.identify_changes_technique,
+                                        args.summarization_technique,
+                                        args.rename_detection,
+                                        args.impact_analysis)
+        print_report(report)
+
+    elif args.command == "lifetime":
+        lifetime = SchemaLifetime.from_schema_strs(
+            (os.path.splitext(os.path.basename(path))[0], read_schema_files([path])) for path in args.versions
+        )
+        if args.member is not None:
+            print_report(lifetime.lifetime(args.member))
+        elif args.oldest_deprecated is not None:
+            print_report(lifetime.oldest_deprecated(args.oldest_deprecated, args.kind))
+        else:
+            print_report(lifetime.events(args.event, args.last, args.kind))
+
+    elif args.command == "watch":
+        watcher = SchemaWatcher(args.schema1, args.schema2,
+                                args.identify_changes_technique,
+                                args.summarization_technique,
+                                debounce_seconds=args.debounce,
+                                rename_detection=args.rename_detection,
+                                impact_analysis=args.impact_analysis)
+        if args.serve is not None:
+            serve_reports(watcher, port=args.serve)
+
+        logging.info(f"Watching {', '.join(args.schema2)} for changes.")
+        try:
+            watcher.run(print_report, interval_seconds=args.interval, stop_event=threading.Event())
+        except KeyboardInterrupt:
+            logging.info("Stopped watching.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
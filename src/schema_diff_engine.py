@@ -0,0 +1,602 @@
+"""
+
+Script identifies the differences between two versions of a GraphQL schema in a
+single pass, visiting each matched type once. Besides the changes compare_schemas
+detects, it reports argument type and default value changes, deprecation changes,
+input object field changes, union member changes and directive changes.
+
+"""
+# import packages
+import logging
+from typing import Iterator
+from graphql import GraphQLSchema, Undefined, ast_from_value, print_ast
+
+# import custom modules
+from request_cancellation import RequestCancelledError, check_cancelled
+from schema_changes import identify_graphql_type, get_field_type_name, compare_arguments, \
+    type_removed_change, type_added_change, type_type_changed_change, \
+    field_removed_change, new_field_added_change, field_type_changed_change, \
+    enum_value_removed_change, enum_value_added_change
+from tracing import trace_type_comparison, tracing_enabled
+
+# the built-in scalars, disregarded as compare_types does
+BUILT_IN_SCALARS = frozenset(['Int', 'Float', 'String', 'Boolean', 'ID'])
+
+OBJECT_KINDS = ("GraphQLObjectType", "GraphQLInterfaceType")
+
+
+# ----  extended change records ---- #
+
+def argument_type_changed_change(type_name: str, field_name: str, arg_name: str,
+                                 old_type: str, new_type: str) -> dict:
+    """
+    Create a change record for an argument type change. Only making a required
+    argument optional is non-breaking.
+
+    Args:
+        type_name (str): Name of the type.
+        field_name (str): Name of the field.
+        arg_name (str): Name of the argument.
+        old_type (str): The old type of the argument.
+        new_type (str): The new type of the argument.
+
+    Returns:
+        Dict: A change record indicating an argument type change.
+    """
+    breaking = old_type != new_type + '!'
+    return {
+        "type": type_name,
+        "field": field_name,
+        "argument": arg_name,
+        "change": f"Argument '{arg_name}' type changed from '{old_type}' to '{new_type}'",
+        "breaking": breaking,
+        "release_note": f"The type of argument '{arg_name}' in '{field_name}' on '{type_name}' has changed from "
+                        f"'{old_type}' to '{new_type}'. "
+                        + ("This is a breaking change." if breaking else "This is a non-breaking change.")
+    }
+
+
+def argument_default_changed_change(type_name: str, field_name: str, arg_name: str,
+                                    old_default: str | None, new_default: str | None) -> dict:
+    """
+    Create a change record for an argument default value change.
+
+    Args:
+        type_name (str): Name of the type.
+        field_name (str): Name of the field.
+        arg_name (str): Name of the argument.
+        old_default (str | None): The old default value, None if there was none.
+        new_default (str | None): The new default value, None if there is none.
+
+    Returns:
+        Dict: A change record indicating an argument default value change.
+    """
+    return {
+        "type": type_name,
+        "field": field_name,
+        "argument": arg_name,
+        "change": f"Default value of argument '{arg_name}' changed from '{old_default}' to '{new_default}'",
+        "breaking": False,
+        "release_note": f"The default value of argument '{arg_name}' in '{field_name}' on '{type_name}' has changed "
+                        f"from '{old_default}' to '{new_default}'. This is a non-breaking change, but queries "
+                        f"omitting the argument may return different results."
+    }
+
+
+def field_deprecation_changed_change(type_name: str, field_name: str, deprecation_reason: str | None) -> dict:
+    """
+    Create a change record for a field that was deprecated, or is no longer deprecated.
+
+    Args:
+        type_name (str): Name of the type.
+        field_name (str): Name of the field.
+        deprecation_reason (str | None): The new deprecation reason, None if the field is no longer deprecated.
+
+    Returns:
+        Dict: A change record indicating a deprecation change.
+    """
+    if deprecation_reason is None:
+        return {
+            "type": type_name,
+            "field": field_name,
+            "change": f"Field '{field_name}' is no longer deprecated",
+            "breaking": False,
+            "release_note": f"The field '{field_name}' on type '{type_name}' is no longer deprecated. "
+                            f"This is a non-breaking change."
+        }
+
+    return {
+        "type": type_name,
+        "field": field_name,
+        "change": f"Field '{field_name}' was deprecated",
+        "breaking": False,
+        "release_note": f"The field '{field_name}' on type '{type_name}' has been deprecated: {deprecation_reason}. "
+                        f"This is a non-breaking change, but queries should stop using this field."
+    }
+
+
+def enum_value_deprecation_changed_change(type_name: str, value_name: str, deprecation_reason: str | None) -> dict:
+    """
+    Create a change record for an enum value that was deprecated, or is no longer deprecated.
+
+    Args:
+        type_name (str): Name of the enum type.
+        value_name (str): Name of the value.
+        deprecation_reason (str | None): The new deprecation reason, None if the value is no longer deprecated.
+
+    Returns:
+        Dict: A change record indicating a deprecation change.
+    """
+    if deprecation_reason is None:
+        return {
+            "type": type_name,
+            "change": f"Value '{value_name}' is no longer deprecated",
+            "breaking": False,
+            "release_note": f"Value '{value_name}' on enum type '{type_name}' is no longer deprecated. "
+                            f"This is a non-breaking change."
+        }
+
+    return {
+        "type": type_name,
+        "change": f"Value '{value_name}' was deprecated",
+        "breaking": False,
+        "release_note": f"Value '{value_name}' on enum type '{type_name}' has been deprecated: {deprecation_reason}. "
+                        f"This is a non-breaking change, but queries should stop using this value."
+    }
+
+
+def input_field_removed_change(type_name: str, field_name: str) -> dict:
+    """
+    Create a change record for a removed input object field.
+
+    Args:
+        type_name (str): Name of the input type.
+        field_name (str): Name of the removed field.
+
+    Returns:
+        Dict: A change record indicating an input field removal.
+    """
+    return {
+        "type": type_name,
+        "field": field_name,
+        "change": f"Input field '{field_name}' was removed",
+        "breaking": True,
+        "release_note": f"The input field '{field_name}' on input type '{type_name}' has been removed. "
+                        f"This is a breaking change for any operation providing this field."
+    }
+
+
+def input_field_added_change(type_name: str, field_name: str, required: bool) -> dict:
+    """
+    Create a change record for a new input object field. Adding a required field
+    (non-null without a default value) is breaking.
+
+    Args:
+        type_name (str): Name of the input type.
+        field_name (str): Name of the new field.
+        required (bool): Whether the new field must be provided.
+
+    Returns:
+        Dict: A change record indicating an input field addition.
+    """
+    if required:
+        return {
+            "type": type_name,
+            "field": field_name,
+            "change": f"Added new required input field '{field_name}'",
+            "breaking": True,
+            "release_note": f"A new required input field '{field_name}' has been added to input type '{type_name}'. "
+                            f"This is a breaking change, operations must now provide this field."
+        }
+
+    return {
+        "type": type_name,
+        "field": field_name,
+        "change": f"Added new input field '{field_name}'",
+        "breaking": False,
+        "release_note": f"A new optional input field '{field_name}' has been added to input type '{type_name}'. "
+                        f"This is a non-breaking change."
+    }
+
+
+def input_field_default_changed_change(type_name: str, field_name: str,
+                                       old_default: str | None, new_default: str | None) -> dict:
+    """
+    Create a change record for an input object field default value change.
+
+    Args:
+        type_name (str): Name of the input type.
+        field_name (str): Name of the field.
+        old_default (str | None): The old default value, None if there was none.
+        new_default (str | None): The new default value, None if there is none.
+
+    Returns:
+        Dict: A change record indicating an input field default value change.
+    """
+    return {
+        "type": type_name,
+        "field": field_name,
+        "change": f"Default value of input field '{field_name}' changed from '{old_default}' to '{new_default}'",
+        "breaking": False,
+        "release_note": f"The default value of input field '{field_name}' on input type '{type_name}' has changed "
+                        f"from '{old_default}' to '{new_default}'. This is a non-breaking change, but operations "
+                        f"omitting the field may behave differently."
+    }
+
+
+def union_member_removed_change(type_name: str, member_name: str) -> dict:
+    """
+    Create a change record for a type removed from a union.
+
+    Args:
+        type_name (str): Name of the union type.
+        member_name (str): Name of the removed member type.
+
+    Returns:
+        Dict: A change record indicating a union member removal.
+    """
+    return {
+        "type": type_name,
+        "change": f"Member '{member_name}' was removed from union",
+        "breaking": True,
+        "release_note": f"The type '{member_name}' has been removed from union '{type_name}'. "
+                        f"This is a breaking change for queries using fragments on '{member_name}'."
+    }
+
+
+def union_member_added_change(type_name: str, member_name: str) -> dict:
+    """
+    Create a change record for a type added to a union.
+
+    Args:
+        type_name (str): Name of the union type.
+        member_name (str): Name of the new member type.
+
+    Returns:
+        Dict: A change record indicating a union member addition.
+    """
+    return {
+        "type": type_name,
+        "change": f"Added new union member '{member_name}'",
+        "breaking": False,
+        "release_note": f"The type '{member_name}' has been added to union '{type_name}'. This is a non-breaking change."
+    }
+
+
+def directive_removed_change(directive_name: str) -> dict:
+    """
+    Create a change record for a removed directive.
+
+    Args:
+        directive_name (str): Name of the removed directive.
+
+    Returns:
+        Dict: A change record indicating a directive removal.
+    """
+    return {
+        "directive": directive_name,
+        "change": f"Directive '@{directive_name}' was removed",
+        "breaking": True,
+        "release_note": f"The directive '@{directive_name}' has been removed. "
+                        f"This is a breaking change for any operation using it."
+    }
+
+
+def directive_added_change(directive_name: str) -> dict:
+    """
+    Create a change record for a new directive.
+
+    Args:
+        directive_name (str): Name of the new directive.
+
+    Returns:
+        Dict: A change record indicating a directive addition.
+    """
+    return {
+        "directive": directive_name,
+        "change": f"Added new directive '@{directive_name}'",
+        "breaking": False,
+        "release_note": f"A new directive '@{directive_name}' has been added. This is a non-breaking change."
+    }
+
+
+# ----  single pass comparison ---- #
+
+def format_default_value(argument) -> str | None:
+    """
+    Print the default value of an argument or input field in GraphQL syntax.
+
+    Args:
+        argument: A graphql-core argument or input field.
+
+    Returns:
+        str | None: The printed default value, or None if there is none.
+    """
+    if argument.default_value is Undefined:
+        return None
+
+    value_ast = ast_from_value(argument.default_value, argument.type)
+    if value_ast is None:
+        return repr(argument.default_value)
+
+    return print_ast(value_ast)
+
+
+def same_type(type_v1, type_v2) -> bool:
+    """
+    Check whether two (possibly wrapped) types of different schemas are the same,
+    without printing them.
+    """
+    while hasattr(type_v1, 'of_type'):
+        if type(type_v1) is not type(type_v2):
+            return False
+        type_v1, type_v2 = type_v1.of_type, type_v2.of_type
+
+    return not hasattr(type_v2, 'of_type') and type_v1.name == type_v2.name
+
+
+def diff_default_values(argument_v1, argument_v2) -> tuple[str | None, str | None] | None:
+    """
+    Compare the default values of two versions of an argument or input field.
+
+    Returns:
+        tuple | None: The printed old and new default values if they differ, otherwise None.
+    """
+    if argument_v1.default_value == argument_v2.default_value:
+        return None
+
+    old_default, new_default = format_default_value(argument_v1), format_default_value(argument_v2)
+    if old_default == new_default:
+        return None
+
+    return old_default, new_default
+
+
+def diff_arguments(type_name: str, field_name: str, field_v1, field_v2) -> Iterator[dict]:
+    """
+    Detect the type and default value changes of the arguments present in both versions of a field.
+    """
+    args_v2 = field_v2.args
+    for arg_name, arg_v1 in field_v1.args.items():
+        arg_v2 = args_v2.get(arg_name)
+        if arg_v2 is None:
+            continue
+
+        if not same_type(arg_v1.type, arg_v2.type):
+            yield argument_type_changed_change(type_name, field_name, arg_name, str(arg_v1.type), str(arg_v2.type))
+
+        default_change = diff_default_values(arg_v1, arg_v2)
+        if default_change is not None:
+            yield argument_default_changed_change(type_name, field_name, arg_name, *default_change)
+
+
+def diff_field(type_name: str, field_name: str, field_v1, field_v2, extended: bool,
+               compare_type: bool = True) -> Iterator[dict]:
+    """
+    Detect the changes between two versions of a field of an object or interface type,
+    without the change of its type if compare_type is False (e.g. for a renamed field,
+    matched by its type).
+    """
+    if compare_type:
+        field_v1_type_name = get_field_type_name(field_v1)
+        field_v2_type_name = get_field_type_name(field_v2)
+        if field_v1_type_name != field_v2_type_name:
+            yield field_type_changed_change(type_name, field_name, field_v1_type_name, field_v2_type_name)
+        elif extended and not same_type(field_v1.type, field_v2.type):
+            # the type names compare_schemas uses coincide for multiply wrapped types
+            yield field_type_changed_change(type_name, field_name, str(field_v1.type), str(field_v2.type))
+
+    yield from compare_arguments(type_name, field_name, field_v1, field_v2)
+
+    if extended:
+        yield from diff_arguments(type_name, field_name, field_v1, field_v2)
+        if field_v1.deprecation_reason != field_v2.deprecation_reason:
+            yield field_deprecation_changed_change(type_name, field_name, field_v2.deprecation_reason)
+
+
+def diff_fields(type_name: str, type_v1, type_v2, extended: bool) -> Iterator[dict]:
+    """
+    Detect the changes of the fields of an object or interface type.
+    """
+    fields_v1 = type_v1.fields
+    fields_v2 = type_v2.fields
+
+    for field_name, field_v1 in fields_v1.items():
+        field_v2 = fields_v2.get(field_name)
+        if field_v2 is None:
+            yield field_removed_change(type_name, field_name)
+            continue
+
+        yield from diff_field(type_name, field_name, field_v1, field_v2, extended)
+
+    for field_name in fields_v2:
+        if field_name not in fields_v1:
+            yield new_field_added_change(type_name, field_name)
+
+
+def diff_enum_values(type_name: str, type_v1, type_v2, extended: bool) -> Iterator[dict]:
+    """
+    Detect the removed, added and (un)deprecated values of an enum type.
+    """
+    values_v1 = type_v1.values
+    values_v2 = type_v2.values
+
+    for value_name in values_v1:
+        if value_name not in values_v2:
+            yield enum_value_removed_change(type_name, value_name)
+
+    for value_name in values_v2:
+        if value_name not in values_v1:
+            yield enum_value_added_change(type_name, value_name)
+
+    if extended:
+        for value_name, value_v1 in values_v1.items():
+            value_v2 = values_v2.get(value_name)
+            if value_v2 is not None and value_v1.deprecation_reason != value_v2.deprecation_reason:
+                yield enum_value_deprecation_changed_change(type_name, value_name, value_v2.deprecation_reason)
+
+
+def diff_input_fields(type_name: str, type_v1, type_v2) -> Iterator[dict]:
+    """
+    Detect the removed, added and changed fields of an input object type.
+    """
+    fields_v1 = type_v1.fields
+    fields_v2 = type_v2.fields
+
+    for field_name, field_v1 in fields_v1.items():
+        field_v2 = fields_v2.get(field_name)
+        if field_v2 is None:
+            yield input_field_removed_change(type_name, field_name)
+            continue
+
+        if not same_type(field_v1.type, field_v2.type):
+            yield field_type_changed_change(type_name, field_name, str(field_v1.type), str(field_v2.type))
+
+        default_change = diff_default_values(field_v1, field_v2)
+        if default_change is not None:
+            yield input_field_default_changed_change(type_name, field_name, *default_change)
+
+    for field_name, field_v2 in fields_v2.items():
+        if field_name not in fields_v1:
+            required = str(field_v2.type).endswith('!') and field_v2.default_value is Undefined
+            yield input_field_added_change(type_name, field_name, required)
+
+
+def diff_union_members(type_name: str, type_v1, type_v2) -> Iterator[dict]:
+    """
+    Detect the removed and added member types of a union.
+    """
+    members_v1 = [member.name for member in type_v1.types]
+    members_v2 = [member.name for member in type_v2.types]
+    members_v1_set, members_v2_set = set(members_v1), set(members_v2)
+
+    for member_name in members_v1:
+        if member_name not in members_v2_set:
+            yield union_member_removed_change(type_name, member_name)
+
+    for member_name in members_v2:
+        if member_name not in members_v1_set:
+            yield union_member_added_change(type_name, member_name)
+
+
+def diff_type(type_name: str, type_kind: str, type_v1, type_v2, extended: bool) -> Iterator[dict]:
+    """
+    Detect the changes of a type whose two versions are of the same kind.
+    """
+    if type_kind in OBJECT_KINDS:
+        yield from diff_fields(type_name, type_v1, type_v2, extended)
+
+    elif type_kind == "GraphQLEnumType":
+        yield from diff_enum_values(type_name, type_v1, type_v2, extended)
+
+    elif extended and type_kind == "GraphQLInputObjectType":
+        yield from diff_input_fields(type_name, type_v1, type_v2)
+
+    elif extended and type_kind == "GraphQLUnionType":
+        yield from diff_union_members(type_name, type_v1, type_v2)
+
+
+def diff_directives(schema_version1: GraphQLSchema, schema_version2: GraphQLSchema) -> Iterator[dict]:
+    """
+    Detect the removed and added directives of a schema.
+    """
+    directives_v1 = [directive.name for directive in schema_version1.directives]
+    directives_v2 = [directive.name for directive in schema_version2.directives]
+    directives_v1_set, directives_v2_set = set(directives_v1), set(directives_v2)
+
+    for directive_name in directives_v1:
+        if directive_name not in directives_v2_set:
+            yield directive_removed_change(directive_name)
+
+    for directive_name in directives_v2:
+        if directive_name not in directives_v1_set:
+            yield directive_added_change(directive_name)
+
+
+def iter_schema_changes(schema_version1: GraphQLSchema,
+                        schema_version2: GraphQLSchema,
+                        extended: bool = True) -> Iterator[dict]:
+    """
+    Lazily yield the changes between two schemas, visiting each matched type once.
+    The changes compare_schemas detects are yielded in the same order as compare_schemas
+    returns them; with extended=False nothing else is yielded.
+
+    Args:
+        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        extended (bool): Also yield the change kinds compare_schemas does not detect.
+
+    Yields:
+        Dict: The detected changes.
+    """
+    type_map_v1 = schema_version1.type_map
+    type_map_v2 = schema_version2.type_map
+
+    for type_name, type_v1 in type_map_v1.items():
+        # stop here if the request was cancelled
+        check_cancelled()
+
+        if type_name.startswith("__") or type_name in BUILT_IN_SCALARS:
+            continue
+
+        type_v2 = type_map_v2.get(type_name)
+        if type_v2 is None:
+            yield type_removed_change(type_name)
+            continue
+
+        type_v1_type = identify_graphql_type(type_v1)
+        type_v2_type = identify_graphql_type(type_v2)
+        if type_v1_type != type_v2_type:
+            yield type_type_changed_change(type_name, type_v1_type, type_v2_type)
+
+        elif tracing_enabled():
+            # collect the changes of the type within its span, rather than across yields
+            with trace_type_comparison(type_name, type_v1):
+                type_changes = list(diff_type(type_name, type_v1_type, type_v1, type_v2, extended))
+            yield from type_changes
+
+        else:
+            yield from diff_type(type_name, type_v1_type, type_v1, type_v2, extended)
+
+    for type_name in type_map_v2:
+        if type_name.startswith("__") or type_name in BUILT_IN_SCALARS:
+            continue
+        if type_name not in type_map_v1:
+            yield type_added_change(type_name)
+
+    if extended:
+        yield from diff_directives(schema_version1, schema_version2)
+
+
+def diff_schemas(schema_version1: GraphQLSchema,
+                 schema_version2: GraphQLSchema,
+                 extended: bool = True) -> list[dict]:
+    """
+    Compare two GraphQL schemas in a single pass and detect breaking/non-breaking changes.
+
+    Args:
+        schema_version1 (GraphQLSchema): The first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The second version of the GraphQL schema.
+        extended (bool): Also detect the change kinds compare_schemas does not detect.
+
+    Returns:
+        List[Dict]: List of changes detected between the two schemas.
+    """
+    try:
+        changes = list(iter_schema_changes(schema_version1, schema_version2, extended))
+        logging.info('Schema differences successfully identified.')
+
+    except RequestCancelledError:
+        raise
+
+    except Exception as e:
+        message = f"Unable to check differences in schema. Error comparing schemas: {e}"
+        logging.error(message)
+        changes = [
+            {
+            "status": "Failed",
+            "reason": message
+            }
+        ]
+
+    return changes
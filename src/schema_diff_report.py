@@ -11,8 +11,16 @@ from graphql import GraphQLSchema, build_schema
 
 # import custom modules
 from schema_changes import compare_schemas
+from schema_diff_engine import diff_schemas
+from rename_detection import detect_renames
+from reference_graph import annotate_impact
 from schema_changes_llm import  analyze_schema_changes
+from llm_resilience import LLMUnavailableError
 from release_summary import generate_release_summary
+from request_cancellation import check_cancelled
+from diff_stages import diff_stage
+from tracing import traced_diff_report
+from schema_digest import schema_digest
 
 def parse_schema(schema_str: str ) -> GraphQLSchema | dict:
     """
@@ -25,7 +33,10 @@ def parse_schema(schema_str: str ) -> GraphQLSchema | dict:
         GraphQLSchema: Parsed GraphQL schema object.
     """
     try:
-        return build_schema(schema_str)
+        schema = build_schema(schema_str)
+        # compute the digest of the schema once, while it is parsed
+        schema_digest(schema)
+        return schema
 
     except Exception as e:
         # unable to create a schema
@@ -36,6 +47,20 @@ def parse_schema(schema_str: str ) -> GraphQLSchema | dict:
             "reason": [error_message]
             }
 
+def normalize_schema_str(schema_str: str) -> str:
+    """
+    Collapse the whitespace of a GraphQL schema string, so that schema versions
+    differing only in formatting are treated as identical.
+
+    Args:
+        schema_str (str): The GraphQL schema as a string.
+
+    Returns:
+        str: The schema string with all whitespace runs collapsed to a single space.
+    """
+    return ' '.join(schema_str.strip().split())
+
+
 def check_graphql_parsing_failure(schema_version1, schema_version2):
     """
     Checks the types of two GraphQL schema versions and logs errors if either or both
@@ -71,10 +96,13 @@ def check_graphql_parsing_failure(schema_version1, schema_version2):
     return None
 
 
+@traced_diff_report
 def graphql_diff_report(schema_v1_str: str,
                         schema_v2_str: str,
                         identify_changes_technique: str,
-                        summarization_technique: str) -> dict | str:
+                        summarization_technique: str,
+                        rename_detection: bool = False,
+                        impact_analysis: bool = False) -> dict | str:
     """
 
     Method checks two versions GraphQL schema strings, and returns a
@@ -85,9 +113,13 @@ def graphql_diff_report(schema_v1_str: str,
         schema_v1_str (str): the string of the first version of the GraphQL schema
         schema_v2_str (str): the string of the second version of the GraphQL schema
         identify_changes_technique (str): The technique for identifying the schema changes
-            could be: 'algorithmic' or 'GPT3.5' based
+            could be: 'algorithmic', 'single-pass' or 'GPT3.5' based
         summarization_technique (str): The technique for generating the summary could
             be: 'algorithmic' or 'GPT3.5' based
+        rename_detection (bool): Whether to report the renamed types, fields and arguments
+            as renames instead of removals and additions (algorithmic techniques only)
+        impact_analysis (bool): Whether to annotate each change with the root operation
+            fields reaching it (algorithmic techniques only)
 
     Returns:
         dict: A dictionary with the changes and the summary report.
@@ -98,14 +130,16 @@ def graphql_diff_report(schema_v1_str: str,
     changes = []
 
     # remove string whitespace
-    schema_v1_str = ' '.join(schema_v1_str.strip().split())
-    schema_v2_str = ' '.join(schema_v2_str.strip().split())
+    with diff_stage("normalization"):
+        schema_v1_str = normalize_schema_str(schema_v1_str)
+        schema_v2_str = normalize_schema_str(schema_v2_str)
 
     # if the schema strings are identical terminate the procedure.
     if schema_v1_str == schema_v2_str:
         changes = []
         # summarize the differences
-        changes_with_summary = generate_release_summary(changes, summarization_technique)
+        with diff_stage("generate_release_summary"):
+            changes_with_summary = generate_release_summary(changes, summarization_technique)
         return changes_with_summary
 
     # Check if the schemas have the expected GraphQL structure
@@ -113,30 +147,100 @@ def graphql_diff_report(schema_v1_str: str,
     schema_v2_str_mod = schema_v2_str.replace('\r\n', '\n').strip()
 
     # parse the GraphQL schemas
-    schema_version1 = parse_schema(schema_v1_str_mod)
-    schema_version2 = parse_schema(schema_v2_str_mod)
+    with diff_stage("parse_schema"):
+        schema_version1 = parse_schema(schema_v1_str_mod)
+        schema_version2 = parse_schema(schema_v2_str_mod)
 
     # terminate the procedure if schemas were not parsed
     parsing_failure = check_graphql_parsing_failure(schema_version1, schema_version2)
     if parsing_failure is not None:
         return parsing_failure
 
-    # if the parsed schemas are identical terminate the procedure.
-    if schema_version1 == schema_version2:
-        changes = []
+    # stop here if the request was cancelled while parsing
+    check_cancelled()
+
+    return parsed_schemas_diff_report(schema_version1, schema_version2,
+                                      schema_v1_str, schema_v2_str,
+                                      identify_changes_technique, summarization_technique,
+                                      rename_detection, impact_analysis)
+
+
+@traced_diff_report
+def parsed_schemas_diff_report(schema_version1: GraphQLSchema,
+                               schema_version2: GraphQLSchema,
+                               schema_v1_str: str,
+                               schema_v2_str: str,
+                               identify_changes_technique: str,
+                               summarization_technique: str,
+                               rename_detection: bool = False,
+                               impact_analysis: bool = False) -> dict:
+    """
+    Generate the diff report of two already parsed versions of a GraphQL schema,
+    so that callers holding a parsed schema do not have to parse it again.
+
+    Args:
+        schema_version1 (GraphQLSchema): The parsed first version of the GraphQL schema.
+        schema_version2 (GraphQLSchema): The parsed second version of the GraphQL schema.
+        schema_v1_str (str): the normalized string of the first version of the GraphQL schema
+        schema_v2_str (str): the normalized string of the second version of the GraphQL schema
+        identify_changes_technique (str): The technique for identifying the schema changes
+            could be: 'algorithmic', 'single-pass' or 'GPT3.5' based
+        summarization_technique (str): The technique for generating the summary could
+            be: 'algorithmic' or 'GPT3.5' based
+        rename_detection (bool): Whether to report the renamed types, fields and arguments
+            as renames instead of removals and additions (algorithmic techniques only)
+        impact_analysis (bool): Whether to annotate each change with the root operation
+            fields reaching it (algorithmic techniques only)
+
+    Returns:
+        dict: A dictionary with the changes and the summary report.
+    """
+    # instantiate changes
+    changes = []
+
+    # if the parsed schemas are structurally identical terminate the procedure,
+    # whatever the order of their types, fields, arguments and enum values.
+    if schema_digest(schema_version1) == schema_digest(schema_version2):
         # summarize the differences
-        changes_with_summary = generate_release_summary(changes, summarization_technique)
+        with diff_stage("generate_release_summary"):
+            changes_with_summary = generate_release_summary(changes, summarization_technique)
         return changes_with_summary
 
 
     # identify the differences between the 2 schemas
-    if identify_changes_technique == 'GPT3.5': # LLM based solution
-        changes = analyze_schema_changes(schema_v1_str, schema_v2_str)
-
-    elif identify_changes_technique == 'algorithmic':  # Pythonic solution
-        changes = compare_schemas(schema_version1, schema_version2)
+    fallback = None
+    with diff_stage("identify_changes"):
+        if identify_changes_technique == 'GPT3.5': # LLM based solution
+            try:
+                changes = analyze_schema_changes(schema_v1_str, schema_v2_str)
+            except LLMUnavailableError as e:
+                # fall back to the algorithmic technique, rather than failing the report
+                logging.warning(f"GPT3.5 unavailable, falling back to the algorithmic technique: {e}")
+                fallback = {"technique": "algorithmic", "reason": str(e)}
+                changes = compare_schemas(schema_version1, schema_version2)
+
+        elif identify_changes_technique == 'algorithmic':  # Pythonic solution
+            changes = compare_schemas(schema_version1, schema_version2)
+
+        elif identify_changes_technique == 'single-pass':  # Pythonic solution, wider change coverage
+            changes = diff_schemas(schema_version1, schema_version2)
+
+        # pair the removals and additions of renamed members
+        if rename_detection and identify_changes_technique != 'GPT3.5':
+            changes = detect_renames(schema_version1, schema_version2, changes,
+                                     extended=identify_changes_technique == 'single-pass')
+
+        # annotate the changes with the operations they affect
+        if impact_analysis and identify_changes_technique != 'GPT3.5':
+            changes = annotate_impact(schema_version1, schema_version2, changes)
+
+    # stop here if the request was cancelled while identifying the changes
+    check_cancelled()
 
     # summarize the differences
-    changes_with_summary = generate_release_summary(changes, summarization_technique)
+    with diff_stage("generate_release_summary"):
+        changes_with_summary = generate_release_summary(changes, summarization_technique)
+    if fallback is not None:
+        changes_with_summary["fallback"] = fallback
 
     return changes_with_summary
@@ -0,0 +1,101 @@
+"""
+
+Script computes a canonical digest of the structure of a GraphQL schema: its types,
+fields, arguments, enum values, union members and directives, regardless of the order
+they are declared in, and of descriptions. Schemas with equal digests have no changes,
+so that the diff can be skipped entirely.
+
+Digests are cached per parsed schema, so they are computed once, at parse time.
+
+"""
+# import packages
+import hashlib
+import weakref
+from graphql import GraphQLSchema, Undefined
+
+_digests: "weakref.WeakKeyDictionary[GraphQLSchema, str]" = weakref.WeakKeyDictionary()
+
+
+def argument_signature(name: str, argument) -> tuple:
+    """
+    The canonical form of an argument or input field: its name, type, default value and deprecation.
+    """
+    default_value = None if argument.default_value is Undefined else repr(argument.default_value)
+
+    return name, str(argument.type), default_value, getattr(argument, "deprecation_reason", None)
+
+
+def field_signature(name: str, field) -> tuple:
+    """
+    The canonical form of a field: its name, type, deprecation and sorted arguments.
+    """
+    arguments = sorted(argument_signature(arg_name, argument) for arg_name, argument in field.args.items())
+
+    return name, str(field.type), field.deprecation_reason, tuple(arguments)
+
+
+def type_signature(graphql_type) -> tuple:
+    """
+    The canonical form of a named type: its kind and its sorted members.
+
+    Args:
+        graphql_type: A named graphql-core type.
+
+    Returns:
+        tuple: The kind, name, and members of the type.
+    """
+    members = []
+    fields = getattr(graphql_type, "fields", None)
+    if fields is not None:
+        if hasattr(graphql_type, "interfaces"):  # object and interface types
+            members.append(tuple(sorted(field_signature(name, field) for name, field in fields.items())))
+            members.append(tuple(sorted(interface.name for interface in graphql_type.interfaces)))
+        else:  # input object types
+            members.append(tuple(sorted(argument_signature(name, field) for name, field in fields.items())))
+
+    values = getattr(graphql_type, "values", None)
+    if values is not None:  # enum types
+        members.append(tuple(sorted((name, value.deprecation_reason) for name, value in values.items())))
+
+    types = getattr(graphql_type, "types", None)
+    if types is not None:  # union types
+        members.append(tuple(sorted(member.name for member in types)))
+
+    return type(graphql_type).__name__, graphql_type.name, tuple(members)
+
+
+def directive_signature(directive) -> tuple:
+    """
+    The canonical form of a directive definition.
+    """
+    arguments = sorted(argument_signature(name, argument) for name, argument in directive.args.items())
+
+    return (directive.name, tuple(sorted(location.name for location in directive.locations)),
+            tuple(arguments), directive.is_repeatable)
+
+
+def schema_digest(schema: GraphQLSchema) -> str:
+    """
+    The order-insensitive structural digest of a schema, cached for the lifetime of the schema.
+
+    Args:
+        schema (GraphQLSchema): The parsed GraphQL schema.
+
+    Returns:
+        str: The hex digest of the schema.
+    """
+    digest = _digests.get(schema)
+    if digest is not None:
+        return digest
+
+    root_types = tuple(root_type.name if root_type is not None else None
+                       for root_type in (schema.query_type, schema.mutation_type, schema.subscription_type))
+    signatures = [repr(root_types)]
+    signatures.extend(repr(type_signature(schema.type_map[type_name]))
+                      for type_name in sorted(schema.type_map) if not type_name.startswith("__"))
+    signatures.extend(sorted(repr(directive_signature(directive)) for directive in schema.directives))
+
+    digest = hashlib.blake2b("\n".join(signatures).encode(), digest_size=16).hexdigest()
+    _digests[schema] = digest
+
+    return digest
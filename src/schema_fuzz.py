@@ -0,0 +1,499 @@
+"""
+
+Script fuzzes the optimized diff engines against the reference implementation,
+compare_schemas: it generates seeded random schemas, mutates them (adding, removing
+and retyping types, fields, arguments and enum values), runs an engine and the
+reference on each pair and reports the pairs they disagree on, each shrunk to a
+minimal diverging case. It also compares the throughput of the engines.
+
+Run it with e.g. `python src/schema_fuzz.py --seeds 500 --engine compact`.
+
+"""
+# import packages
+import argparse
+import copy
+import json
+import logging
+import random
+import time
+from typing import Callable
+from graphql import GraphQLSchema, build_schema
+
+# import custom modules
+from schema_changes import compare_schemas
+from schema_diff_engine import diff_schemas
+from compact_schema import compact_schema
+from schema_digest import schema_digest
+
+BUILT_IN_SCALARS = ("Int", "Float", "String", "Boolean", "ID")
+OUTPUT_KINDS = ("object", "interface", "union", "enum", "scalar")
+INPUT_KINDS = ("input", "enum", "scalar")
+TYPE_KINDS = ("object", "interface", "input", "enum", "union", "scalar")
+
+# the root type, present in every generated schema and never mutated away
+ROOT_TYPE = "Query"
+
+
+# ----  engines ---- #
+
+def digest_engine(schema_version1: GraphQLSchema, schema_version2: GraphQLSchema) -> list[dict]:
+    """
+    compare_schemas, skipped when the digests of the schemas are equal: checks that the
+    digest never hides a change.
+    """
+    if schema_digest(schema_version1) == schema_digest(schema_version2):
+        return []
+
+    return compare_schemas(schema_version1, schema_version2)
+
+
+# the engines that must produce the same changes as compare_schemas
+ENGINES: dict[str, Callable[[GraphQLSchema, GraphQLSchema], list[dict]]] = {
+    "single-pass": lambda schema_version1, schema_version2: diff_schemas(schema_version1, schema_version2,
+                                                                         extended=False),
+    "compact": lambda schema_version1, schema_version2: compare_schemas(compact_schema(schema_version1),
+                                                                        compact_schema(schema_version2)),
+    "digest": digest_engine,
+}
+
+
+# ----  schema model ---- #
+# A schema is modelled as {type name: definition}, with definitions such as
+# {"kind": "object", "fields": {name: {"type": "[T1!]", "args": {name: {"type": "Int", "default": "1"}}}}},
+# {"kind": "input", "fields": {name: {"type": "String"}}}, {"kind": "enum", "values": [...]},
+# {"kind": "union", "members": [...]} and {"kind": "scalar"}.
+
+def base_type(type_ref: str) -> str:
+    """
+    The named type of a type reference, e.g. 'T1' for '[T1!]!'.
+    """
+    return type_ref.strip("[]!")
+
+
+def random_type_ref(rng: random.Random, model: dict, kinds: tuple) -> str:
+    """
+    A random reference to a built-in scalar or a type of the model of one of the kinds,
+    optionally wrapped in a list and non-null.
+    """
+    candidates = [name for name, definition in model.items() if definition["kind"] in kinds and name != ROOT_TYPE]
+    name = rng.choice(candidates) if candidates and rng.random() < 0.5 else rng.choice(BUILT_IN_SCALARS)
+
+    # input objects referencing each other must not be non-null, not to build an impossible cycle
+    if rng.random() < 0.3 and not (name in model and model[name]["kind"] == "input"):
+        name += "!"
+    if rng.random() < 0.25:
+        name = f"[{name}]"
+        if rng.random() < 0.5:
+            name += "!"
+
+    return name
+
+
+def random_arguments(rng: random.Random, model: dict) -> dict:
+    arguments = {}
+    for _ in range(rng.choice((0, 0, 1, 2))):
+        type_ref = random_type_ref(rng, model, INPUT_KINDS)
+        default = str(rng.randint(1, 9)) if type_ref == "Int" and rng.random() < 0.5 else None
+        arguments[f"a{rng.randrange(100)}"] = {"type": type_ref, "default": default}
+
+    return arguments
+
+
+def random_definition(rng: random.Random, model: dict, kind: str) -> dict:
+    """
+    A random definition of a type of the given kind, referencing the types of the model.
+    """
+    if kind in ("object", "interface"):
+        return {"kind": kind, "fields": {
+            f"f{rng.randrange(100)}": {"type": random_type_ref(rng, model, OUTPUT_KINDS),
+                                       "args": random_arguments(rng, model)}
+            for _ in range(rng.randint(1, 5))
+        }}
+    if kind == "input":
+        return {"kind": kind, "fields": {f"f{rng.randrange(100)}": {"type": random_type_ref(rng, model, INPUT_KINDS)}
+                                         for _ in range(rng.randint(1, 4))}}
+    if kind == "enum":
+        return {"kind": kind, "values": sorted({f"V{rng.randrange(100)}" for _ in range(rng.randint(1, 5))})}
+    if kind == "union":
+        objects = [name for name, definition in model.items() if definition["kind"] == "object"]
+        return {"kind": kind, "members": sorted(set(rng.sample(objects, min(len(objects), rng.randint(1, 3)))))}
+
+    return {"kind": "scalar"}
+
+
+def generate_schema(rng: random.Random, n_types: int = 8) -> dict:
+    """
+    Generate a random schema model.
+
+    Args:
+        rng (random.Random): The seeded random generator.
+        n_types (int): The number of types besides the root type.
+
+    Returns:
+        dict: The schema model.
+    """
+    model = {ROOT_TYPE: {"kind": "object", "fields": {"ping": {"type": "Int", "args": {}}}}}
+    for index in range(n_types):
+        kind = rng.choice(TYPE_KINDS)
+        model[f"T{index}"] = random_definition(rng, model, kind)
+    model[ROOT_TYPE] = random_definition(rng, model, "object")
+
+    return repair(model)
+
+
+def repair(model: dict) -> dict:
+    """
+    Make a model a valid schema after mutations: references to missing types, or to types
+    of a kind not allowed there, are replaced by String, and empty types get a member.
+    """
+    for name, definition in model.items():
+        kind = definition["kind"]
+        if kind in ("object", "interface", "input"):
+            allowed = OUTPUT_KINDS if kind != "input" else INPUT_KINDS
+            for field in definition["fields"].values():
+                field["type"] = repair_type_ref(model, field["type"], allowed)
+                for argument in field.get("args", {}).values():
+                    argument["type"] = repair_type_ref(model, argument["type"], INPUT_KINDS)
+                    if argument["type"] != "Int":
+                        argument["default"] = None
+            if not definition["fields"]:
+                definition["fields"]["placeholder"] = {"type": "Int", "args": {}} if kind != "input" else {"type": "Int"}
+        elif kind == "enum" and not definition["values"]:
+            definition["values"] = ["PLACEHOLDER"]
+        elif kind == "union":
+            definition["members"] = [member for member in definition["members"]
+                                     if member in model and model[member]["kind"] == "object"] or [ROOT_TYPE]
+
+    return model
+
+
+def repair_type_ref(model: dict, type_ref: str, allowed_kinds: tuple) -> str:
+    name = base_type(type_ref)
+    if name in BUILT_IN_SCALARS or (name in model and model[name]["kind"] in allowed_kinds and name != ROOT_TYPE):
+        return type_ref
+
+    return type_ref.replace(name, "String")
+
+
+def print_schema_model(model: dict) -> str:
+    """
+    The SDL of a schema model.
+    """
+    definitions = []
+    for name, definition in model.items():
+        kind = definition["kind"]
+        if kind in ("object", "interface"):
+            fields = []
+            for field_name, field in definition["fields"].items():
+                arguments = ", ".join(
+                    f"{arg_name}: {argument['type']}" + (f" = {argument['default']}" if argument["default"] else "")
+                    for arg_name, argument in field["args"].items()
+                )
+                fields.append(f"{field_name}{f'({arguments})' if arguments else ''}: {field['type']}")
+            keyword = "type" if kind == "object" else "interface"
+            definitions.append(f"{keyword} {name} {{ {' '.join(fields)} }}")
+        elif kind == "input":
+            fields = " ".join(f"{field_name}: {field['type']}" for field_name, field in definition["fields"].items())
+            definitions.append(f"input {name} {{ {fields} }}")
+        elif kind == "enum":
+            definitions.append(f"enum {name} {{ {' '.join(definition['values'])} }}")
+        elif kind == "union":
+            definitions.append(f"union {name} = {' | '.join(definition['members'])}")
+        else:
+            definitions.append(f"scalar {name}")
+
+    return "\n".join(definitions)
+
+
+# ----  mutations ---- #
+
+def random_mutation(rng: random.Random, model: dict) -> tuple:
+    """
+    A random mutation of a model, as a replayable tuple: its operation and arguments.
+    """
+    types = [name for name in model if name != ROOT_TYPE]
+    with_fields = [name for name, definition in model.items() if definition["kind"] in ("object", "interface")]
+    enums = [name for name, definition in model.items() if definition["kind"] == "enum"]
+    fields = [(name, field_name) for name in with_fields for field_name in model[name]["fields"]]
+    arguments = [(name, field_name, arg_name) for name, field_name in fields
+                 for arg_name in model[name]["fields"][field_name]["args"]]
+
+    operations = ["add_type"]
+    if types:
+        operations += ["remove_type", "retype_type"]
+    if with_fields:
+        operations += ["add_field", "add_argument"]
+    if fields:
+        operations += ["remove_field", "retype_field", "retype_field"]
+    if arguments:
+        operations += ["remove_argument", "retype_argument", "change_default"]
+    if enums:
+        operations += ["add_enum_value", "remove_enum_value"]
+
+    operation = rng.choice(operations)
+    if operation == "add_type":
+        kind = rng.choice(TYPE_KINDS)
+        return operation, f"N{rng.randrange(100)}", random_definition(rng, model, kind)
+    if operation == "remove_type":
+        return operation, rng.choice(types)
+    if operation == "retype_type":
+        name = rng.choice(types)
+        kind = rng.choice([kind for kind in TYPE_KINDS if kind != model[name]["kind"]])
+        return operation, name, random_definition(rng, model, kind)
+    if operation == "add_field":
+        return operation, rng.choice(with_fields), f"g{rng.randrange(100)}", \
+            {"type": random_type_ref(rng, model, OUTPUT_KINDS), "args": random_arguments(rng, model)}
+    if operation == "add_argument":
+        name = rng.choice(with_fields)
+        field_name = rng.choice(list(model[name]["fields"]))
+        return operation, name, field_name, f"b{rng.randrange(100)}", \
+            {"type": random_type_ref(rng, model, INPUT_KINDS), "default": None}
+    if operation == "remove_field":
+        return (operation, *rng.choice(fields))
+    if operation == "retype_field":
+        return (operation, *rng.choice(fields), random_type_ref(rng, model, OUTPUT_KINDS))
+    if operation == "remove_argument":
+        return (operation, *rng.choice(arguments))
+    if operation == "retype_argument":
+        return (operation, *rng.choice(arguments), random_type_ref(rng, model, INPUT_KINDS))
+    if operation == "change_default":
+        return (operation, *rng.choice(arguments), str(rng.randint(1, 9)))
+    if operation == "add_enum_value":
+        return operation, rng.choice(enums), f"W{rng.randrange(100)}"
+
+    name = rng.choice(enums)
+    return operation, name, rng.choice(model[name]["values"])
+
+
+def apply_mutations(model: dict, mutations: list[tuple]) -> dict:
+    """
+    Apply mutations to a copy of a model; the mutations of missing elements are skipped.
+
+    Args:
+        model (dict): The schema model.
+        mutations (list[tuple]): The mutations, as returned by random_mutation.
+
+    Returns:
+        dict: The mutated, repaired model.
+    """
+    model = copy.deepcopy(model)
+    for operation, name, *arguments in mutations:
+        definition = model.get(name)
+        if operation == "add_type":
+            model.setdefault(name, copy.deepcopy(arguments[0]))
+        elif definition is None:
+            continue
+        elif operation == "remove_type":
+            del model[name]
+        elif operation == "retype_type":
+            model[name] = copy.deepcopy(arguments[0])
+        elif operation == "add_enum_value":
+            if definition["kind"] == "enum" and arguments[0] not in definition["values"]:
+                definition["values"].append(arguments[0])
+        elif operation == "remove_enum_value":
+            if definition["kind"] == "enum" and arguments[0] in definition["values"]:
+                definition["values"].remove(arguments[0])
+        elif definition["kind"] in ("object", "interface"):
+            apply_field_mutation(definition["fields"], operation, arguments)
+
+    return repair(model)
+
+
+def apply_field_mutation(fields: dict, operation: str, arguments: list) -> None:
+    field = fields.get(arguments[0])
+    if operation == "add_field":
+        fields.setdefault(arguments[0], copy.deepcopy(arguments[1]))
+    elif field is None:
+        return
+    elif operation == "remove_field":
+        del fields[arguments[0]]
+    elif operation == "retype_field":
+        field["type"] = arguments[1]
+    elif operation == "add_argument":
+        field["args"].setdefault(arguments[1], copy.deepcopy(arguments[2]))
+    elif arguments[1] in field["args"]:
+        if operation == "remove_argument":
+            del field["args"][arguments[1]]
+        elif operation == "retype_argument":
+            field["args"][arguments[1]]["type"] = arguments[2]
+        elif operation == "change_default":
+            field["args"][arguments[1]]["default"] = arguments[2]
+
+
+def generate_case(seed: int, n_types: int = 8, n_mutations: int = 4) -> tuple[dict, list[tuple]]:
+    """
+    The schema model and mutations of a seed.
+    """
+    rng = random.Random(seed)
+    model = generate_schema(rng, n_types)
+    mutations, mutated = [], model
+    for _ in range(n_mutations):
+        mutation = random_mutation(rng, mutated)
+        mutations.append(mutation)
+        mutated = apply_mutations(mutated, [mutation])
+
+    return model, mutations
+
+
+# ----  differential harness ---- #
+
+def canonical_changes(changes) -> list[str]:
+    """
+    The changes as a sorted list, compare_schemas reporting some of them (e.g. the
+    arguments of a field) in no defined order.
+    """
+    return sorted(json.dumps(change, sort_keys=True) for change in changes)
+
+
+def run_engine(engine: Callable, schema_version1: GraphQLSchema, schema_version2: GraphQLSchema):
+    try:
+        return canonical_changes(engine(schema_version1, schema_version2))
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def divergence(engine: Callable, model: dict, mutations: list[tuple], reference: Callable = compare_schemas):
+    """
+    Run an engine and the reference on a schema and its mutation.
+
+    Returns:
+        dict | None: The schemas and both outputs if they differ, otherwise None.
+    """
+    schema_v1_str = print_schema_model(model)
+    schema_v2_str = print_schema_model(apply_mutations(model, mutations))
+    schema_version1, schema_version2 = build_schema(schema_v1_str), build_schema(schema_v2_str)
+
+    expected = run_engine(reference, schema_version1, schema_version2)
+    actual = run_engine(engine, schema_version1, schema_version2)
+    if actual == expected:
+        return None
+
+    return {"schema_v1": schema_v1_str, "schema_v2": schema_v2_str,
+            "reference": expected, "engine": actual}
+
+
+def shrink(engine: Callable, model: dict, mutations: list[tuple], reference: Callable = compare_schemas) -> dict:
+    """
+    Shrink a diverging case: drop the mutations, then the types and fields of the schema,
+    that the divergence does not need, one at a time.
+
+    Returns:
+        dict: The minimal diverging case.
+    """
+    def diverges(candidate_model, candidate_mutations):
+        try:
+            return divergence(engine, candidate_model, candidate_mutations, reference) is not None
+        except Exception:  # a candidate that is not a valid schema
+            return False
+
+    for index in reversed(range(len(mutations))):
+        candidate = mutations[:index] + mutations[index + 1:]
+        if diverges(model, candidate):
+            mutations = candidate
+
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for name in [name for name in model if name != ROOT_TYPE]:
+            candidate = repair({type_name: definition for type_name, definition in copy.deepcopy(model).items()
+                                if type_name != name})
+            if diverges(candidate, mutations):
+                model, shrunk = candidate, True
+
+        for name, definition in model.items():
+            for field_name in list(definition.get("fields", {})):
+                candidate = copy.deepcopy(model)
+                del candidate[name]["fields"][field_name]
+                candidate = repair(candidate)
+                if candidate != model and diverges(candidate, mutations):
+                    model, shrunk = candidate, True
+
+    return {"mutations": [list(mutation[:2]) for mutation in mutations],
+            **divergence(engine, model, mutations, reference)}
+
+
+def differential_fuzz(engine: Callable,
+                      seeds: range = range(100),
+                      reference: Callable = compare_schemas,
+                      n_types: int = 8,
+                      n_mutations: int = 4,
+                      max_divergences: int = 5) -> dict:
+    """
+    Fuzz an engine against the reference implementation.
+
+    Args:
+        engine (Callable): The engine, taking two parsed schemas and returning their changes.
+        seeds (range): The seeds of the generated cases.
+        reference (Callable): The reference implementation.
+        n_types (int): The number of types of the generated schemas.
+        n_mutations (int): The number of mutations of each generated schema.
+        max_divergences (int): Stop after this number of diverging cases.
+
+    Returns:
+        dict: The number of cases run, and the minimal diverging cases with their seed.
+    """
+    divergences = []
+    cases = 0
+    for seed in seeds:
+        cases += 1
+        model, mutations = generate_case(seed, n_types, n_mutations)
+        if divergence(engine, model, mutations, reference) is not None:
+            divergences.append({"seed": seed, **shrink(engine, model, mutations, reference)})
+            if len(divergences) >= max_divergences:
+                break
+
+    return {"cases": cases, "divergences": divergences}
+
+
+def throughput(engines: dict[str, Callable],
+               seeds: range = range(100),
+               n_types: int = 50,
+               n_mutations: int = 10,
+               repeat: int = 3) -> dict:
+    """
+    Compare the throughput of engines and the reference on the same generated cases,
+    parsed beforehand so that only the comparison is timed.
+
+    Returns:
+        dict: The cases per second of each engine, and its speedup over compare_schemas.
+    """
+    pairs = []
+    for seed in seeds:
+        model, mutations = generate_case(seed, n_types, n_mutations)
+        pairs.append((build_schema(print_schema_model(model)),
+                      build_schema(print_schema_model(apply_mutations(model, mutations)))))
+
+    results = {}
+    for name, engine in {"reference": compare_schemas, **engines}.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for schema_version1, schema_version2 in pairs:
+                engine(schema_version1, schema_version2)
+            best = min(best, time.perf_counter() - start)
+        results[name] = {"cases_per_second": round(len(pairs) / best, 1)}
+
+    for name, result in results.items():
+        result["speedup"] = round(result["cases_per_second"] / results["reference"]["cases_per_second"], 2)
+
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Fuzz the diff engines against compare_schemas.")
+    parser.add_argument("--engine", choices=list(ENGINES), action="append",
+                        help="The engine(s) to fuzz, defaults to all of them.")
+    parser.add_argument("--seeds", type=int, default=200, help="The number of generated cases.")
+    parser.add_argument("--types", type=int, default=8, help="The number of types of the generated schemas.")
+    parser.add_argument("--mutations", type=int, default=4, help="The number of mutations of each schema.")
+    parser.add_argument("--throughput", action="store_true", help="Also compare the throughput of the engines.")
+    args = parser.parse_args()
+
+    engines = {name: ENGINES[name] for name in (args.engine or ENGINES)}
+    report = {name: differential_fuzz(engine, range(args.seeds), n_types=args.types, n_mutations=args.mutations)
+              for name, engine in engines.items()}
+    if args.throughput:
+        report["throughput"] = throughput(engines, range(min(args.seeds, 100)))
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,284 @@
+"""
+
+Script tracks the lifetime of every type, field, argument, input field and enum value
+across many versions of a GraphQL schema: when it appeared, disappeared, changed type
+or was deprecated.
+
+The members of all versions are stored as a columnar table: each version is a column
+of bitsets over the members (present, deprecated, changed type), so that queries over
+hundreds of versions are a few bitwise operations per version instead of pairwise
+comparisons of the schemas. With NumPy, the columns are unpacked into boolean matrices
+and the queries are vectorized over all versions at once.
+
+"""
+# import packages
+import logging
+from typing import Iterable, Iterator
+from graphql import GraphQLSchema
+
+# import custom modules
+from schema_diff_report import parse_schema, normalize_schema_str
+from schema_diff_engine import BUILT_IN_SCALARS
+
+# optional vectorized queries
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EVENTS = ("added", "removed", "type_changed", "deprecated")
+
+
+def schema_members(schema: GraphQLSchema) -> Iterator[tuple[str, str, str | None, bool]]:
+    """
+    The members of a schema, named e.g. 'Book', 'Book.title', 'Book.title(format)' or 'Genre.FICTION'.
+
+    Args:
+        schema (GraphQLSchema): The parsed GraphQL schema.
+
+    Yields:
+        tuple[str, str, str | None, bool]: The name, kind, type and deprecation of each member.
+    """
+    for type_name, graphql_type in schema.type_map.items():
+        # the built-in scalars come and go with their use, disregarded as compare_types does
+        if type_name.startswith("__") or type_name in BUILT_IN_SCALARS:
+            continue
+        yield type_name, "type", type(graphql_type).__name__, False
+
+        fields = getattr(graphql_type, "fields", None) or {}
+        field_kind = "field" if hasattr(graphql_type, "interfaces") else "input_field"
+        for field_name, field in fields.items():
+            member = f"{type_name}.{field_name}"
+            yield member, field_kind, str(field.type), getattr(field, "deprecation_reason", None) is not None
+            for arg_name, argument in (getattr(field, "args", None) or {}).items():
+                yield f"{member}({arg_name})", "argument", str(argument.type), \
+                    argument.deprecation_reason is not None
+
+        for value_name, value in (getattr(graphql_type, "values", None) or {}).items():
+            yield f"{type_name}.{value_name}", "enum_value", None, value.deprecation_reason is not None
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    The positions of the set bits of a bitset, in increasing order.
+    """
+    while bits:
+        lowest_bit = bits & -bits
+        yield lowest_bit.bit_length() - 1
+        bits ^= lowest_bit
+
+
+class SchemaLifetime:
+    """
+    The members of a sequence of schema versions, in release order, as columns of bitsets.
+    """
+
+    def __init__(self):
+        self.versions: list[str] = []
+        self.members: list[str] = []
+        self.kinds: list[str] = []
+        self.member_index: dict[str, int] = {}
+        # one bitset over the members per version
+        self.present: list[int] = []
+        self.deprecated: list[int] = []
+        self.type_changed: list[int] = []
+        self._types: dict[int, str | None] = {}
+        self._matrices = None
+
+    def add_version(self, version: str, schema: GraphQLSchema) -> None:
+        """
+        Append the next version of the schema.
+
+        Args:
+            version (str): The label of the version, e.g. a release tag.
+            schema (GraphQLSchema): The parsed schema of the version.
+        """
+        previous_present = self.present[-1] if self.present else 0
+        present = deprecated = type_changed = 0
+        types = {}
+        for member, kind, member_type, is_deprecated in schema_members(schema):
+            index = self.member_index.get(member)
+            if index is None:
+                index = self.member_index[member] = len(self.members)
+                self.members.append(member)
+                self.kinds.append(kind)
+
+            bit = 1 << index
+            present |= bit
+            if is_deprecated:
+                deprecated |= bit
+            if previous_present & bit and self._types[index] != member_type:
+                type_changed |= bit
+            types[index] = member_type
+
+        self.versions.append(version)
+        self.present.append(present)
+        self.deprecated.append(deprecated)
+        self.type_changed.append(type_changed)
+        self._types = types
+        self._matrices = None
+
+    @classmethod
+    def from_schema_strs(cls, versions: Iterable[tuple[str, str]]) -> "SchemaLifetime":
+        """
+        Build the lifetime table of schema versions.
+
+        Args:
+            versions (Iterable[tuple[str, str]]): The label and schema string of each version, in release order.
+
+        Returns:
+            SchemaLifetime: The lifetime table.
+
+        Raises:
+            ValueError: If a version could not be parsed.
+        """
+        lifetime = cls()
+        for version, schema_str in versions:
+            schema = parse_schema(normalize_schema_str(schema_str))
+            if not isinstance(schema, GraphQLSchema):
+                error_message = f"Version '{version}' of the GraphQL schema could not be parsed"
+                logging.error(error_message)
+                raise ValueError(error_message)
+            lifetime.add_version(version, schema)
+
+        return lifetime
+
+    # ----  queries ---- #
+
+    def event_bits(self, event: str, version: int) -> int:
+        """
+        The members an event happened to in a version, compared to the previous one.
+
+        Args:
+            event (str): One of 'added', 'removed', 'type_changed' or 'deprecated'.
+            version (int): The index of the version.
+
+        Returns:
+            int: The bitset of the members.
+        """
+        present = self.present[version]
+        previous_present = self.present[version - 1] if version > 0 else 0
+        if event == "added":
+            return present & ~previous_present
+        if event == "removed":
+            return previous_present & ~present
+        if event == "type_changed":
+            return self.type_changed[version]
+        if event == "deprecated":
+            previous_deprecated = self.deprecated[version - 1] if version > 0 else 0
+            return self.deprecated[version] & ~previous_deprecated
+        raise ValueError(f"Unknown event '{event}', expected one of {EVENTS}")
+
+    def matrices(self) -> dict:
+        """
+        The boolean matrices (versions x members) of the columns, unpacked once with NumPy.
+        """
+        if self._matrices is None:
+            def unpack(columns: list[int]):
+                n_bytes = (len(self.members) + 7) // 8
+                packed = np.frombuffer(b"".join(bits.to_bytes(n_bytes, "little") for bits in columns), dtype=np.uint8)
+                return np.unpackbits(packed.reshape(len(columns), n_bytes), axis=1,
+                                     bitorder="little")[:, :len(self.members)].astype(bool)
+
+            present = unpack(self.present)
+            deprecated = unpack(self.deprecated)
+            previous_present = np.vstack([np.zeros((1, len(self.members)), dtype=bool), present[:-1]])
+            previous_deprecated = np.vstack([np.zeros((1, len(self.members)), dtype=bool), deprecated[:-1]])
+            self._matrices = {
+                "present": present,
+                "deprecated_state": deprecated,
+                "added": present & ~previous_present,
+                "removed": previous_present & ~present,
+                "type_changed": unpack(self.type_changed),
+                "deprecated": deprecated & ~previous_deprecated,
+            }
+
+        return self._matrices
+
+    def events(self, event: str, last: int | None = None, kind: str | None = None) -> list[dict]:
+        """
+        The members an event happened to, e.g. the fields removed in the last 20 releases.
+
+        Args:
+            event (str): One of 'added', 'removed', 'type_changed' or 'deprecated'.
+            last (int | None): Only the events of the last versions, defaults to all of them.
+            kind (str | None): Only the members of a kind, e.g. 'field' or 'enum_value'.
+
+        Returns:
+            list[dict]: The member, its kind and the version of the event, in version order.
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown event '{event}', expected one of {EVENTS}")
+        first_version = max(len(self.versions) - last, 0) if last is not None else 0
+
+        if np is not None and self.versions:
+            version_offsets, members = np.nonzero(self.matrices()[event][first_version:])
+            occurrences = zip((version_offsets + first_version).tolist(), members.tolist())
+        else:
+            occurrences = ((version, member) for version in range(first_version, len(self.versions))
+                           for member in iter_bits(self.event_bits(event, version)))
+
+        return [{"member": self.members[member], "kind": self.kinds[member], "version": self.versions[version]}
+                for version, member in occurrences if kind is None or self.kinds[member] == kind]
+
+    def oldest_deprecated(self, limit: int | None = None, kind: str | None = None) -> list[dict]:
+        """
+        The deprecated members still present in the latest version, the oldest first.
+
+        Args:
+            limit (int | None): The maximum number of members.
+            kind (str | None): Only the members of a kind, e.g. 'field'.
+
+        Returns:
+            list[dict]: The member, its kind, the version it appeared in and the version
+                it has been deprecated since.
+        """
+        if not self.versions:
+            return []
+
+        if np is not None:
+            matrices = self.matrices()
+            members = np.nonzero(matrices["deprecated_state"][-1])[0]
+            first_present = matrices["present"][:, members].argmax(axis=0)
+            # the current deprecation started after the last version it was not deprecated in
+            not_deprecated = ~matrices["deprecated_state"][::-1, members]
+            has_undeprecated = not_deprecated.any(axis=0)
+            deprecated_since = np.where(has_undeprecated, len(self.versions) - not_deprecated.argmax(axis=0), 0)
+            rows = list(zip(members.tolist(), first_present.tolist(), deprecated_since.tolist()))
+        else:
+            rows = []
+            for member in iter_bits(self.deprecated[-1]):
+                bit = 1 << member
+                first_present = next(version for version, present in enumerate(self.present) if present & bit)
+                deprecated_since = len(self.versions) - 1
+                while deprecated_since > 0 and self.deprecated[deprecated_since - 1] & bit:
+                    deprecated_since -= 1
+                rows.append((member, first_present, deprecated_since))
+
+        rows = sorted((row for row in rows if kind is None or self.kinds[row[0]] == kind), key=lambda row: row[1:])
+        return [{"member": self.members[member], "kind": self.kinds[member],
+                 "since": self.versions[first_present], "deprecated_since": self.versions[deprecated_since]}
+                for member, first_present, deprecated_since in rows[:limit]]
+
+    def lifetime(self, member: str) -> dict:
+        """
+        The history of a single member.
+
+        Args:
+            member (str): The name of the member, e.g. 'Book.title'.
+
+        Returns:
+            dict: The versions the member was added, removed, changed type and deprecated in,
+                and whether it is present in the latest version.
+        """
+        index = self.member_index.get(member)
+        if index is None:
+            raise KeyError(member)
+
+        bit = 1 << index
+        history = {"member": member, "kind": self.kinds[index], "present": bool(self.present[-1] & bit)}
+        for event in EVENTS:
+            history[event] = [self.versions[version] for version in range(len(self.versions))
+                              if self.event_bits(event, version) & bit]
+
+        return history
@@ -0,0 +1,214 @@
+"""
+
+Script watches the files of a GraphQL schema version, and re-generates the diff report
+against an in-memory baseline version every time their content changes.
+
+"""
+# import packages
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from graphql import GraphQLSchema
+
+# import custom modules
+from schema_diff_report import parse_schema, check_graphql_parsing_failure, \
+    parsed_schemas_diff_report
+from multi_file_schema import SchemaFileCache, expand_schema_paths, load_schema
+
+
+def read_schema_files(paths: list[str]) -> str:
+    """
+    Read and concatenate the files of a schema version, in the given order.
+
+    Args:
+        paths (list[str]): The paths of the schema files.
+
+    Returns:
+        str: The concatenated schema string.
+    """
+    schema_parts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as schema_file:
+            schema_parts.append(schema_file.read())
+
+    return "\n".join(schema_parts)
+
+
+class SchemaWatcher:
+    """
+    Keep the parsed baseline (version 1) of a schema in memory, and re-diff the watched
+    version 2 files against it whenever their content changes.
+
+    File changes are detected by polling the files' modification times. A change is only
+    processed once the files have been stable for the debounce period, and only the files
+    whose normalized content changed are re-parsed, so each update costs the parse of the
+    changed files and a single diff. The schema paths may be directories or glob patterns,
+    expanded on every poll so that new files are picked up.
+    """
+
+    def __init__(self,
+                 schema_v1_path: str,
+                 schema_v2_paths: list[str],
+                 identify_changes_technique: str = 'algorithmic',
+                 summarization_technique: str = 'algorithmic',
+                 debounce_seconds: float = 0.3,
+                 rename_detection: bool = False,
+                 impact_analysis: bool = False):
+        self.schema_v2_paths = schema_v2_paths
+        self.identify_changes_technique = identify_changes_technique
+        self.summarization_technique = summarization_technique
+        self.debounce_seconds = debounce_seconds
+        self.rename_detection = rename_detection
+        self.impact_analysis = impact_analysis
+
+        # parse the baseline once
+        self.cache = SchemaFileCache()
+        self.schema_v1_str, self.schema_version1 = load_schema([schema_v1_path], self.cache)
+
+        self.last_snapshot = None
+        self.last_snapshot_time = 0.0
+        self.pending = False
+        self.last_digest = None
+        self.report = None
+
+    def snapshot(self) -> tuple:
+        """
+        Take a snapshot of the modification time and size of the watched files.
+
+        Returns:
+            tuple: The (path, mtime, size) of each watched file; missing files have no mtime.
+        """
+        snapshot = []
+        for path in expand_schema_paths(self.schema_v2_paths):
+            try:
+                stat = os.stat(path)
+                snapshot.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                snapshot.append((path, None, None))
+
+        return tuple(snapshot)
+
+    def poll(self, now: float | None = None) -> dict | None:
+        """
+        Check the watched files once, and re-generate the report if their content changed.
+
+        Args:
+            now (float | None): The current monotonic time, defaults to time.monotonic().
+
+        Returns:
+            dict | None: The new report, or None if there is no settled content change.
+        """
+        now = time.monotonic() if now is None else now
+
+        # debounce: wait until the files stop changing, except for the very first poll
+        snapshot = self.snapshot()
+        if snapshot != self.last_snapshot:
+            first_poll = self.last_snapshot is None
+            self.last_snapshot = snapshot
+            self.last_snapshot_time = now
+            self.pending = True
+            if not first_poll:
+                return None
+        elif not self.pending or now - self.last_snapshot_time < self.debounce_seconds:
+            return None
+        self.pending = False
+
+        if not snapshot or any(mtime is None for _, mtime, _ in snapshot):
+            return None
+
+        # re-parse only the changed files, and re-diff only on content change
+        schema_v2_str, schema_version2 = load_schema(self.schema_v2_paths, self.cache)
+        digest = hashlib.sha256(schema_v2_str.encode("utf-8")).hexdigest()
+        if digest == self.last_digest:
+            return None
+        self.last_digest = digest
+
+        self.report = self.diff(schema_v2_str, schema_version2)
+        return self.report
+
+    def diff(self, schema_v2_str: str, schema_version2: GraphQLSchema | dict | None = None) -> dict | list:
+        """
+        Diff a version 2 schema string against the in-memory baseline.
+
+        Args:
+            schema_v2_str (str): The normalized version 2 schema string.
+            schema_version2 (GraphQLSchema | dict | None): The already parsed version 2 schema,
+                or its parsing failure; parsed from the string if None.
+
+        Returns:
+            dict | list: The diff report, or the parsing failure output.
+        """
+        if schema_v2_str == self.schema_v1_str:
+            return parsed_schemas_diff_report(self.schema_version1, self.schema_version1,
+                                              self.schema_v1_str, schema_v2_str,
+                                              self.identify_changes_technique, self.summarization_technique)
+
+        if schema_version2 is None:
+            schema_version2 = parse_schema(schema_v2_str)
+        parsing_failure = check_graphql_parsing_failure(self.schema_version1, schema_version2)
+        if parsing_failure is not None:
+            return parsing_failure
+
+        return parsed_schemas_diff_report(self.schema_version1, schema_version2,
+                                          self.schema_v1_str, schema_v2_str,
+                                          self.identify_changes_technique, self.summarization_technique,
+                                          self.rename_detection, self.impact_analysis)
+
+    def run(self,
+            on_report: Callable[[dict | list], None],
+            interval_seconds: float = 0.5,
+            stop_event: threading.Event | None = None) -> None:
+        """
+        Poll the watched files until stopped, passing every new report to a callback.
+
+        Args:
+            on_report (Callable): Called with each re-generated report.
+            interval_seconds (float): The polling interval.
+            stop_event (threading.Event | None): Stops the loop once set.
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                report = self.poll()
+                if report is not None:
+                    on_report(report)
+            except Exception as e:
+                logging.error(f"Unable to re-generate the schema diff report. Exception: {e}")
+            stop_event.wait(interval_seconds)
+
+
+def serve_reports(watcher: SchemaWatcher, host: str = "127.0.0.1", port: int = 8001) -> ThreadingHTTPServer:
+    """
+    Serve the latest report of a watcher as JSON over HTTP, in a background thread.
+
+    Args:
+        watcher (SchemaWatcher): The watcher whose latest report is served.
+        host (str): The host to bind.
+        port (int): The port to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+
+    class ReportHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(watcher.report).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), ReportHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving the latest schema diff report in: http://{host}:{server.server_port}/")
+
+    return server
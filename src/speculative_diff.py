@@ -0,0 +1,153 @@
+"""
+
+Script runs the algorithmic and the GPT3.5 diff of two schema versions speculatively,
+at the same time: the algorithmic report is emitted as soon as it is ready (in
+milliseconds), then each change identified by GPT3.5 as it is streamed, and finally
+the LLM-enriched report, with its release notes and summary.
+
+The events are emitted to a callback, e.g. the server-sent events of /compare-schemas/stream.
+
+"""
+# import packages
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable
+
+# import custom modules
+from schema_diff_report import graphql_diff_report, normalize_schema_str
+from schema_changes_llm import analyze_schema_changes
+from release_summary import generate_release_summary
+from request_cancellation import CancellationToken, RequestCancelledError, cancellation_scope, \
+    check_cancelled, remaining_seconds
+from diff_stages import diff_stage
+from tracing import traced_diff_report
+
+# how often the speculative diff checks the request for cancellation while waiting for the LLM
+LLM_WAIT_INTERVAL_SECONDS = 0.25
+
+
+def has_changes(report) -> bool:
+    """
+    Whether an algorithmic report parsed both schemas and found changes, i.e. whether
+    there is anything for the LLM to identify or summarize.
+    """
+    if not isinstance(report, dict) or "changes" not in report:
+        return False
+    changes = report["changes"]
+
+    return bool(changes) and not (len(changes) == 1 and "status" in changes[0])
+
+
+def llm_report(schema_v1_str: str,
+               schema_v2_str: str,
+               algorithmic_changes: list | None,
+               summarization_technique: str,
+               emit: Callable[[str, dict], None]) -> None:
+    """
+    Identify the changes with GPT3.5, emitting each as soon as it is streamed, or reuse
+    the algorithmic changes, then summarize them and emit the report.
+
+    Args:
+        schema_v1_str (str): The normalized first version of the GraphQL schema.
+        schema_v2_str (str): The normalized second version of the GraphQL schema.
+        algorithmic_changes (list | None): The changes to summarize, or None to identify them with GPT3.5.
+        summarization_technique (str): The technique for generating the summary.
+        emit (Callable[[str, dict], None]): Called with the name and data of each event.
+    """
+    changes = algorithmic_changes
+    if changes is None:
+        with diff_stage("identify_changes"):
+            changes = analyze_schema_changes(schema_v1_str, schema_v2_str,
+                                             on_change=lambda change: emit("llm_change", change))
+        if isinstance(changes, dict):
+            emit("llm_error", {"status": "Failed", "reason": [changes["error"]]})
+            return
+
+    check_cancelled()
+
+    with diff_stage("generate_release_summary"):
+        report = generate_release_summary(changes, summarization_technique)
+    emit("llm", report)
+
+
+@traced_diff_report
+def speculative_diff(schema_v1_str: str,
+                     schema_v2_str: str,
+                     identify_changes_technique: str,
+                     summarization_technique: str,
+                     rename_detection: bool,
+                     impact_analysis: bool,
+                     emit: Callable[[str, dict], None]) -> None:
+    """
+    Diff two schema versions algorithmically and with GPT3.5 concurrently. The events are:
+        - 'algorithmic': the algorithmic report, always first;
+        - 'llm_change': each change identified by GPT3.5, as soon as it is streamed;
+        - 'llm': the report identified and/or summarized by GPT3.5;
+        - 'llm_error': the GPT3.5 call failed or its output could not be parsed.
+    The LLM is stopped as soon as the algorithmic report shows the schemas could not be
+    parsed or have no differences, and is skipped if neither technique is 'GPT3.5'.
+
+    Args:
+        schema_v1_str (str): the string of the first version of the GraphQL schema
+        schema_v2_str (str): the string of the second version of the GraphQL schema
+        identify_changes_technique (str): The technique of the LLM report, 'GPT3.5' to identify the
+            changes with the LLM, otherwise the changes of this technique ('algorithmic' or
+            'single-pass') are reported first and summarized by the LLM
+        summarization_technique (str): The technique for generating the summary of the LLM report
+        rename_detection (bool): Whether the algorithmic report detects renames
+        impact_analysis (bool): Whether the algorithmic report annotates the affected root fields
+        emit (Callable[[str, dict], None]): Called with the name and data of each event, from any thread.
+    """
+    identify_with_llm = identify_changes_technique == 'GPT3.5'
+    if not identify_with_llm and summarization_technique != 'GPT3.5':
+        emit("algorithmic", graphql_diff_report(schema_v1_str, schema_v2_str, identify_changes_technique,
+                                                summarization_technique, rename_detection, impact_analysis))
+        return
+
+    # the LLM stops on its own token, when the request is cancelled or its result is not needed
+    llm_token = CancellationToken(remaining_seconds())
+
+    def emit_llm_event(event: str, data: dict) -> None:
+        # drop the events of a cancelled LLM, e.g. changes parsed from its last chunk
+        if llm_token.reason is None:
+            emit(event, data)
+
+    def run_llm(algorithmic_changes):
+        with cancellation_scope(llm_token):
+            llm_report(normalize_schema_str(schema_v1_str), normalize_schema_str(schema_v2_str),
+                       algorithmic_changes, summarization_technique, emit_llm_event)
+
+    # the report emitted first, identified without the LLM
+    report_technique = identify_changes_technique if not identify_with_llm else 'algorithmic'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        try:
+            # the GPT3.5 identification does not need the algorithmic result, start it first
+            future = executor.submit(contextvars.copy_context().run, run_llm, None) if identify_with_llm else None
+
+            report = graphql_diff_report(schema_v1_str, schema_v2_str, report_technique, 'algorithmic',
+                                         rename_detection, impact_analysis)
+            emit("algorithmic", report)
+            if not has_changes(report):
+                llm_token.cancel("No changes for the LLM")
+                return
+
+            if future is None:
+                future = executor.submit(contextvars.copy_context().run, run_llm, report["changes"])
+
+            while not wait([future], timeout=LLM_WAIT_INTERVAL_SECONDS).done:
+                check_cancelled()
+
+        except BaseException:
+            # do not leave the LLM running for a failed or cancelled request
+            llm_token.cancel("Request cancelled")
+            raise
+
+        try:
+            future.result()
+        except RequestCancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"The speculative LLM diff failed: {e}")
+            emit("llm_error", {"status": "Failed", "reason": [str(e)]})
@@ -0,0 +1,128 @@
+"""
+
+Script identifies the changes of multiple federated subgraphs concurrently,
+and aggregates them in a single release report.
+
+"""
+# import packages
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable
+
+# import custom modules
+from schema_changes import compare_schemas
+from schema_diff_report import parse_schema, normalize_schema_str, check_graphql_parsing_failure
+from release_summary import generate_release_summary
+
+
+def diff_subgraph(subgraph_name: str, schema_v1_str: str, schema_v2_str: str) -> dict:
+    """
+    Identify the changes between two versions of a single subgraph schema,
+    timing the parsing and the comparison stages.
+
+    Args:
+        subgraph_name (str): The name of the subgraph.
+        schema_v1_str (str): The first version of the subgraph schema.
+        schema_v2_str (str): The second version of the subgraph schema.
+
+    Returns:
+        dict: The subgraph name, its changes and the per-stage timings in seconds.
+            If a schema version could not be parsed, the parsing failure is reported
+            under 'parsing_failed' and no changes are returned.
+    """
+    start = time.perf_counter()
+    result = {
+        "subgraph": subgraph_name,
+        "changes": [],
+        "timings": {"parse_seconds": 0.0, "compare_seconds": 0.0, "total_seconds": 0.0}
+    }
+
+    schema_v1_str = normalize_schema_str(schema_v1_str)
+    schema_v2_str = normalize_schema_str(schema_v2_str)
+
+    # identical subgraph schemas, nothing to compare
+    if schema_v1_str != schema_v2_str:
+        # parse the subgraph schemas
+        parse_start = time.perf_counter()
+        schema_version1 = parse_schema(schema_v1_str)
+        schema_version2 = parse_schema(schema_v2_str)
+        result["timings"]["parse_seconds"] = time.perf_counter() - parse_start
+
+        parsing_failure = check_graphql_parsing_failure(schema_version1, schema_version2)
+        if parsing_failure is not None:
+            result["parsing_failed"] = parsing_failure
+        else:
+            # identify the differences between the 2 versions
+            compare_start = time.perf_counter()
+            result["changes"] = compare_schemas(schema_version1, schema_version2)
+            result["timings"]["compare_seconds"] = time.perf_counter() - compare_start
+
+    result["timings"]["total_seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def is_failed_diff(subgraph_result: dict) -> bool:
+    """
+    Check whether the changes of a subgraph could not be identified.
+
+    Args:
+        subgraph_result (dict): The output of diff_subgraph for a single subgraph.
+
+    Returns:
+        bool: True if the schemas could not be parsed or compared.
+    """
+    if "parsing_failed" in subgraph_result:
+        return True
+
+    return any('status' in change for change in subgraph_result["changes"])
+
+
+def diff_subgraphs(subgraphs: Iterable[tuple[str, str, str]],
+                   summarization_technique: str = 'algorithmic',
+                   max_workers: int | None = None,
+                   use_processes: bool = True) -> dict:
+    """
+    Identify the changes of multiple subgraphs concurrently on a worker pool,
+    and summarize all of them in a single release report.
+
+    Args:
+        subgraphs (Iterable[tuple[str, str, str]]): Triples of (subgraph name,
+            first version of the schema, second version of the schema).
+        summarization_technique (str): The technique for generating the aggregated
+            summary could be: 'algorithmic' or 'GPT3.5' based
+        max_workers (int | None): The size of the worker pool. Defaults to the
+            executor's own default.
+        use_processes (bool): Diff the subgraphs on worker processes, so that the CPU
+            bound comparisons run in parallel. If False, worker threads are used.
+
+    Returns:
+        dict: The per-subgraph changes and timings, the aggregated release notes and the
+            total wall clock time of the run.
+    """
+    start = time.perf_counter()
+    subgraphs = list(subgraphs)
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        futures = [executor.submit(diff_subgraph, name, schema_v1, schema_v2)
+                   for name, schema_v1, schema_v2 in subgraphs]
+        subgraph_results = [future.result() for future in futures]
+
+    # aggregate the changes of all successfully compared subgraphs
+    aggregated_changes = []
+    for subgraph_result in subgraph_results:
+        if is_failed_diff(subgraph_result):
+            logging.error(f"Unable to identify the changes of subgraph '{subgraph_result['subgraph']}'.")
+            continue
+        aggregated_changes.extend(subgraph_result["changes"])
+
+    release_notes = generate_release_summary(aggregated_changes, summarization_technique)["release_notes"]
+    logging.info(f'Changes of {len(subgraph_results)} subgraph(s) successfully identified.')
+
+    return {
+        "subgraphs": subgraph_results,
+        "release_notes": release_notes,
+        "timings": {"total_seconds": time.perf_counter() - start}
+    }
@@ -0,0 +1,214 @@
+"""
+
+Script compares two branches of a GraphQL schema against their merge base: the
+changes of each branch, and the conflicting edits, where both branches changed the
+same type, field, argument, enum value or union member to different results.
+
+"""
+# import packages
+import logging
+import re
+from graphql import GraphQLSchema
+
+# import custom modules
+from schema_diff_report import parse_schema, normalize_schema_str, parsed_schemas_diff_report
+from schema_digest import type_signature, field_signature, argument_signature, directive_signature
+from diff_store import classify_change
+from diff_stages import diff_stage
+from request_cancellation import check_cancelled
+from tracing import traced_diff_report
+
+BRANCHES = ("branch_a", "branch_b")
+
+# the change kinds of a named member of a type, not recorded in the change's 'field'
+MEMBER_CHANGE_KINDS = frozenset(["enum_value_removed", "enum_value_added", "enum_value_deprecation_changed",
+                                 "union_member_removed", "union_member_added"])
+QUOTED_NAME = re.compile(r"'([^']*)'")
+
+
+def change_scope(change: dict) -> tuple[str, str | None]:
+    """
+    The element of the schema a change applies to.
+
+    Args:
+        change (dict): The change record.
+
+    Returns:
+        tuple[str, str | None]: The name of the type (directives are prefixed with '@'),
+            and the name of its changed member, or None for the type itself.
+    """
+    if "directive" in change:
+        return f"@{change['directive']}", None
+
+    if change.get("field"):
+        return change["type"], change["field"]
+
+    if classify_change(change) in MEMBER_CHANGE_KINDS:
+        return change["type"], QUOTED_NAME.search(change["change"]).group(1)
+
+    return change.get("type"), None
+
+
+def element_state(schema: GraphQLSchema, type_name: str, member: str | None):
+    """
+    The canonical form of a type, directive or member of a type in a schema version,
+    comparable between the versions of a schema.
+
+    Args:
+        schema (GraphQLSchema): The schema version.
+        type_name (str): The name of the type, or of the directive prefixed with '@'.
+        member (str | None): The name of the field, enum value or union member, or None for the whole type.
+
+    Returns:
+        The canonical form of the element, or None if it does not exist.
+    """
+    if type_name.startswith("@"):
+        directive = schema.get_directive(type_name[1:])
+        return directive_signature(directive) if directive is not None else None
+
+    graphql_type = schema.type_map.get(type_name)
+    if graphql_type is None:
+        return None
+    if member is None:
+        return type_signature(graphql_type)
+
+    fields = getattr(graphql_type, "fields", None)
+    if fields is not None:
+        if member not in fields:
+            return None
+        if hasattr(graphql_type, "interfaces"):  # object and interface types
+            return field_signature(member, fields[member])
+        return argument_signature(member, fields[member])  # input object types
+
+    values = getattr(graphql_type, "values", None)
+    if values is not None:
+        return (member, values[member].deprecation_reason) if member in values else None
+
+    types = getattr(graphql_type, "types", None)
+    if types is not None:
+        return any(member_type.name == member for member_type in types)
+
+    return None
+
+
+def group_by_scope(changes: list[dict]) -> dict[str, dict[str | None, list[dict]]]:
+    """
+    Group changes by the type they apply to, then by the member of the type.
+    """
+    scopes = {}
+    for change in changes:
+        type_name, member = change_scope(change)
+        scopes.setdefault(type_name, {}).setdefault(member, []).append(change)
+
+    return scopes
+
+
+def find_conflicts(schema_a: GraphQLSchema,
+                   schema_b: GraphQLSchema,
+                   changes_a: list[dict],
+                   changes_b: list[dict]) -> list[dict]:
+    """
+    Find the elements both branches changed, to a different result. A change of a whole
+    type (e.g. its removal) overlaps the changes of any of its members in the other branch.
+    Both branches making the same edit is not a conflict.
+
+    Args:
+        schema_a (GraphQLSchema): The schema of the first branch.
+        schema_b (GraphQLSchema): The schema of the second branch.
+        changes_a (list[dict]): The changes of the first branch, from the merge base.
+        changes_b (list[dict]): The changes of the second branch, from the merge base.
+
+    Returns:
+        list[dict]: The conflicting type and member, and the changes of each branch on them.
+    """
+    scopes_a = group_by_scope(changes_a)
+    scopes_b = group_by_scope(changes_b)
+
+    conflicts = []
+    for type_name, members_a in scopes_a.items():
+        members_b = scopes_b.get(type_name)
+        if type_name is None or members_b is None:
+            continue
+
+        if None in members_a or None in members_b:
+            # a change of the whole type, the type must end up the same in both branches
+            overlapping = [(None, [change for changes in members_a.values() for change in changes],
+                            [change for changes in members_b.values() for change in changes])]
+        else:
+            overlapping = [(member, members_a[member], members_b[member])
+                           for member in members_a if member in members_b]
+
+        for member, member_changes_a, member_changes_b in overlapping:
+            if element_state(schema_a, type_name, member) != element_state(schema_b, type_name, member):
+                conflicts.append({
+                    "type": type_name,
+                    "member": member,
+                    "branch_a": member_changes_a,
+                    "branch_b": member_changes_b
+                })
+
+    return conflicts
+
+
+@traced_diff_report
+def three_way_diff_report(base_str: str,
+                          branch_a_str: str,
+                          branch_b_str: str,
+                          identify_changes_technique: str = 'single-pass',
+                          summarization_technique: str = 'algorithmic',
+                          rename_detection: bool = False) -> dict:
+    """
+    Compare two branches of a GraphQL schema against their merge base. Each distinct
+    schema is parsed once, and the parsed base is shared by both comparisons.
+
+    Args:
+        base_str (str): The merge base of the GraphQL schema.
+        branch_a_str (str): The GraphQL schema of the first branch.
+        branch_b_str (str): The GraphQL schema of the second branch.
+        identify_changes_technique (str): The technique for identifying the schema changes
+            could be: 'algorithmic' or 'single-pass'
+        summarization_technique (str): The technique for generating the summary of each
+            branch could be: 'algorithmic' or 'GPT3.5' based
+        rename_detection (bool): Whether to report the renamed types, fields and arguments
+            as renames instead of removals and additions
+
+    Returns:
+        dict: The diff report of each branch, and their conflicts.
+    """
+    if identify_changes_technique not in ('algorithmic', 'single-pass'):
+        error_message = f"Three-way diffs need an algorithmic technique, not '{identify_changes_technique}'"
+        logging.error(error_message)
+        return {"status": "Failed", "reason": [error_message]}
+
+    with diff_stage("normalization"):
+        schema_strs = {"base": normalize_schema_str(base_str),
+                       "branch_a": normalize_schema_str(branch_a_str),
+                       "branch_b": normalize_schema_str(branch_b_str)}
+
+    # parse each distinct schema once
+    with diff_stage("parse_schema"):
+        parsed = {}
+        for schema_str in schema_strs.values():
+            if schema_str not in parsed:
+                parsed[schema_str] = parse_schema(schema_str)
+        schemas = {version: parsed[schema_str] for version, schema_str in schema_strs.items()}
+
+    failed_versions = [version for version, schema in schemas.items() if not isinstance(schema, GraphQLSchema)]
+    if failed_versions:
+        error_message = f"The {', '.join(failed_versions)} version(s) of the GraphQL schema could not be parsed"
+        logging.error(error_message)
+        return {'parsing_failed': [error_message, *(schemas[version] for version in failed_versions)]}
+
+    # stop here if the request was cancelled while parsing
+    check_cancelled()
+
+    report = {}
+    for branch in BRANCHES:
+        report[branch] = parsed_schemas_diff_report(schemas["base"], schemas[branch],
+                                                    schema_strs["base"], schema_strs[branch],
+                                                    identify_changes_technique, summarization_technique,
+                                                    rename_detection)
+    report["conflicts"] = find_conflicts(schemas["branch_a"], schemas["branch_b"],
+                                         report["branch_a"]["changes"], report["branch_b"]["changes"])
+
+    return report
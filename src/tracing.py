@@ -0,0 +1,266 @@
+"""
+
+Script traces diff reports as spans: the report, each of its stages, the comparison
+of individual types (sampled) and each LLM call. Finished traces are appended to a
+local file in the OTLP JSON format (one ExportTraceServiceRequest per line), which
+the OpenTelemetry collector can ingest, to find the types making a diff slow.
+
+Tracing is enabled by setting the TRACE_EXPORT_PATH env var.
+
+"""
+# import packages
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+# import custom modules
+from diff_stages import listen_to_stages, stage_listeners
+
+# the file the traces are appended to, tracing is disabled when it is not set
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+# the fraction of the type comparison spans kept
+TRACE_TYPE_SAMPLE_RATE = float(os.getenv("TRACE_TYPE_SAMPLE_RATE", "0.01"))
+# type comparisons slower than this are always kept
+TRACE_SLOW_TYPE_SECONDS = float(os.getenv("TRACE_SLOW_TYPE_SECONDS", "0.01"))
+# the maximum number of spans kept per trace
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "1000"))
+
+SERVICE_NAME = "graphql-schema-diff"
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_CLIENT = 1, 3
+STATUS_CODE_ERROR = 2
+
+_export_lock = threading.Lock()
+
+
+class Span:
+    """
+    A timed operation of a trace. The spans of a trace share the list they are collected in,
+    exported once the root span ends.
+    """
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_span_id", "attributes",
+                 "start_ns", "end_ns", "error", "trace_spans")
+
+    def __init__(self, name: str, parent: "Span | None", kind: int = SPAN_KIND_INTERNAL,
+                 attributes: dict | None = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.trace_spans = parent.trace_spans if parent is not None else []
+
+    @property
+    def duration_seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> dict:
+        """
+        The span in the OTLP JSON encoding.
+        """
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": STATUS_CODE_ERROR, "message": self.error} if self.error else {}
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+
+        return span
+
+
+# the span of the current context
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def otlp_value(value) -> dict:
+    """
+    An attribute value in the OTLP JSON encoding.
+    """
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+
+    return {"stringValue": str(value)}
+
+
+def tracing_enabled() -> bool:
+    """
+    Whether new traces are started, or a trace is already running in the current context.
+    """
+    return bool(TRACE_EXPORT_PATH) or current_span.get() is not None
+
+
+@contextmanager
+def trace_span(name: str,
+               kind: int = SPAN_KIND_INTERNAL,
+               sample_rate: float = 1.0,
+               keep_slower_than: float | None = None,
+               **attributes) -> Iterator[Span | None]:
+    """
+    Run a block of code as a span of the current trace, starting a trace if there is none.
+    Spans with a sample rate are kept with that probability, or when they are slower than
+    keep_slower_than, so that the slow ones are never dropped.
+
+    Args:
+        name (str): The name of the span.
+        kind (int): The OTLP kind of the span.
+        sample_rate (float): The probability of keeping the span.
+        keep_slower_than (float | None): The duration above which the span is always kept.
+        **attributes: The attributes of the span.
+
+    Yields:
+        Span | None: The span, or None when tracing is disabled.
+    """
+    parent = current_span.get()
+    if parent is None and not TRACE_EXPORT_PATH:
+        yield None
+        return
+
+    span = Span(name, parent, kind, attributes)
+    reset_token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current_span.reset(reset_token)
+        span.end_ns = time.time_ns()
+        keep = sample_rate >= 1 or random.random() < sample_rate or \
+            (keep_slower_than is not None and span.duration_seconds >= keep_slower_than)
+        if parent is None:
+            export_trace([*span.trace_spans, span])
+        elif keep and len(span.trace_spans) < TRACE_MAX_SPANS:
+            span.trace_spans.append(span)
+
+
+def trace_type_comparison(type_name: str, type_v1):
+    """
+    A sampled span around the comparison of the two versions of a type, recording the
+    number of fields, arguments and enum values that make a type slow to compare.
+
+    Args:
+        type_name (str): The name of the type.
+        type_v1: The first version of the type.
+
+    Returns:
+        ContextManager: The span, or a no-op context manager when tracing is disabled.
+    """
+    if not tracing_enabled():
+        return nullcontext()
+
+    fields = getattr(type_v1, "fields", None) or {}
+    arguments = sum(len(getattr(field, "args", None) or ()) for field in fields.values())
+    return trace_span("compare_type_fields",
+                      sample_rate=TRACE_TYPE_SAMPLE_RATE,
+                      keep_slower_than=TRACE_SLOW_TYPE_SECONDS,
+                      **{
+                          "graphql.type.name": type_name,
+                          "graphql.type.fields": len(fields),
+                          "graphql.type.arguments": arguments,
+                          "graphql.type.enum_values": len(getattr(type_v1, "values", None) or ())
+                      })
+
+
+def trace_llm_call(operation: str, model: str, prompt: str):
+    """
+    A span around a call to an LLM, recording the model and the size of the prompt.
+
+    Args:
+        operation (str): What the call does, e.g. 'summarize'.
+        model (str): The name of the model.
+        prompt (str): The prompt sent to the model.
+
+    Returns:
+        ContextManager: The span, or a no-op context manager when tracing is disabled.
+    """
+    if not tracing_enabled():
+        return nullcontext()
+
+    return trace_span(f"llm.{operation}", kind=SPAN_KIND_CLIENT,
+                      **{"gen_ai.system": "openai", "gen_ai.request.model": model,
+                         "gen_ai.prompt.characters": len(prompt)})
+
+
+def traced_diff_report(function: Callable) -> Callable:
+    """
+    Decorate a diff report function, to trace it and each of its stages. The techniques
+    are recorded as attributes, and the schema strings as their length.
+    """
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not tracing_enabled():
+            return function(*args, **kwargs)
+
+        attributes = {}
+        for name, value in signature.bind(*args, **kwargs).arguments.items():
+            if isinstance(value, str) and name.endswith("_str"):
+                attributes[f"diff.{name}.length"] = len(value)
+            elif isinstance(value, (str, bool)):
+                attributes[f"diff.{name}"] = value
+
+        with trace_span(function.__name__, **attributes):
+            # the stages are traced once, by the outermost diff report
+            if trace_span in stage_listeners.get():
+                return function(*args, **kwargs)
+            with listen_to_stages(trace_span):
+                return function(*args, **kwargs)
+
+    return wrapper
+
+
+def export_trace(spans: list[Span], path: str | None = None) -> None:
+    """
+    Append the spans of a finished trace to the export file, as an OTLP JSON request.
+
+    Args:
+        spans (list[Span]): The spans of the trace.
+        path (str | None): The export file, defaults to TRACE_EXPORT_PATH.
+    """
+    path = path or TRACE_EXPORT_PATH
+    if not path or not spans:
+        return
+
+    request = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [span.to_otlp() for span in spans]
+            }]
+        }]
+    }
+    try:
+        with _export_lock, open(path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(request) + "\n")
+    except OSError as e:
+        logging.error(f"Failed to export the trace to {path}: {e}")
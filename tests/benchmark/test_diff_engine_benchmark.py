@@ -0,0 +1,123 @@
+"""
+
+Benchmark the single-pass engine of schema_diff_engine against compare_schemas,
+on synthetic schemas of increasing size, and the memory of a diff report. Run with
+-s to see the timings.
+
+"""
+import random
+import time
+
+# import the benchmarked modules
+from memory_profiling import memory_profiled_diff_report
+from schema_changes import compare_schemas
+from schema_diff_engine import diff_schemas
+from schema_diff_report import parse_schema
+
+
+def synthetic_schema_pair(n_types: int, enum_size: int = 20, seed: int = 0) -> tuple[str, str]:
+    """
+    Generate two versions of a schema with n_types object types, where about a tenth
+    of the fields, arguments and enum values differ.
+    """
+    rng = random.Random(seed)
+    scalars = ["Int", "String", "Boolean", "ID", "Float"]
+    schema_v1, schema_v2 = [], []
+
+    for i in range(n_types):
+        fields_v1, fields_v2 = [], []
+        for j in range(8):
+            field_type = rng.choice(scalars)
+            default = rng.randint(0, 9)
+            field_v1 = f"f{j}(a: Int = {default}, b: String): {field_type}"
+            fields_v1.append(field_v1)
+            roll = rng.random()
+            if roll < 0.03:
+                continue
+            elif roll < 0.06:
+                fields_v2.append(f"f{j}(a: Int = {default}, b: String): [{field_type}]")
+            elif roll < 0.09:
+                fields_v2.append(f"f{j}(a: Int = {default + 1}, b: String): {field_type}")
+            else:
+                fields_v2.append(field_v1)
+        if rng.random() < 0.1:
+            fields_v2.append("added: String")
+        schema_v1.append(f"type T{i} {{ {' '.join(fields_v1)} }}")
+        schema_v2.append(f"type T{i} {{ {' '.join(fields_v2)} }}")
+
+        if i % 10 == 0:
+            values = [f"V{k}" for k in range(enum_size)]
+            schema_v1.append(f"enum E{i} {{ {' '.join(values)} }}")
+            schema_v2.append(f"enum E{i} {{ {' '.join(value for value in values if rng.random() > 0.1)} NEW }}")
+
+    query = "type Query { " + " ".join(f"t{i}: T{i}" for i in range(n_types)) + " }"
+    return "\n".join(schema_v1) + query, "\n".join(schema_v2) + query
+
+
+def best_time(function, *args, repeat: int = 3) -> float:
+    """
+    The best wall clock time of a function over a few runs.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def test_single_pass_engine_scales_linearly():
+    """
+    Benchmark both engines on growing schemas, checking the legacy output is identical
+    and the single-pass engine stays linear in the schema size.
+    """
+    timings = {}
+    for n_types in (250, 1000):
+        schema_version1, schema_version2 = (parse_schema(schema) for schema in synthetic_schema_pair(n_types))
+
+        assert diff_schemas(schema_version1, schema_version2, extended=False) == \
+               compare_schemas(schema_version1, schema_version2)
+
+        timings[n_types] = {
+            "compare_schemas": best_time(compare_schemas, schema_version1, schema_version2),
+            "single_pass": best_time(diff_schemas, schema_version1, schema_version2, False),
+            "single_pass_extended": best_time(diff_schemas, schema_version1, schema_version2),
+        }
+        print(f"\n{n_types} types: " + ", ".join(f"{name} {seconds * 1000:.1f}ms"
+                                                 for name, seconds in timings[n_types].items()))
+
+    # 4x the types should cost well below 8x the time
+    assert timings[1000]["single_pass_extended"] < 8 * timings[250]["single_pass_extended"]
+    assert timings[1000]["single_pass"] < 2 * timings[1000]["compare_schemas"]
+
+
+def test_single_pass_engine_large_enums():
+    """
+    Benchmark both engines on large enums, where compare_schemas' list lookups are quadratic.
+    """
+    schema_version1, schema_version2 = (parse_schema(schema) for schema in synthetic_schema_pair(20, enum_size=3000))
+
+    compare_schemas_time = best_time(compare_schemas, schema_version1, schema_version2, repeat=1)
+    single_pass_time = best_time(diff_schemas, schema_version1, schema_version2, False, repeat=1)
+    print(f"\nlarge enums: compare_schemas {compare_schemas_time * 1000:.1f}ms, "
+          f"single_pass {single_pass_time * 1000:.1f}ms")
+
+    assert single_pass_time < compare_schemas_time
+
+
+def test_diff_report_memory():
+    """
+    Profile the memory of a diff report, checking its peak stays proportional to the
+    schema size and parsing dominates it.
+    """
+    schema_v1_str, schema_v2_str = synthetic_schema_pair(60)
+    profile = memory_profiled_diff_report(schema_v1_str, schema_v2_str, 'algorithmic', 'algorithmic')["memory_profile"]
+    print(f"\npeak {profile['peak_bytes'] / 2 ** 20:.1f}MiB, " +
+          ", ".join(f"{name} {stage['peak_bytes'] / 2 ** 20:.2f}MiB" for name, stage in profile["stages"].items()))
+
+    # the parsed schemas take a few hundred bytes per byte of schema
+    assert profile["peak_bytes"] < 1000 * (len(schema_v1_str) + len(schema_v2_str))
+    stages = profile["stages"]
+    assert stages["identify_changes"]["peak_bytes"] < stages["parse_schema"]["peak_bytes"] / 10
+    assert stages["generate_release_summary"]["peak_bytes"] < stages["parse_schema"]["peak_bytes"] / 10
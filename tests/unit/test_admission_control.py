@@ -0,0 +1,111 @@
+"""
+
+Unit-test the admission control, size limits and cancellation in admission_control
+and request_cancellation.
+
+"""
+import asyncio
+import threading
+
+import pytest
+
+# import the tested modules
+import schema_changes
+from admission_control import AdmissionController, OverloadedError, SchemaTooLargeError, check_schema_sizes
+from request_cancellation import CancellationToken, DeadlineExceededError, RequestCancelledError, \
+    cancellation_scope, check_cancelled
+from schema_diff_report import graphql_diff_report
+
+
+def test_check_schema_sizes():
+    """
+    Tests that schemas above the maximum size are rejected.
+    """
+    check_schema_sizes("type Query { a: String }", max_bytes=100)
+
+    with pytest.raises(SchemaTooLargeError):
+        check_schema_sizes("type Query { a: String }", "x" * 101, max_bytes=100)
+
+
+def test_cancelled_diff_stops_at_checkpoint():
+    """
+    Tests that a cancelled or expired request stops the comparison instead of returning a failed diff.
+    """
+    token = CancellationToken()
+    token.cancel("Client disconnected")
+
+    with cancellation_scope(token), pytest.raises(RequestCancelledError):
+        graphql_diff_report("type Query { a: String }", "type Query { a: Int }", 'algorithmic', 'algorithmic')
+
+    with cancellation_scope(CancellationToken(deadline_seconds=0)), pytest.raises(DeadlineExceededError):
+        check_cancelled()
+
+    # outside a scope the checkpoints are no-ops
+    check_cancelled()
+
+
+def test_admission_queue_rejects_when_full():
+    """
+    Tests that requests beyond the running and queued capacity get 429,
+    and queued requests that wait for too long get 503.
+    """
+
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue_depth=1, queue_timeout_seconds=0.2)
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with controller.admit():
+                await release.wait()
+
+        running = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+
+        with pytest.raises(OverloadedError) as rejected:
+            async with controller.admit():
+                pass
+        assert rejected.value.status_code == 429
+        assert controller.metrics()["queued"] == 1
+
+        with pytest.raises(OverloadedError) as timed_out:
+            await queued
+        assert timed_out.value.status_code == 503
+
+        release.set()
+        await running
+        return controller.metrics()
+
+    metrics = asyncio.run(scenario())
+
+    assert metrics["active"] == 0 and metrics["queued"] == 0
+    assert metrics["rejected_total"] == 1 and metrics["queue_timeout_total"] == 1
+
+
+def test_admission_run_cancels_on_disconnect(monkeypatch):
+    """
+    Tests that a client disconnect cancels the running diff at its next checkpoint.
+    """
+    started = threading.Event()
+    original_check_cancelled = schema_changes.check_cancelled
+
+    def slow_check_cancelled():
+        started.set()
+        threading.Event().wait(0.05)
+        original_check_cancelled()
+
+    monkeypatch.setattr(schema_changes, "check_cancelled", slow_check_cancelled)
+
+    async def is_disconnected():
+        return started.is_set()
+
+    async def scenario():
+        controller = AdmissionController()
+        schema_v1 = "\n".join(f"type T{i} {{ a: String }}" for i in range(200)) + " type Query { a: String }"
+        with pytest.raises(RequestCancelledError):
+            await controller.run(graphql_diff_report, schema_v1, "type Query { a: Int }", 'algorithmic',
+                                 'algorithmic', is_disconnected=is_disconnected, deadline_seconds=None)
+        return controller.metrics()
+
+    assert asyncio.run(scenario())["cancelled_total"] == 1
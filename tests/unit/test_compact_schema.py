@@ -0,0 +1,105 @@
+"""
+
+Unit-test the compact schema model in compact_schema.
+
+"""
+# import the tested module
+from compact_schema import compact_schema, encode_type_ref, memory_footprint
+from schema_changes import compare_schemas
+from schema_diff_report import parse_schema
+
+SCHEMA_V1 = """
+scalar Status
+
+enum Role {
+    ADMIN
+    ACTIVE
+}
+
+type Character {
+    id: ID!
+    name: String!
+}
+
+type OldCharacter {
+    id: ID!
+}
+
+type Book {
+    id: ID!
+    author: String!
+    genre: String!
+    tags: [String]
+    ratings(minScore: Int = 1, maxScore: Int = 6): [Int!]!
+}
+
+type Query {
+    getBookById(id: ID!): Book
+    getAllBooks: [Book]
+    search(text: String, limit: Int, offset: Int): [Book]
+}
+"""
+
+SCHEMA_V2 = """
+enum Status {
+    ACTIVE
+    INACTIVE
+}
+
+enum Role {
+    ADMIN
+    USER
+}
+
+interface Character {
+    id: ID!
+    name: String!
+}
+
+type Book {
+    id: Int
+    author: String
+    genre: ID
+    tags: [Int]
+    ratings(minScore: Int = 1, maxScore: Int = 5): [Int!]!
+}
+
+type Query {
+    getBookById(bookId: ID!): Book
+    search(query: String, first: Int): [Book]
+}
+"""
+
+
+def test_encode_type_ref():
+    """
+    Tests the tuple encoding of wrapped type references.
+    """
+    schema = parse_schema("type Query { a: [Int!]! b: String }")
+    fields = schema.type_map["Query"].fields
+
+    assert encode_type_ref(fields["a"].type) == ('!', '[', '!', 'Int')
+    assert encode_type_ref(fields["b"].type) == ('String',)
+
+
+def test_compare_schemas_on_compact_model():
+    """
+    Tests that comparing the compact models gives the same changes as comparing the graphql-core schemas.
+    """
+    schema_version1 = parse_schema(SCHEMA_V1)
+    schema_version2 = parse_schema(SCHEMA_V2)
+
+    expected_changes = compare_schemas(schema_version1, schema_version2)
+
+    assert len(expected_changes) > 10
+    assert compare_schemas(compact_schema(schema_version1), compact_schema(schema_version2)) == expected_changes
+
+
+def test_memory_footprint():
+    """
+    Tests that the compact model is smaller than the graphql-core object graph.
+    """
+    footprint = memory_footprint(parse_schema(SCHEMA_V1))
+
+    assert footprint["compact_bytes"] < footprint["graphql_core_bytes"]
+    assert footprint["compact_to_graphql_core_ratio"] < 0.5
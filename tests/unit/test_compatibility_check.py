@@ -0,0 +1,87 @@
+"""
+
+Unit-test the early-exit compatibility check.
+
+"""
+import json
+
+import pytest
+
+# import the tested module
+import schema_diff_engine
+from compatibility_check import check_compatibility
+from schema_diff_cli import main
+from schema_diff_engine import diff_schemas
+from schema_diff_report import parse_schema
+
+# the first type loses a field, the others only gain one
+TYPES_V1 = " ".join(f"type T{i} {{ id: ID! name: String }}" for i in range(50))
+TYPES_V2 = "type T0 { id: ID! } " + " ".join(f"type T{i} {{ id: ID! name: String age: Int }}" for i in range(1, 50))
+SCHEMA_V1 = f"type Query {{ {' '.join(f't{i}: T{i}' for i in range(50))} }} {TYPES_V1}"
+SCHEMA_V2 = f"type Query {{ {' '.join(f't{i}: T{i}' for i in range(50))} }} {TYPES_V2} type Extra {{ id: ID }}"
+
+
+def test_stops_at_first_breaking_change(monkeypatch):
+    """
+    Tests that the traversal stops at the first breaking change, before visiting the other types.
+    """
+    visited = []
+    diff_type = schema_diff_engine.diff_type
+
+    def counting_diff_type(type_name, *args):
+        visited.append(type_name)
+        return diff_type(type_name, *args)
+
+    monkeypatch.setattr(schema_diff_engine, "diff_type", counting_diff_type)
+
+    result = check_compatibility(SCHEMA_V1, SCHEMA_V2)
+
+    assert result["compatible"] is False
+    assert result["stopped_early"] is True
+    assert [(change["type"], change["field"]) for change in result["breaking_changes"]] == [("T0", "name")]
+    assert len(visited) < 5
+
+
+def test_max_breaking_and_compatible_versions():
+    """
+    Tests that all the breaking changes are found without a limit, and that additive or
+    reordered versions are compatible.
+    """
+    schema_v2 = SCHEMA_V2.replace("type T1 { id: ID! name: String age: Int }", "type T1 { id: Int name: String }")
+    expected = [change for change in diff_schemas(parse_schema(SCHEMA_V1), parse_schema(schema_v2))
+                if change["breaking"]]
+
+    result = check_compatibility(SCHEMA_V1, schema_v2, max_breaking=None)
+    assert result["breaking_changes"] == expected and len(expected) == 2
+    assert result["stopped_early"] is False
+    assert check_compatibility(SCHEMA_V1, schema_v2, max_breaking=2)["breaking_changes"] == expected
+
+    additive = SCHEMA_V1 + " type Extra { id: ID }"
+    assert check_compatibility(SCHEMA_V1, additive) == {"compatible": True, "breaking_changes": [],
+                                                        "stopped_early": False}
+    reordered = f"{TYPES_V1} type Query {{ {' '.join(f't{i}: T{i}' for i in reversed(range(50)))} }}"
+    assert check_compatibility(SCHEMA_V1, reordered)["compatible"] is True
+
+
+def test_failures_and_cli_exit_status(tmp_path, capsys):
+    """
+    Tests the parsing and technique failures, and the exit status of 'diff --check'.
+    """
+    assert "parsing_failed" in check_compatibility("type Query {", SCHEMA_V2)
+    assert check_compatibility(SCHEMA_V1, SCHEMA_V2, identify_changes_technique='GPT3.5')["status"] == "Failed"
+
+    schema_v1_path, schema_v2_path = tmp_path / "v1.graphql", tmp_path / "v2.graphql"
+    schema_v1_path.write_text(SCHEMA_V1)
+    schema_v2_path.write_text(SCHEMA_V2)
+
+    assert main(["diff", str(schema_v1_path), str(schema_v2_path), "--check"]) == 1
+    assert json.loads(capsys.readouterr().out)["breaking_changes"][0]["type"] == "T0"
+    assert main(["diff", str(schema_v1_path), str(schema_v1_path), "--check", "5"]) == 0
+    assert json.loads(capsys.readouterr().out)["compatible"] is True
+
+    # a check cannot be profiled, nor stop before the first breaking change
+    for arguments in (["--check", "0"], ["--check", "--profile-cpu"], ["--profile-memory", "--profile-cpu"]):
+        with pytest.raises(SystemExit) as exit_info:
+            main(["diff", str(schema_v1_path), str(schema_v2_path), *arguments])
+        assert exit_info.value.code == 2
+    assert "not allowed with argument" in capsys.readouterr().err
@@ -0,0 +1,89 @@
+"""
+
+Unit-test the CPU profiling of cpu_profiling.
+
+"""
+import json
+
+import pytest
+
+# import the tested module
+from cpu_profiling import ProfilingNotAuthorizedError, check_profile_token, cpu_profiled_diff_report, profile_cpu
+from diff_stages import DIFF_STAGES, diff_stage
+from schema_diff_cli import main
+
+SCHEMA_V1 = "type Query { book(id: ID!, lang: String): Book } type Book { id: ID! title: String pages: Int }"
+SCHEMA_V2 = "type Query { book(id: ID!, lang: Int): Book } type Book { id: ID! title: String }"
+
+
+def test_deterministic_profile_reports_the_diff_functions():
+    """
+    Tests that the cProfile profile holds the time and calls of the diff functions, and of each stage.
+    """
+    report = cpu_profiled_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic', profiler="deterministic",
+                                      top=1000)
+    profile = report["cpu_profile"]
+
+    assert "Field 'pages' was removed" in [change["change"] for change in report["changes"]]
+    assert profile["profiler"] == "deterministic"
+    assert list(profile["stages"]) == list(DIFF_STAGES)
+    functions = {function["function"]: function for function in profile["functions"]}
+    assert functions["schema_changes.py:compare_arguments"]["calls"] >= 1
+    assert functions["schema_changes.py:get_field_type_name"]["location"].startswith("src/schema_changes.py:")
+    assert functions["build_ast_schema.py:build_schema"]["cumulative_seconds"] <= profile["seconds"]
+    self_seconds = [function["self_seconds"] for function in profile["functions"]]
+    assert self_seconds == sorted(self_seconds, reverse=True)
+
+    # the failures are returned as they are
+    failure = cpu_profiled_diff_report("type Query {", "type Query { a", 'algorithmic', 'algorithmic')
+    assert "parsing_failed" in failure[0]
+
+
+def test_sampling_profile_finds_the_hot_function():
+    """
+    Tests that sampling the stack attributes the time to the function running it.
+    """
+    def hot_loop():
+        total = 0
+        for i in range(3_000_000):
+            total += i * i
+        return total
+
+    def slow_diff():
+        with diff_stage("identify_changes"):
+            return hot_loop()
+
+    result, profile = profile_cpu(slow_diff, profiler="sampling", top=5)
+
+    assert result == sum(i * i for i in range(3_000_000))
+    assert profile["samples"] > 0
+    hottest = profile["functions"][0]
+    assert hottest["function"] == "test_cpu_profiling.py:hot_loop" and hottest["samples"] > 0
+    assert hottest["self_seconds"] <= hottest["cumulative_seconds"] <= profile["seconds"]
+    assert profile["stages"]["identify_changes"] > 0
+
+    with pytest.raises(ValueError):
+        profile_cpu(slow_diff, profiler="line")
+
+
+def test_profile_token_and_cli(tmp_path, capsys):
+    """
+    Tests that profiling requires the configured token, and the '--profile-cpu' CLI flag.
+    """
+    with pytest.raises(ProfilingNotAuthorizedError, match="disabled"):
+        check_profile_token("secret", expected_token="")
+    with pytest.raises(ProfilingNotAuthorizedError, match="X-Profile-Token"):
+        check_profile_token(None, expected_token="secret")
+    with pytest.raises(ProfilingNotAuthorizedError):
+        check_profile_token("guess", expected_token="secret")
+    check_profile_token("secret", expected_token="secret")
+
+    schema_v1_path, schema_v2_path = tmp_path / "v1.graphql", tmp_path / "v2.graphql"
+    schema_v1_path.write_text(SCHEMA_V1)
+    schema_v2_path.write_text(SCHEMA_V2)
+
+    assert main(["diff", str(schema_v1_path), str(schema_v2_path), "--profile-cpu"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["cpu_profile"]["profiler"] == "deterministic" and report["cpu_profile"]["functions"]
+    assert main(["diff", str(schema_v1_path), str(schema_v2_path), "--profile-cpu", "sampling"]) == 0
+    assert json.loads(capsys.readouterr().out)["cpu_profile"]["profiler"] == "sampling"
@@ -0,0 +1,85 @@
+"""
+
+Unit-test the asynchronous diff jobs of diff_jobs.
+
+"""
+import threading
+import time
+
+# import the tested module
+import diff_jobs
+from diff_jobs import JobQueue, run_worker
+
+SCHEMA_V1 = "type Query { a: String b: Int }"
+SCHEMA_V2 = "type Query { a: Int }"
+
+
+def diff_request(schema_v2_str: str = SCHEMA_V2) -> dict:
+    return {
+        "schema_v1_str": SCHEMA_V1,
+        "schema_v2_str": schema_v2_str,
+        "identify_changes_technique": "algorithmic",
+        "summarization_technique": "algorithmic"
+    }
+
+
+def test_run_worker_completes_jobs(tmp_path):
+    """
+    Tests that a worker runs the queued jobs, persisting their progress and result or error.
+    """
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(path)
+    job_id = queue.submit(diff_request())
+    failing_job_id = queue.submit({"schema_v1_str": SCHEMA_V1})
+
+    assert queue.get(job_id)["status"] == "queued"
+    assert run_worker(path, max_jobs=2) == 2
+
+    job = queue.get(job_id)
+    assert job["status"] == "succeeded"
+    assert job["progress"] == {"stage": "generate_release_summary", "completed_stages": 4, "total_stages": 4}
+    assert [change["change"] for change in job["result"]["changes"]] == [
+        "Field type changed from 'String' to 'Int'", "Field 'b' was removed"
+    ]
+    assert queue.get(failing_job_id)["status"] == "failed"
+    assert queue.get(failing_job_id)["error"].startswith("TypeError")
+
+
+def test_claim_is_exclusive(tmp_path):
+    """
+    Tests that concurrent workers never claim the same job.
+    """
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_ids = {queue.submit(diff_request()) for _ in range(40)}
+    claimed = []
+
+    def claim_all(worker: str):
+        while (job := queue.claim(worker)) is not None:
+            claimed.append(job[0])
+
+    threads = [threading.Thread(target=claim_all, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_stale_jobs_are_queued_again(tmp_path, monkeypatch):
+    """
+    Tests that the job of an unresponsive worker is queued again, and fails after the maximum attempts.
+    """
+    monkeypatch.setattr(diff_jobs, "JOB_STALE_SECONDS", 0.01)
+    monkeypatch.setattr(diff_jobs, "JOB_MAX_ATTEMPTS", 2)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit(diff_request())
+
+    assert queue.claim("crashed-worker")[0] == job_id
+    time.sleep(0.05)
+    assert queue.claim("second-worker")[0] == job_id
+    assert queue.get(job_id)["attempts"] == 2
+
+    time.sleep(0.05)
+    assert queue.claim("third-worker") is None
+    assert queue.get(job_id)["status"] == "failed"
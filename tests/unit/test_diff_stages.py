@@ -0,0 +1,48 @@
+"""
+
+Unit-test the diff stage listeners of diff_stages.
+
+"""
+from contextlib import contextmanager
+
+# import the tested module
+from diff_stages import DIFF_STAGES, diff_stage, listen_to_stages
+from schema_diff_report import graphql_diff_report
+
+
+def test_listeners_observe_the_diff_stages():
+    """
+    Tests that a listener enters and exits every stage of graphql_diff_report, in order.
+    """
+    events = []
+
+    @contextmanager
+    def listener(stage: str):
+        events.append(("start", stage))
+        yield
+        events.append(("end", stage))
+
+    with listen_to_stages(listener):
+        graphql_diff_report("type Query { a: String }", "type Query { a: Int }", 'algorithmic', 'algorithmic')
+
+    assert events == [(event, stage) for stage in DIFF_STAGES for event in ("start", "end")]
+
+
+def test_listeners_are_scoped():
+    """
+    Tests that a listener only observes the stages run inside its scope.
+    """
+    stages = []
+
+    @contextmanager
+    def listener(stage: str):
+        stages.append(stage)
+        yield
+
+    with listen_to_stages(listener):
+        with diff_stage("inside"):
+            pass
+    with diff_stage("outside"):
+        pass
+
+    assert stages == ["inside"]
@@ -0,0 +1,67 @@
+"""
+
+Unit-test the storage and indexed queries of diff reports in diff_store.
+
+"""
+import pytest
+
+# import the tested module
+from diff_store import DiffStore, DiffNotFoundError, classify_change, is_storable_report
+from schema_diff_report import graphql_diff_report
+
+SCHEMA_V1 = "type Query { a: String b: Int c: Int } type Book { x: Int y: Int } enum Genre { FICTION }"
+SCHEMA_V2 = "type Query { a: Int d: Int } type Book { x: String } enum Genre { FICTION POETRY }"
+
+
+def test_classify_change():
+    """
+    Tests that the kind of a change is identified from its change message.
+    """
+    report = graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic')
+
+    assert [classify_change(change) for change in report["changes"]] == [
+        "field_type_changed", "field_removed", "field_removed", "field_added",
+        "field_type_changed", "field_removed", "enum_value_added"
+    ]
+    assert classify_change({"change": "Something else", "breaking": False}) == "other"
+
+
+def test_query_changes_filters_and_pages(tmp_path):
+    """
+    Tests that the stored changes are filtered by their indexed columns and paged with a cursor.
+    """
+    store = DiffStore(str(tmp_path / "diffs.sqlite3"))
+    report = graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic')
+    diff_id = store.save_report(report, request_key="key")
+
+    assert store.find_diff("key") == diff_id
+    assert store.get_diff(diff_id)["breaking_count"] == 5
+
+    book_breaking = store.query_changes(diff_id, breaking=True, type_name="Book")
+    assert [change["field"] for change in book_breaking["changes"]] == ["x", "y"]
+    assert book_breaking["next_cursor"] is None
+
+    pages, cursor = [], None
+    while True:
+        page = store.query_changes(diff_id, limit=3, cursor=cursor)
+        pages.append(page["changes"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [len(changes) for changes in pages] == [3, 3, 1]
+    assert [change for changes in pages for change in changes] == report["changes"]
+
+
+def test_missing_and_failed_diffs(tmp_path):
+    """
+    Tests that unknown diffs raise DiffNotFoundError, and failed reports are not storable.
+    """
+    store = DiffStore(str(tmp_path / "diffs.sqlite3"))
+
+    with pytest.raises(DiffNotFoundError):
+        store.query_changes("missing")
+    with pytest.raises(ValueError):
+        store.query_changes(store.save_report({"changes": [], "release_notes": {}}), cursor="not-a-cursor")
+
+    assert not is_storable_report(graphql_diff_report("type", SCHEMA_V2, 'algorithmic', 'algorithmic'))
+    assert not is_storable_report({"changes": [{"status": "Failed", "reason": "error"}]})
@@ -0,0 +1,89 @@
+"""
+
+Unit-test the map-reduce summarization of hierarchical_summary, with a local stub model.
+
+"""
+import threading
+import time
+
+# import the tested module
+import release_summary
+from hierarchical_summary import estimate_tokens, pack_messages, summarize_hierarchically
+
+MESSAGES = [f"Field 'field{i}' was removed in Query" for i in range(2000)]
+
+
+class StubModel:
+    """
+    A model summarizing any prompt as the number of lines it received, recording
+    the size of its prompts and its peak number of concurrent calls.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompt_tokens = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self.lock:
+            self.prompt_tokens.append(estimate_tokens(prompt))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+
+        return f"{prompt.count(chr(10)) + 1} changes summarized"
+
+    def run(self, inputs: dict) -> str:
+        return self(inputs["schema_changes"])
+
+
+def test_pack_messages_respects_budget():
+    """
+    Tests that the chunks keep the message order and stay within the token budget.
+    """
+    chunks = pack_messages(MESSAGES, max_tokens=200)
+
+    assert [message for chunk in chunks for message in chunk] == MESSAGES
+    assert all(estimate_tokens("\n".join(chunk)) <= 200 for chunk in chunks)
+    assert pack_messages(["x" * 4000], max_tokens=100) == [["x" * 400]]
+
+
+def test_summarize_hierarchically():
+    """
+    Tests that every model call stays within the budget, chunks are summarized concurrently,
+    and the partial summaries are reduced to a single summary.
+    """
+    model = StubModel(delay=0.01)
+
+    result = summarize_hierarchically(MESSAGES, model, max_chunk_tokens=200, max_workers=4)
+
+    stats = result["stats"]
+    assert max(model.prompt_tokens) <= 200
+    assert model.max_active > 1
+    assert stats["map_calls"] == len(pack_messages(MESSAGES, 200))
+    assert stats["reduce_rounds"] >= 2
+    assert len(model.prompt_tokens) == stats["map_calls"] + stats["reduce_calls"]
+    assert result["summary"].endswith("changes summarized")
+    assert set(stats["stage_seconds"]) == {"map", "reduce", "total"}
+
+
+def test_generate_release_summary_gpt_map_reduce(monkeypatch):
+    """
+    Tests that the GPT3.5 summarization goes through the map-reduce summarizer and reports its statistics.
+    """
+    model = StubModel()
+    monkeypatch.setattr(release_summary, "initialize_langchain", lambda api_key, request_timeout=None: model)
+    changes = [{"type": "Query", "field": f"field{i}", "change": f"Field 'field{i}' was removed", "breaking": True}
+               for i in range(3)]
+
+    report = release_summary.generate_release_summary(changes, 'GPT3.5')
+
+    assert report["release_notes"]["summary"] == (
+        "This release introduces 3 breaking change(s) and 0 non-breaking change(s): "
+        "Breaking changes: 3 changes summarized. "
+    )
+    assert report["release_notes"]["summarization_stats"]["breaking"]["map_calls"] == 1
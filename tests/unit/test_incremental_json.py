@@ -0,0 +1,86 @@
+"""
+
+Unit-test the incremental JSON array parser of incremental_json, and the streamed
+GPT3.5 change identification built on it.
+
+"""
+from types import SimpleNamespace
+
+# import the tested module
+import schema_changes_llm
+from incremental_json import IncrementalJSONArrayParser, iter_json_array
+
+COMPLETION = '''```json
+[
+  {"type": "Book", "field": "title", "change": "Field 'title' type changed from \\"String\\" to {Int}", "breaking": true},
+  {"type": "Query", "field": null, "change": "Type 'Query' changed", "breaking": false, "nested": [{"a": [1, 2]}]}
+]
+```'''
+
+
+def test_objects_emitted_as_soon_as_complete():
+    """
+    Tests that each object of the array is emitted as soon as its closing brace is fed.
+    """
+    parser = IncrementalJSONArrayParser()
+    emitted_at = []
+    for position, character in enumerate(COMPLETION):
+        for change in parser.feed(character):
+            emitted_at.append((position, change))
+
+    # each object is emitted by its closing brace, escaped quotes and braces inside strings included
+    assert [COMPLETION[position] for position, _ in emitted_at] == ["}", "}"]
+    assert emitted_at[0][0] < COMPLETION.index('"Query"')
+    assert emitted_at[0][1]["change"] == "Field 'title' type changed from \"String\" to {Int}"
+    assert emitted_at[1][1]["nested"] == [{"a": [1, 2]}]
+    assert parser.finished and parser.malformed == 0
+
+
+def test_malformed_objects_and_tail_are_skipped():
+    """
+    Tests that malformed objects and an unfinished tail are skipped, keeping the valid objects.
+    """
+    text = '[{"type": "A", "breaking": true}, {"type": "B", "breaking": tru}, {"type": "C"}, {"type": "D", "cha'
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    assert list(iter_json_array(chunks)) == [{"type": "A", "breaking": True}, {"type": "C"}]
+
+
+def test_analyze_schema_changes_streams_changes(monkeypatch):
+    """
+    Tests that the GPT3.5 identification streams the completion, passing each change to
+    the callback, and still fails as a whole on output without a JSON array.
+    """
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    class Stream(list):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return Stream([chunk(COMPLETION[i:i + 10]) for i in range(0, len(COMPLETION), 10)] +
+                      [chunk(usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50))])
+
+    monkeypatch.setattr(schema_changes_llm, "client",
+                        SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+    received = []
+    changes = schema_changes_llm.analyze_schema_changes("type Query { a: Int }", "type Query { b: Int }",
+                                                        on_change=received.append)
+
+    assert requests[0]["stream"] is True
+    assert [change["type"] for change in changes] == ["Book", "Query"]
+    assert received == changes
+
+    # output with no JSON array still fails as a whole
+    monkeypatch.setattr(schema_changes_llm.client.chat.completions, "create",
+                        lambda **kwargs: Stream([chunk("I cannot compare these schemas.")]))
+    assert "error" in schema_changes_llm.analyze_schema_changes("type Query { a: Int }", "type Query { b: Int }")
@@ -0,0 +1,201 @@
+"""
+
+Unit-test the timeouts, retries, hedging and circuit breaker of the OpenAI calls,
+against a local stub of the OpenAI API injecting delays and errors.
+
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+# import the tested module
+import llm_resilience
+import release_summary
+import schema_changes_llm
+from llm_resilience import CircuitBreaker, LatencyTracker, ResilientLLM
+from request_cancellation import CancellationToken, cancellation_scope
+from schema_diff_report import graphql_diff_report
+
+SCHEMA_V1 = "type Query { book: Book } type Book { id: ID! title: String }"
+SCHEMA_V2 = "type Query { book: Book } type Book { id: ID! }"
+
+COMPLETION = '[{"type": "Book", "field": "title", "change": "Field \'title\' was removed", "breaking": true}]'
+
+
+class StubOpenAI:
+    """
+    A local server answering the streamed chat completions, following a script of
+    behaviors, one per request: an HTTP error status, or a delay before answering.
+    """
+
+    def __init__(self, script: list):
+        self.script = list(script)
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with stub.lock:
+                    stub.requests += 1
+                    behavior = stub.script.pop(0) if stub.script else ("ok",)
+
+                if behavior[0] == "status":
+                    body = json.dumps({"error": {"message": "injected error", "type": "server_error"}}).encode()
+                    self.send_response(behavior[1])
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                if behavior[0] == "delay":
+                    time.sleep(behavior[1])
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for start in range(0, len(COMPLETION), 20):
+                    chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "gpt-3.5-turbo",
+                             "choices": [{"index": 0, "delta": {"content": COMPLETION[start:start + 20]},
+                                          "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+
+@pytest.fixture
+def stub_openai(monkeypatch):
+    servers = []
+
+    def start(script: list, **resilience) -> tuple[StubOpenAI, ResilientLLM, ResilientLLM]:
+        stub = StubOpenAI(script)
+        servers.append(stub)
+        calls = ResilientLLM(**{"timeout_seconds": 0.5, "backoff_base_seconds": 0.01, **resilience})
+        # the summarization has its own latencies, but shares the circuit breaker
+        summarization_calls = ResilientLLM(**{"timeout_seconds": 0.5, "backoff_base_seconds": 0.01,
+                                              **resilience, "breaker": calls.breaker, "latencies": None})
+        monkeypatch.setattr(schema_changes_llm, "client",
+                            openai.OpenAI(api_key="stub", base_url=stub.base_url, max_retries=0))
+        monkeypatch.setattr(schema_changes_llm, "identification_calls", calls)
+        monkeypatch.setattr(release_summary, "summarization_calls", summarization_calls)
+        return stub, calls, summarization_calls
+
+    yield start
+    for stub in servers:
+        stub.server.shutdown()
+
+
+def test_retries_errors_and_timeouts(stub_openai):
+    """
+    Tests that a server error and a slow attempt are retried, within the attempt timeout.
+    """
+    stub, calls, _ = stub_openai([("status", 503), ("delay", 2.0)], max_retries=2)
+
+    start = time.monotonic()
+    changes = schema_changes_llm.analyze_schema_changes(SCHEMA_V1, SCHEMA_V2)
+
+    assert time.monotonic() - start < 1.5
+    assert [change["field"] for change in changes] == ["title"]
+    assert stub.requests == 3
+    assert calls.counters["retries_total"] == 2 and calls.counters["failures_total"] == 2
+    assert calls.breaker.state == "closed"
+
+
+def test_hedged_request(stub_openai):
+    """
+    Tests that an attempt slower than the percentile of the recent latencies is hedged,
+    and that the duplicate request answers first.
+    """
+    latencies = LatencyTracker(min_samples=5)
+    for _ in range(10):
+        latencies.record(0.05)
+    stub, calls, summarization_calls = stub_openai([("delay", 1.0)], timeout_seconds=5.0, hedge_percentile=0.95,
+                                                   latencies=latencies)
+
+    start = time.monotonic()
+    changes = schema_changes_llm.analyze_schema_changes(SCHEMA_V1, SCHEMA_V2)
+
+    assert time.monotonic() - start < 0.8
+    assert len(changes) == 1
+    assert stub.requests == 2
+    assert calls.counters["hedges_total"] == 1 and calls.counters["hedge_wins_total"] == 1
+    assert calls.counters["retries_total"] == 0
+    # the summaries are not hedged on the latencies of the streamed identification
+    assert summarization_calls.latencies.percentile(0.95) is None
+
+
+def test_summary_attempts_use_their_own_timeout(monkeypatch):
+    """
+    Tests that each summarization attempt builds its chain with the timeout of the attempt,
+    which shrinks with the deadline of the request.
+    """
+    request_timeouts = []
+
+    class TimingOutOnceModel:
+        def __init__(self, request_timeout):
+            request_timeouts.append(request_timeout)
+
+        def run(self, inputs: dict) -> str:
+            if len(request_timeouts) == 1:
+                time.sleep(0.2)
+                raise TimeoutError("model timed out")
+            return "The title of books was removed"
+
+    monkeypatch.setattr(release_summary, "initialize_langchain",
+                        lambda api_key, request_timeout=None: TimingOutOnceModel(request_timeout))
+    monkeypatch.setattr(release_summary, "summarization_calls",
+                        ResilientLLM(timeout_seconds=30, max_retries=1, backoff_base_seconds=0.01))
+
+    with cancellation_scope(CancellationToken(1.0)):
+        report = graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'GPT3.5')
+
+    assert "The title of books was removed" in report["release_notes"]["summary"]
+    assert len(request_timeouts) == 2
+    assert 1.0 >= request_timeouts[0] > request_timeouts[1] + 0.15
+
+
+def test_circuit_breaker_falls_back_to_algorithmic(stub_openai, monkeypatch):
+    """
+    Tests that the breaker opens after consecutive failures, and that the identification
+    and the summarization then fall back to the algorithmic technique without calling the API.
+    """
+    stub, calls, summarization_calls = stub_openai([("status", 500)] * 10, max_retries=1,
+                                                   breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    monkeypatch.setattr(release_summary, "initialize_langchain", lambda api_key, request_timeout=None: None)
+
+    report = graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'GPT3.5', 'GPT3.5')
+
+    assert stub.requests == 2
+    assert calls.breaker.state == "open"
+    assert report["fallback"]["technique"] == "algorithmic"
+    assert report["changes"] == graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic')["changes"]
+    assert report["release_notes"]["fallback"]["technique"] == "algorithmic"
+    assert "circuit breaker is open" in report["release_notes"]["fallback"]["reason"]
+    assert summarization_calls.counters["breaker_rejections_total"] == 1
+
+    # the breaker lets a single trial call through once reset, and closes if it succeeds
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    with pytest.raises(llm_resilience.CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(llm_resilience.CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,78 @@
+"""
+
+Unit-test the memory profiling of memory_profiling.
+
+"""
+import tracemalloc
+
+# import the tested module
+from diff_stages import DIFF_STAGES, diff_stage
+from memory_profiling import memory_profiled_diff_report, profile_memory
+from schema_diff_report import graphql_diff_report
+
+SCHEMA_V1 = "type Query { a: String b: Int }"
+SCHEMA_V2 = "type Query { a: Int }"
+
+
+def test_profile_memory_records_each_stage():
+    """
+    Tests that the profile holds the allocations of every stage, and leaves tracemalloc stopped.
+    """
+    report = memory_profiled_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic')
+    profile = report["memory_profile"]
+
+    assert [change["change"] for change in report["changes"]] == [
+        "Field type changed from 'String' to 'Int'", "Field 'b' was removed"
+    ]
+    assert list(profile["stages"]) == list(DIFF_STAGES)
+    assert profile["peak_bytes"] >= max(stage["peak_bytes"] for stage in profile["stages"].values()) > 0
+    assert profile["allocated_bytes"] == sum(stage["allocated_bytes"] for stage in profile["stages"].values())
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_memory_reports_the_top_allocations():
+    """
+    Tests that the top allocations point to the allocating source line, and exclude the profiler's own.
+    """
+    def allocate():
+        with diff_stage("allocate"):
+            data = [bytes(1000) for _ in range(1000)]
+        return len(data)
+
+    result, profile = profile_memory(allocate, top=3)
+
+    assert result == 1000
+    assert profile["stages"]["allocate"]["allocated_bytes"] >= 1000 * 1000
+    top_allocation = profile["top_allocations"][0]
+    assert top_allocation["location"].startswith("unit/test_memory_profiling.py:")
+    assert top_allocation["count"] >= 1000
+    assert len(profile["top_allocations"]) <= 3
+    assert all(not allocation["location"].startswith("src/memory_profiling.py")
+               for allocation in profile["top_allocations"])
+
+
+def test_profile_memory_keeps_tracing_started_elsewhere():
+    """
+    Tests that profiling neither stops a tracemalloc started by the caller, nor clears its traces and peak.
+    """
+    def allocate():
+        with diff_stage("allocate"):
+            data = [bytes(1000) for _ in range(1000)]
+        return len(data)
+
+    tracemalloc.start()
+    try:
+        held = [bytes(1000) for _ in range(2000)]
+        traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+
+        _, profile = profile_memory(allocate)
+
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= peak_bytes >= traced_bytes >= 2000 * 1000
+        assert 1000 * 1000 <= profile["stages"]["allocate"]["allocated_bytes"] < 2000 * 1000
+        assert profile["top_allocations"][0]["location"].startswith("unit/test_memory_profiling.py:")
+        assert profile["top_allocations"][0]["size_bytes"] < 2000 * 1000
+        assert "upper bound" in profile["peak_bytes_note"]
+        assert len(held) == 2000
+    finally:
+        tracemalloc.stop()
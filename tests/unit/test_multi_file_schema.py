@@ -0,0 +1,103 @@
+"""
+
+Unit-test the loading of schemas split across many files.
+
+"""
+import json
+import os
+
+# import the tested module
+from multi_file_schema import SchemaFileCache, expand_schema_paths, load_schema, multi_file_diff_report
+from schema_diff_cli import main
+from schema_diff_report import graphql_diff_report
+from schema_watch import read_schema_files
+
+
+def write_schema_files(directory, files: dict, mtime_ns: int = 1) -> None:
+    """
+    Write schema files with a fixed modification time, so tests do not depend on the clock.
+    """
+    for name, schema_str in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(schema_str)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def schema_files(n_types: int, book_fields: str = "id: ID! title: String") -> dict:
+    files = {"query.graphql": "type Query { book: Book }", "types/book.graphql": f"type Book {{ {book_fields} }}",
+             "notes.txt": "not a schema file"}
+    for i in range(n_types):
+        files[f"types/t{i}.graphql"] = f"type T{i} {{ id: ID! }}\nextend type Query {{ t{i}: T{i} }}"
+
+    return files
+
+
+def test_directories_and_globs_match_the_concatenated_schema(tmp_path):
+    """
+    Tests that the files of a directory or glob pattern, including type extensions, give
+    the same report as their concatenation.
+    """
+    write_schema_files(tmp_path / "v1", schema_files(3))
+    write_schema_files(tmp_path / "v2", schema_files(4, "id: ID!"))
+
+    paths = expand_schema_paths([str(tmp_path / "v2")])
+    assert [os.path.relpath(path, tmp_path / "v2") for path in paths] == [
+        "query.graphql", os.path.join("types", "book.graphql")] + [os.path.join("types", f"t{i}.graphql")
+                                                                 for i in range(4)]
+    assert expand_schema_paths([str(tmp_path / "v2" / "**" / "*.graphql"), str(tmp_path / "v2")]) == paths
+
+    report = multi_file_diff_report([str(tmp_path / "v1")], [str(tmp_path / "v2" / "**" / "*.graphql")],
+                                    'algorithmic', 'algorithmic', cache=SchemaFileCache())
+    expected = graphql_diff_report(read_schema_files(expand_schema_paths([str(tmp_path / "v1")])),
+                                   read_schema_files(paths), 'algorithmic', 'algorithmic')
+    assert report == expected
+    assert {(change["type"], change.get("field")) for change in report["changes"]} >= {("Book", "title"),
+                                                                                       ("Query", "t3")}
+
+    assert load_schema([str(tmp_path / "missing" / "*.graphql")], SchemaFileCache())[1]["status"] == "Failed"
+
+
+def test_one_file_change_reparses_one_file(tmp_path):
+    """
+    Tests that the files are parsed on a worker pool once, and that after a change only
+    the changed file is parsed again, while touched files are not.
+    """
+    write_schema_files(tmp_path, schema_files(30))
+    cache = SchemaFileCache()
+
+    schema_str, schema = load_schema([str(tmp_path)], cache)
+    assert len(schema.query_type.fields) == 31
+    assert cache.counters["files_parsed"] == 32
+
+    write_schema_files(tmp_path, {"types/t7.graphql": "type T7 { id: ID! name: String }\nextend type Query { t7: T7 }"},
+                       mtime_ns=2)
+    _, schema = load_schema([str(tmp_path)], cache)
+    assert "name" in schema.type_map["T7"].fields
+    assert cache.counters["files_parsed"] == 33
+    assert cache.counters["schemas_built"] == 2
+
+    # touching and reformatting files neither parses them nor builds the schema again
+    write_schema_files(tmp_path, {"types/t8.graphql": "type T8 {\n  id: ID!\n}\nextend type Query { t8: T8 }"},
+                       mtime_ns=3)
+    os.utime(tmp_path / "query.graphql", ns=(3, 3))
+    assert load_schema([str(tmp_path)], cache)[1] is schema
+    assert cache.counters["files_parsed"] == 33 and cache.counters["schema_hits"] == 1
+
+
+def test_parsing_failures_and_cli(tmp_path, capsys):
+    """
+    Tests that the failing file is reported, and that the CLI diffs directories.
+    """
+    write_schema_files(tmp_path / "v1", schema_files(2))
+    write_schema_files(tmp_path / "v2", {**schema_files(2), "types/broken.graphql": "type Broken {"})
+    write_schema_files(tmp_path / "v3", {**schema_files(2), "types/extension.graphql": "extend type Missing { a: Int }"})
+
+    report = multi_file_diff_report([str(tmp_path / "v1")], [str(tmp_path / "v2")], 'algorithmic', 'algorithmic')
+    assert report["parsing_failed"][0] == 'Version 2 of the GraphQL schema could not be parsed'
+    assert "broken.graphql" in report["parsing_failed"][1]["reason"][0]
+    assert "Missing" in load_schema([str(tmp_path / "v3")])[1]["reason"][0]
+
+    write_schema_files(tmp_path / "v4", schema_files(2, "id: ID!"))
+    assert main(["diff", str(tmp_path / "v1"), str(tmp_path / "v4")]) == 0
+    assert json.loads(capsys.readouterr().out)["changes"][0]["change"] == "Field 'title' was removed"
@@ -0,0 +1,99 @@
+"""
+
+Unit-test the client-operation usage index in operation_usage.
+
+"""
+# import the tested module
+from operation_usage import build_operation_usage_index, rank_changes_by_impact
+from schema_changes import compare_schemas
+from schema_diff_report import parse_schema
+
+SCHEMA_V1 = """
+type Book {
+    id: ID!
+    title: String!
+    ratings(minScore: Int): [Int]
+}
+
+type Query {
+    getBookById(id: ID!): Book
+    getAllBooks: [Book]
+}
+"""
+
+OPERATIONS = {
+    "book.graphql": "query Book($id: ID!) { getBookById(id: $id) { id title } }",
+    "books.graphql": "query Books { getAllBooks { ...BookTitle } } fragment BookTitle on Book { title }",
+    "ratings.graphql": "query Ratings { getAllBooks { ratings(minScore: 3) @include(if: true) } }",
+}
+
+
+def test_usage_index_lookups():
+    """
+    Tests that types, fields and field arguments are indexed, including through fragments.
+    """
+    usage_index = build_operation_usage_index(parse_schema(SCHEMA_V1), OPERATIONS)
+
+    assert usage_index.operations_using("Book") == {"book.graphql", "books.graphql", "ratings.graphql"}
+    assert usage_index.operations_using("Book", "title") == {"book.graphql", "books.graphql"}
+    assert usage_index.operations_using("Query", "getBookById", "id") == {"book.graphql"}
+    assert usage_index.operations_using("Book", "ratings", "minScore") == {"ratings.graphql"}
+    assert usage_index.operations_using("Book", "ratings", "if") == set()
+
+
+def test_rank_changes_by_impact():
+    """
+    Tests that breaking changes are annotated with the operations they break and ranked first.
+    """
+    schema_v1 = parse_schema(SCHEMA_V1)
+    schema_v2 = parse_schema("""
+    type Book {
+        id: Int
+        title: String!
+        ratings(minScore: Int): [Int]
+        isbn: String
+    }
+
+    type Query {
+        getBookById(id: ID!): Book
+    }
+    """)
+    usage_index = build_operation_usage_index(schema_v1, OPERATIONS)
+
+    ranked_changes = rank_changes_by_impact(compare_schemas(schema_v1, schema_v2), usage_index)
+
+    assert [(change.get("field"), change["affected_operations"]) for change in ranked_changes] == [
+        ("getAllBooks", ["books.graphql", "ratings.graphql"]),
+        ("id", ["book.graphql"]),
+        ("isbn", []),
+    ]
+
+
+def test_removed_argument_affects_the_operations_passing_it():
+    """
+    Tests that removing or renaming an argument only affects the operations passing it,
+    not all the operations selecting its field.
+    """
+    schema_v1 = parse_schema(SCHEMA_V1)
+    schema_v2 = parse_schema(SCHEMA_V1.replace("ratings(minScore: Int)", "ratings"))
+    operations = {**OPERATIONS, "all_ratings.graphql": "query AllRatings { getAllBooks { ratings } }"}
+    usage_index = build_operation_usage_index(schema_v1, operations)
+
+    ranked_changes = rank_changes_by_impact(compare_schemas(schema_v1, schema_v2), usage_index)
+
+    assert [(change["change"], change["affected_operations"]) for change in ranked_changes] == [
+        ("Renamed or removed argument 'minScore' in 'ratings'", ["ratings.graphql"]),
+    ]
+
+    renamed_change = {"type": "Book", "field": "ratings", "change": "Renamed input parameter 'minScore' to 'min'"}
+    assert usage_index.operations_affected_by(renamed_change) == {"ratings.graphql"}
+
+
+def test_usage_index_unparsable_operation():
+    """
+    Tests that an invalid operation document is recorded and skipped.
+    """
+    usage_index = build_operation_usage_index(parse_schema(SCHEMA_V1), {"broken.graphql": "query {"})
+
+    assert usage_index.operation_count == 0
+    assert "broken.graphql" in usage_index.failed_operations
@@ -0,0 +1,72 @@
+"""
+
+Unit-test the reverse reference index and impact analysis of reference_graph.
+
+"""
+from graphql import build_schema
+
+# import the tested module
+from reference_graph import reference_index, strongly_connected_components
+from schema_diff_report import graphql_diff_report
+
+SCHEMA = """
+interface Node { id: ID! }
+type Book implements Node { id: ID! author: Author reviews(filter: ReviewFilter): [Review] }
+type Author { name: String books: [Book] }
+type Review { text: String }
+input ReviewFilter { rating: Rating }
+enum Rating { LOW HIGH }
+union SearchResult = Book
+type Orphan { id: ID }
+type Query { node(id: ID!): Node search(text: String): [SearchResult] author(name: String): Author }
+type Mutation { review(filter: ReviewFilter): Review }
+"""
+
+
+def test_root_fields_follow_fields_arguments_interfaces_and_unions():
+    """
+    Tests that a type is reached through field types, argument types, interfaces, unions and cycles.
+    """
+    index = reference_index(build_schema(SCHEMA))
+
+    assert index.root_fields("Book") == ["Query.node", "Query.search", "Query.author"]
+    assert index.root_fields("Review") == ["Query.node", "Query.search", "Query.author", "Mutation.review"]
+    assert index.root_fields("Rating") == ["Query.node", "Query.search", "Query.author", "Mutation.review"]
+    assert index.root_fields("Orphan") == []
+    assert index.root_fields("Query", "node") == ["Query.node"]
+
+
+def test_components_come_after_their_referrers():
+    """
+    Tests that the strongly connected components are in topological order of the references.
+    """
+    referrers = {
+        "Book": [("Author", "books"), ("Query", "book")],
+        "Author": [("Book", "author")],
+        "Review": [("Book", "reviews")],
+    }
+
+    components = strongly_connected_components(referrers)
+    position = {type_name: i for i, component in enumerate(components) for type_name in component}
+
+    assert sorted(map(sorted, components)) == [["Author", "Book"], ["Query"], ["Review"]]
+    assert position["Query"] < position["Book"] == position["Author"] < position["Review"]
+
+
+def test_diff_report_impact_analysis():
+    """
+    Tests that the changes of a diff report are annotated with the root fields reaching them.
+    """
+    schema_v2 = SCHEMA.replace("type Review { text: String }", "type Review { text: String! }") \
+                      .replace("type Orphan { id: ID }", "type Orphan { id: ID } type Shelf { books: [Book] }") \
+                      .replace("author(name: String): Author }", "author(name: String): Author shelf: Shelf }")
+
+    report = graphql_diff_report(SCHEMA, schema_v2, 'algorithmic', 'algorithmic', impact_analysis=True)
+
+    assert [(change["type"], change["affected_root_fields"]) for change in report["changes"]] == [
+        ("Review", ["Query.node", "Query.search", "Query.author", "Mutation.review"]),
+        ("Query", ["Query.shelf"]),
+        ("Shelf", ["Query.shelf"]),
+    ]
+    report = graphql_diff_report(SCHEMA, schema_v2, 'algorithmic', 'algorithmic')
+    assert "affected_root_fields" not in report["changes"][0]
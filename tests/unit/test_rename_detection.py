@@ -0,0 +1,91 @@
+"""
+
+Unit-test the detection of renamed types, fields and arguments in rename_detection.
+
+"""
+# import the tested module
+from rename_detection import detect_renames, match_renamed_types
+from schema_changes import compare_schemas
+from schema_diff_report import parse_schema, graphql_diff_report
+
+SCHEMA_V1 = """
+type Author { id: ID! name: String books: [Book] }
+type Book { id: ID! title: String pages: Int isbn: String }
+type Query { books(first: Int, after: String, genre: String): [Book] author(id: ID!): Author }
+"""
+
+SCHEMA_V2 = """
+type Writer { id: ID! fullName: String books: [Book] }
+type Book { id: ID! name: String pageCount: Int isbn: String }
+type Review { id: ID! text: String }
+type Query { books(limit: Int, after: String, genres: String, category: String): [Book] writer(id: ID!): Writer }
+"""
+
+
+def test_detect_renames():
+    """
+    Tests that renamed types, fields and arguments replace their removal and addition changes.
+    """
+    schema_version1, schema_version2 = parse_schema(SCHEMA_V1), parse_schema(SCHEMA_V2)
+
+    changes = detect_renames(schema_version1, schema_version2, compare_schemas(schema_version1, schema_version2))
+
+    assert sorted((change.get("type"), change.get("field", ""), change["change"]) for change in changes) == [
+        ("Book", "name", "Renamed field 'title' to 'name'"),
+        ("Book", "pageCount", "Renamed field 'pages' to 'pageCount'"),
+        ("Query", "books", "Added new input parameter 'category'"),
+        ("Query", "books", "Renamed input parameter 'first' to 'limit'"),
+        ("Query", "books", "Renamed input parameter 'genre' to 'genres'"),
+        ("Query", "writer", "Renamed field 'author' to 'writer'"),
+        ("Review", "", "Added new type 'Review'"),
+        ("Writer", "", "Type 'Author' was renamed to 'Writer'"),
+        ("Writer", "fullName", "Renamed field 'name' to 'fullName'"),
+    ]
+
+
+def test_match_renamed_types_ignores_common_members():
+    """
+    Tests that many renamed types sharing a common field are matched to their own rename.
+    """
+    schema_version1 = parse_schema("\n".join(f"type T{i} {{ id: ID! a{i}: Int b{i}: String }}" for i in range(500)))
+    schema_version2 = parse_schema("\n".join(f"type U{i} {{ id: ID! a{i}: Int b{i}: String }}" for i in range(500)))
+    removed_types = {f"T{i}": schema_version1.get_type(f"T{i}") for i in range(500)}
+    added_types = {f"U{i}": schema_version2.get_type(f"U{i}") for i in range(500)}
+
+    assert sorted(match_renamed_types(removed_types, added_types)) == sorted((f"T{i}", f"U{i}") for i in range(500))
+
+
+def test_graphql_diff_report_rename_detection():
+    """
+    Tests that renames are only reported when rename detection is requested.
+    """
+    schema_v1 = "type Query { title: String }"
+    schema_v2 = "type Query { name: String }"
+
+    report = graphql_diff_report(schema_v1, schema_v2, 'single-pass', 'algorithmic', rename_detection=True)
+
+    assert [change["change"] for change in report["changes"]] == ["Renamed field 'title' to 'name'"]
+    assert len(graphql_diff_report(schema_v1, schema_v2, 'single-pass', 'algorithmic')["changes"]) == 2
+
+
+def test_single_pass_rename_keeps_the_extended_changes():
+    """
+    Tests that the changes of renamed fields and types include the change kinds only the
+    single-pass technique detects.
+    """
+    schema_v1 = "type Query { tags(first: Int = 1): [String] @deprecated book: Book } " \
+                "type Book { id: ID! title: String @deprecated }"
+    schema_v2 = "type Query { labels(first: Int = 5): [String] book: Volume } type Volume { id: ID! title: String }"
+
+    report = graphql_diff_report(schema_v1, schema_v2, 'single-pass', 'algorithmic', rename_detection=True)
+
+    assert [change["change"] for change in report["changes"] if "book" not in change.get("field", "")] == [
+        "Renamed field 'tags' to 'labels'",
+        "Default value of argument 'first' changed from '1' to '5'",
+        "Field 'labels' is no longer deprecated",
+        "Type 'Book' was renamed to 'Volume'",
+        "Field 'title' is no longer deprecated",
+    ]
+    legacy_report = graphql_diff_report(schema_v1, schema_v2, 'algorithmic', 'algorithmic', rename_detection=True)
+    assert [change["change"] for change in legacy_report["changes"] if "book" not in change.get("field", "")] == [
+        "Renamed field 'tags' to 'labels'", "Type 'Book' was renamed to 'Volume'"]
@@ -0,0 +1,62 @@
+"""
+
+Unit-test the JSON serialization and compression of reports in report_serialization.
+
+"""
+import gzip
+import json
+
+# import the tested module
+import report_serialization
+from report_serialization import encode_report, negotiate_encoding, report_response
+
+REPORT = {
+    "changes": [
+        {
+            "type": "Query",
+            "field": "goodbye",
+            "change": "Added new field 'goodbye'",
+            "breaking": False,
+            "release_note": "A new field 'goodbye' has been added to 'Query'. This is a non-breaking change."
+        }
+    ] * 200,
+    "release_notes": {"summary": "This release introduces 0 breaking change(s) and 200 non-breaking change(s)."}
+}
+
+
+def test_encode_report_round_trip(monkeypatch):
+    """
+    Tests that both the orjson and the record by record stdlib encoders produce the same JSON document.
+    """
+    encoded = encode_report(REPORT)
+    monkeypatch.setattr(report_serialization, "orjson", None)
+    encoded_stdlib = encode_report(REPORT)
+
+    assert json.loads(encoded) == REPORT
+    assert json.loads(encoded_stdlib) == REPORT
+    assert json.loads(encode_report({"changes": []})) == {"changes": []}
+    assert json.loads(encode_report({"parsing_failed": ["error"]})) == {"parsing_failed": ["error"]}
+
+
+def test_negotiate_encoding(monkeypatch):
+    """
+    Tests the negotiation of the response encoding from the Accept-Encoding header.
+    """
+    monkeypatch.setattr(report_serialization, "brotli", None)
+
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding(None) is None
+
+
+def test_report_response_compression_threshold():
+    """
+    Tests that only responses above the size threshold are compressed.
+    """
+    response = report_response(REPORT, "gzip")
+    small_response = report_response({"changes": []}, "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == REPORT
+    assert "content-encoding" not in small_response.headers
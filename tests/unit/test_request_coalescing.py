@@ -0,0 +1,77 @@
+"""
+
+Unit-test the coalescing of concurrent identical requests in request_coalescing.
+
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# import the tested module
+import request_coalescing
+from request_coalescing import SingleFlight, coalesced_graphql_diff_report, request_key
+
+
+def test_single_flight_shares_in_flight_result():
+    """
+    Tests that concurrent calls with the same key wait on a single computation.
+    """
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"changes": []}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(single_flight.do, "key", compute) for _ in range(4)]
+        while single_flight.in_flight() == 0:
+            pass
+        # let every caller reach the in-flight computation before releasing it
+        threading.Event().wait(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(report is results[0][0] for report, _ in results)
+    assert single_flight.in_flight() == 0
+
+
+def test_single_flight_propagates_exceptions_and_forgets_key():
+    """
+    Tests that a failed computation is raised to its caller, and the key is computed again afterwards.
+    """
+    single_flight = SingleFlight()
+
+    def fail():
+        raise ValueError("upstream failure")
+
+    with pytest.raises(ValueError):
+        single_flight.do("key", fail)
+
+    assert single_flight.do("key", lambda: 1) == (1, False)
+
+
+def test_request_key_ignores_formatting():
+    """
+    Tests that requests differing only in whitespace are coalesced, but different techniques are not.
+    """
+    key = request_key("type Query { a: String }", "type Query { a: Int }", "algorithmic", "algorithmic")
+
+    assert key == request_key("type Query {\n  a: String\n}", "type Query { a: Int }", "algorithmic", "algorithmic")
+    assert key != request_key("type Query { a: String }", "type Query { a: Int }", "algorithmic", "GPT3.5")
+
+
+def test_coalesced_graphql_diff_report():
+    """
+    Tests that the coalesced report is the report of graphql_diff_report.
+    """
+    report = coalesced_graphql_diff_report("type Query { a: String }", "type Query { a: Int }",
+                                           "algorithmic", "algorithmic")
+
+    assert report["changes"][0]["change"] == "Field type changed from 'String' to 'Int'"
+    assert request_coalescing.diff_requests.in_flight() == 0
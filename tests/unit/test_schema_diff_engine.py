@@ -0,0 +1,120 @@
+"""
+
+Unit-test the single-pass comparison engine in schema_diff_engine.
+
+"""
+# import the tested module
+from schema_diff_engine import diff_schemas
+from schema_changes import compare_schemas
+from schema_diff_report import parse_schema, graphql_diff_report
+
+SCHEMA_V1 = """
+directive @cacheControl(maxAge: Int) on FIELD_DEFINITION
+
+union SearchResult = Book | Author
+
+input BookFilter {
+    genre: String = "fiction"
+    author: String
+}
+
+enum Role {
+    ADMIN
+    EDITOR
+}
+
+type Author {
+    name: String
+}
+
+type Book {
+    id: ID!
+    tags: [String!]!
+    legacyId: Int
+    ratings(minScore: Int = 1, maxScore: Int = 6): [Int!]!
+}
+
+type Query {
+    books(filter: BookFilter, first: Int!): [Book]
+    search(text: String): [SearchResult]
+}
+"""
+
+SCHEMA_V2 = """
+union SearchResult = Book
+
+input BookFilter {
+    genre: String = "poetry"
+    year: Int!
+}
+
+enum Role {
+    ADMIN
+    EDITOR @deprecated(reason: "Use ADMIN")
+}
+
+type Author {
+    name: String
+}
+
+type Book {
+    id: ID!
+    tags: [String]!
+    legacyId: Int @deprecated(reason: "Use id")
+    ratings(minScore: Int = 1, maxScore: Int = 5): [Int!]!
+}
+
+type Query {
+    books(filter: BookFilter, first: Int): [Book]
+    search(text: ID): [SearchResult]
+}
+"""
+
+
+def test_diff_schemas_extended_change_kinds():
+    """
+    Tests detection of the change kinds compare_schemas misses.
+    """
+    changes = diff_schemas(parse_schema(SCHEMA_V1), parse_schema(SCHEMA_V2))
+
+    assert [(change.get("type"), change["change"], change["breaking"]) for change in changes] == [
+        ("SearchResult", "Member 'Author' was removed from union", True),
+        ("BookFilter", "Default value of input field 'genre' changed from '\"fiction\"' to '\"poetry\"'", False),
+        ("BookFilter", "Input field 'author' was removed", True),
+        ("BookFilter", "Added new required input field 'year'", True),
+        ("Role", "Value 'EDITOR' was deprecated", False),
+        ("Book", "Field type changed from '[String!]!' to '[String]!'", True),
+        ("Book", "Field 'legacyId' was deprecated", False),
+        ("Book", "Default value of argument 'maxScore' changed from '6' to '5'", False),
+        ("Query", "Argument 'first' type changed from 'Int!' to 'Int'", False),
+        ("Query", "Argument 'text' type changed from 'String' to 'ID'", True),
+        (None, "Directive '@cacheControl' was removed", True),
+    ]
+
+
+def test_diff_schemas_matches_compare_schemas():
+    """
+    Tests that, without the extended change kinds, the engine returns exactly the changes of compare_schemas.
+    """
+    schema_version1 = parse_schema(SCHEMA_V1)
+    schema_version2 = parse_schema(SCHEMA_V2 + "type Review { text: String }")
+
+    changes = diff_schemas(schema_version1, schema_version2, extended=False)
+
+    assert changes == compare_schemas(schema_version1, schema_version2)
+    assert changes[-1]["change"] == "Added new type 'Review'"
+
+
+def test_graphql_diff_report_single_pass_technique():
+    """
+    Tests that the single-pass technique reports the default value change of the README example.
+    """
+    schema_v1 = "type Query { ratings(minScore: Int = 1, maxScore: Int = 6): [Int!]! }"
+    schema_v2 = "type Query { ratings(minScore: Int = 1, maxScore: Int = 5): [Int!]! }"
+
+    report = graphql_diff_report(schema_v1, schema_v2, 'single-pass', 'algorithmic')
+
+    assert report["release_notes"]["summary"] == (
+        "This release introduces 0 breaking change(s) and 1 non-breaking change(s): "
+        "Non-breaking changes: Default value of argument 'maxScore' changed from '6' to '5' in Query 'ratings'."
+    )
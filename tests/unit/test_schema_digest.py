@@ -0,0 +1,84 @@
+"""
+
+Unit-test the canonical schema digest of schema_digest.
+
+"""
+import pytest
+from graphql import build_schema
+
+# import the tested module
+import schema_diff_report
+import schema_digest as schema_digest_module
+from schema_digest import schema_digest
+from schema_diff_report import graphql_diff_report, parse_schema
+
+SCHEMA = """
+directive @key(fields: String!) on OBJECT
+interface Node { id: ID! }
+type Book implements Node @key(fields: "id") { id: ID! title(format: String = "short", lang: String): String }
+enum Genre { FICTION POETRY }
+union Result = Book | Author
+type Author { name: String }
+input BookFilter { genre: Genre = FICTION title: String }
+type Query { books(filter: BookFilter, first: Int = 10): [Result] }
+"""
+
+REORDERED_SCHEMA = """
+type Query { books(first: Int = 10, filter: BookFilter): [Result] }
+input BookFilter { title: String genre: Genre = FICTION }
+type Author { name: String }
+union Result = Author | Book
+enum Genre { POETRY FICTION }
+\"\"\"A book.\"\"\"
+type Book implements Node @key(fields: "id") { title(lang: String, format: String = "short"): String id: ID! }
+interface Node { id: ID! }
+directive @key(fields: String!) on OBJECT
+"""
+
+
+def test_digest_ignores_declaration_order(monkeypatch):
+    """
+    Tests that reordered schemas have the same digest, and their diff is skipped.
+    """
+    assert schema_digest(build_schema(SCHEMA)) == schema_digest(build_schema(REORDERED_SCHEMA))
+
+    def compare_schemas(schema_version1, schema_version2):
+        raise AssertionError("the schemas should not be compared")
+
+    monkeypatch.setattr(schema_diff_report, "compare_schemas", compare_schemas)
+    report = graphql_diff_report(SCHEMA, REORDERED_SCHEMA, 'algorithmic', 'algorithmic')
+    assert report["changes"] == []
+
+
+@pytest.mark.parametrize("old, new", [
+    ("title(format: String = \"short\", lang: String): String", "title(format: String = \"long\", lang: String): String"),
+    ("title(format: String = \"short\", lang: String): String", "title(format: String = \"short\"): String"),
+    ("title(format: String = \"short\", lang: String): String",
+     "title(format: String = \"short\", lang: String): String @deprecated"),
+    ("enum Genre { FICTION POETRY }", "enum Genre { FICTION }"),
+    ("union Result = Book | Author", "union Result = Book"),
+    ("genre: Genre = FICTION", "genre: Genre = POETRY"),
+    ("on OBJECT", "on OBJECT | INTERFACE"),
+    ("type Book implements Node", "type Book implements Node & Entity"),
+])
+def test_digest_detects_structural_changes(old, new):
+    """
+    Tests that any change the diff engines report changes the digest.
+    """
+    changed_schema = SCHEMA.replace(old, new) + "interface Entity { id: ID! }" * ("Entity" in new)
+
+    assert schema_digest(build_schema(SCHEMA)) != schema_digest(build_schema(changed_schema))
+
+
+def test_digest_is_computed_once_at_parse_time(monkeypatch):
+    """
+    Tests that the digest of a parsed schema is cached, rather than computed again by the diff.
+    """
+    schema = parse_schema(SCHEMA)
+    digest = schema_digest(schema)
+
+    def type_signature(graphql_type):
+        raise AssertionError("the digest should not be computed again")
+
+    monkeypatch.setattr(schema_digest_module, "type_signature", type_signature)
+    assert schema_digest(schema) == digest
@@ -0,0 +1,67 @@
+"""
+
+Unit-test the differential fuzzing of the diff engines against compare_schemas.
+
+"""
+import random
+
+import pytest
+from graphql import build_schema
+
+# import the tested module
+from schema_changes import compare_schemas
+from schema_fuzz import (ENGINES, apply_mutations, differential_fuzz, generate_case, generate_schema,
+                         print_schema_model, throughput)
+
+
+def test_generated_cases_are_seeded_and_valid():
+    """
+    Tests that a seed always generates the same case, and that the generated and mutated
+    schemas are valid.
+    """
+    assert generate_case(7) == generate_case(7)
+    assert print_schema_model(generate_schema(random.Random(1))) != print_schema_model(generate_schema(random.Random(2)))
+
+    operations = set()
+    for seed in range(200):
+        model, mutations = generate_case(seed, n_types=10, n_mutations=6)
+        operations.update(mutation[0] for mutation in mutations)
+        build_schema(print_schema_model(model))
+        build_schema(print_schema_model(apply_mutations(model, mutations)))
+
+    assert {"add_type", "remove_type", "retype_type", "add_field", "remove_field", "retype_field",
+            "add_argument", "remove_argument", "retype_argument", "change_default",
+            "add_enum_value", "remove_enum_value"} <= operations
+
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_engines_agree_with_reference(engine):
+    """
+    Tests that the optimized engines report the same changes as compare_schemas.
+    """
+    result = differential_fuzz(ENGINES[engine], range(150))
+
+    assert result == {"cases": 150, "divergences": []}
+
+
+def test_divergence_is_shrunk_and_throughput():
+    """
+    Tests that a buggy engine is caught, and its diverging case shrunk to the change it misses.
+    """
+    def buggy_engine(schema_version1, schema_version2):
+        return [change for change in compare_schemas(schema_version1, schema_version2)
+                if not change["change"].startswith("Value ")]
+
+    result = differential_fuzz(buggy_engine, range(300), n_types=10, max_divergences=1)
+
+    assert result["cases"] < 300
+    divergence = result["divergences"][0]
+    assert [mutation[0] for mutation in divergence["mutations"]] in (["add_enum_value"], ["remove_enum_value"])
+    assert len(divergence["reference"]) == 1 and divergence["engine"] == []
+    assert divergence["schema_v1"].count("\n") <= 1
+    assert divergence == {"seed": divergence["seed"], **differential_fuzz(
+        buggy_engine, [divergence["seed"]], n_types=10)["divergences"][0]}
+
+    results = throughput({"single-pass": ENGINES["single-pass"]}, range(5), n_types=10, repeat=1)
+    assert set(results) == {"reference", "single-pass"}
+    assert results["reference"]["speedup"] == 1.0 and results["single-pass"]["cases_per_second"] > 0
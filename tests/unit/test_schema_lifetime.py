@@ -0,0 +1,78 @@
+"""
+
+Unit-test the member lifetime table of schema_lifetime, with and without NumPy.
+
+"""
+import pytest
+
+# import the tested module
+import schema_lifetime
+from schema_lifetime import SchemaLifetime
+
+VERSIONS = [
+    ("v1", "type Book { id: ID title: String isbn: String } enum Genre { FICTION } type Query { book: Book }"),
+    ("v2", "type Book { id: ID title: String @deprecated isbn: Int year: Int } "
+           "enum Genre { FICTION POETRY } type Query { book: Book }"),
+    ("v3", "type Book { id: ID title: String @deprecated isbn: Int } "
+           "enum Genre { FICTION @deprecated POETRY } type Query { book(id: ID): Book }"),
+    ("v4", "type Book { id: ID title: String @deprecated isbn: Int } "
+           "enum Genre { FICTION @deprecated } type Query { book(id: ID): Book }"),
+]
+
+
+@pytest.fixture(params=["numpy", "bitsets"])
+def lifetime(request, monkeypatch):
+    """
+    The lifetime table of VERSIONS, queried with NumPy or with the bitsets alone.
+    """
+    if request.param == "bitsets":
+        monkeypatch.setattr(schema_lifetime, "np", None)
+    elif schema_lifetime.np is None:
+        pytest.skip("NumPy is not installed")
+
+    return SchemaLifetime.from_schema_strs(VERSIONS)
+
+
+def test_events(lifetime):
+    """
+    Tests the members added, removed and changed in each version.
+    """
+    assert lifetime.events("removed") == [
+        {"member": "Book.year", "kind": "field", "version": "v3"},
+        {"member": "Genre.POETRY", "kind": "enum_value", "version": "v4"},
+    ]
+    assert lifetime.events("removed", last=1) == [{"member": "Genre.POETRY", "kind": "enum_value", "version": "v4"}]
+    assert lifetime.events("type_changed") == [{"member": "Book.isbn", "kind": "field", "version": "v2"}]
+    assert lifetime.events("added", kind="argument") == [
+        {"member": "Query.book(id)", "kind": "argument", "version": "v3"}
+    ]
+    assert [event["member"] for event in lifetime.events("added", last=3)] == [
+        "Book.year", "Genre.POETRY", "Query.book(id)"
+    ]
+
+
+def test_oldest_deprecated(lifetime):
+    """
+    Tests that the deprecated members still present are listed, the oldest first.
+    """
+    assert lifetime.oldest_deprecated() == [
+        {"member": "Book.title", "kind": "field", "since": "v1", "deprecated_since": "v2"},
+        {"member": "Genre.FICTION", "kind": "enum_value", "since": "v1", "deprecated_since": "v3"},
+    ]
+    assert lifetime.oldest_deprecated(limit=1, kind="enum_value") == [
+        {"member": "Genre.FICTION", "kind": "enum_value", "since": "v1", "deprecated_since": "v3"}
+    ]
+
+
+def test_member_lifetime(lifetime):
+    """
+    Tests the history of a single member, and that unparsable versions are rejected.
+    """
+    assert lifetime.lifetime("Book.year") == {
+        "member": "Book.year", "kind": "field", "present": False,
+        "added": ["v2"], "removed": ["v3"], "type_changed": [], "deprecated": []
+    }
+    with pytest.raises(KeyError):
+        lifetime.lifetime("Book.author")
+    with pytest.raises(ValueError):
+        SchemaLifetime.from_schema_strs([("v1", "type Query {")])
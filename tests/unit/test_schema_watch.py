@@ -0,0 +1,74 @@
+"""
+
+Unit-test the watch mode in schema_watch.
+
+"""
+import os
+
+# import the tested module
+import schema_watch
+from schema_watch import SchemaWatcher
+
+SCHEMA_V1 = """
+type Query {
+    hello: String
+}
+"""
+
+
+def write_schema(path, schema_str, mtime_ns):
+    """
+    Write a schema file with a fixed modification time, so tests do not depend on the clock.
+    """
+    path.write_text(schema_str)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_watcher_initial_report(tmp_path):
+    """
+    Tests that the first poll diffs the watched file without waiting for the debounce period.
+    """
+    write_schema(tmp_path / "v1.graphql", SCHEMA_V1, 1)
+    write_schema(tmp_path / "v2.graphql", "type Query { hello: String goodbye: String }", 1)
+    watcher = SchemaWatcher(str(tmp_path / "v1.graphql"), [str(tmp_path / "v2.graphql")])
+
+    report = watcher.poll(now=0.0)
+
+    assert report["changes"][0]["change"] == "Added new field 'goodbye'"
+    assert watcher.poll(now=10.0) is None
+
+
+def test_watcher_debounces_changes(tmp_path):
+    """
+    Tests that a change is only diffed once the file has been stable for the debounce period.
+    """
+    write_schema(tmp_path / "v1.graphql", SCHEMA_V1, 1)
+    write_schema(tmp_path / "v2.graphql", SCHEMA_V1, 1)
+    watcher = SchemaWatcher(str(tmp_path / "v1.graphql"), [str(tmp_path / "v2.graphql")], debounce_seconds=1.0)
+    assert watcher.poll(now=0.0)["changes"] == []
+
+    write_schema(tmp_path / "v2.graphql", "type Query { hello: Int }", 2)
+
+    assert watcher.poll(now=5.0) is None
+    assert watcher.poll(now=5.5) is None
+    assert watcher.poll(now=6.0)["changes"][0]["change"] == "Field type changed from 'String' to 'Int'"
+
+
+def test_watcher_skips_unchanged_content(tmp_path, monkeypatch):
+    """
+    Tests that touching a file without changing its content does not re-parse it.
+    """
+    write_schema(tmp_path / "v1.graphql", SCHEMA_V1, 1)
+    write_schema(tmp_path / "v2.graphql", "type Query { hello: Int }", 1)
+    watcher = SchemaWatcher(str(tmp_path / "v1.graphql"), [str(tmp_path / "v2.graphql")], debounce_seconds=0.0)
+    watcher.poll(now=0.0)
+
+    parsed = []
+    monkeypatch.setattr(schema_watch, "parse_schema", lambda schema_str: parsed.append(schema_str))
+    write_schema(tmp_path / "v2.graphql", "type Query {\n  hello: Int\n}", 2)
+
+    files_parsed = watcher.cache.counters["files_parsed"]
+    assert watcher.poll(now=1.0) is None
+    assert watcher.poll(now=2.0) is None
+    assert parsed == []
+    assert watcher.cache.counters["files_parsed"] == files_parsed
@@ -0,0 +1,121 @@
+"""
+
+Unit-test the speculative algorithmic and GPT3.5 diff, with local stubs of the LLM.
+
+"""
+import json
+import threading
+import time
+
+# import the tested module
+import release_summary
+import speculative_diff
+from report_serialization import server_sent_event
+from request_cancellation import RequestCancelledError, check_cancelled
+
+SCHEMA_V1 = "type Query { book: Book } type Book { id: ID! title: String }"
+SCHEMA_V2 = "type Query { book: Book } type Book { id: ID! }"
+
+LLM_CHANGES = [
+    {"type": "Book", "field": "title", "change": "Field 'title' was removed", "breaking": True},
+    {"type": "Book", "field": None, "change": "Type 'Book' changed", "breaking": False},
+]
+
+
+def collect_events():
+    events = []
+    algorithmic_emitted = threading.Event()
+
+    def emit(event, data):
+        events.append((event, data))
+        if event == "algorithmic":
+            algorithmic_emitted.set()
+
+    return events, emit, algorithmic_emitted
+
+
+def test_algorithmic_report_emitted_while_llm_runs(monkeypatch):
+    """
+    Tests that the LLM starts before the algorithmic diff, which is emitted first,
+    followed by each streamed LLM change and the LLM report.
+    """
+    events, emit, algorithmic_emitted = collect_events()
+
+    def slow_llm(schema_v1, schema_v2, on_change=None):
+        events.append(("llm_started", None))
+        # the LLM answers only after the algorithmic report was sent
+        assert algorithmic_emitted.wait(timeout=5)
+        for change in LLM_CHANGES:
+            on_change(change)
+        return LLM_CHANGES
+
+    monkeypatch.setattr(speculative_diff, "analyze_schema_changes", slow_llm)
+    speculative_diff.speculative_diff(SCHEMA_V1, SCHEMA_V2, 'GPT3.5', 'algorithmic', False, False, emit)
+
+    assert ("llm_started", None) in events
+    events.remove(("llm_started", None))
+    assert [event for event, _ in events] == ["algorithmic", "llm_change", "llm_change", "llm"]
+    assert events[0][1]["changes"][0]["field"] == "title"
+    assert events[-1][1]["changes"] == LLM_CHANGES
+    assert events[-1][1]["release_notes"]["summary"].startswith("This release introduces 1 breaking change(s)")
+
+
+def test_llm_stopped_without_changes(monkeypatch):
+    """
+    Tests that identical schemas cancel the LLM, and that no LLM runs without a GPT3.5 technique.
+    """
+    events, emit, _ = collect_events()
+    stopped = []
+
+    def llm_until_cancelled(schema_v1, schema_v2, on_change=None):
+        try:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        except RequestCancelledError as e:
+            stopped.append(str(e))
+            raise
+
+    monkeypatch.setattr(speculative_diff, "analyze_schema_changes", llm_until_cancelled)
+    speculative_diff.speculative_diff(SCHEMA_V1, SCHEMA_V1, 'GPT3.5', 'GPT3.5', False, False, emit)
+
+    assert [event for event, _ in events] == ["algorithmic"]
+    assert events[0][1]["release_notes"]["summary"] == 'No differences between the schemas.'
+    assert stopped == ["No changes for the LLM"]
+
+    events.clear()
+    speculative_diff.speculative_diff(SCHEMA_V1, SCHEMA_V2, 'single-pass', 'algorithmic', False, True, emit)
+    assert [event for event, _ in events] == ["algorithmic"]
+    assert "affected_root_fields" in events[0][1]["changes"][0]
+
+
+def test_algorithmic_changes_summarized_by_llm(monkeypatch):
+    """
+    Tests that without GPT3.5 identification, the algorithmic changes are summarized by the LLM,
+    and that the events are encoded as server-sent events.
+    """
+    class StubModel:
+        def run(self, inputs: dict) -> str:
+            return "The title of books was removed"
+
+    events, emit, _ = collect_events()
+    monkeypatch.setattr(release_summary, "initialize_langchain", lambda api_key, request_timeout=None: StubModel())
+
+    speculative_diff.speculative_diff(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'GPT3.5', False, False, emit)
+
+    assert [event for event, _ in events] == ["algorithmic", "llm"]
+    assert events[0][1]["changes"] == events[1][1]["changes"]
+    assert "The title of books was removed" in events[1][1]["release_notes"]["summary"]
+
+    # the single-pass changes, e.g. a changed default, are the ones summarized
+    events.clear()
+    schema_v2 = "type Query { book(id: ID = 2): Book } type Book { id: ID! }"
+    speculative_diff.speculative_diff("type Query { book(id: ID = 1): Book } type Book { id: ID! }", schema_v2,
+                                      'single-pass', 'GPT3.5', False, False, emit)
+    assert [event for event, _ in events] == ["algorithmic", "llm"]
+    assert events[0][1]["changes"] and events[1][1]["changes"] == events[0][1]["changes"]
+
+    encoded = server_sent_event(*events[1]).decode("utf-8")
+    name_line, data_line, *rest = encoded.split("\n")
+    assert name_line == "event: llm" and rest == ["", ""]
+    assert json.loads(data_line[len("data: "):]) == events[1][1]
@@ -0,0 +1,74 @@
+"""
+
+Unit-test the concurrent diff of multiple subgraphs in subgraph_diff.
+
+"""
+# import the tested module
+from subgraph_diff import diff_subgraphs
+
+SUBGRAPHS = [
+    ("books",
+     """
+     type Query {
+         hello: String
+     }
+     """,
+     """
+     type Query {
+         hello: String
+         goodbye: String
+     }
+     """),
+    ("weather",
+     """
+     type Query {
+         hello: String
+     }
+
+     type Weather
+     """,
+     """
+     type Query {
+         hello: String
+     }
+     """),
+]
+
+
+def test_diff_subgraphs_per_subgraph_changes():
+    """
+    Tests that each subgraph is reported with its own changes and timings, in input order.
+    """
+    result = diff_subgraphs(SUBGRAPHS, 'algorithmic', max_workers=2, use_processes=False)
+
+    assert [subgraph["subgraph"] for subgraph in result["subgraphs"]] == ["books", "weather"]
+    assert result["subgraphs"][0]["changes"][0]["change"] == "Added new field 'goodbye'"
+    assert result["subgraphs"][1]["changes"][0]["change"] == "Type 'Weather' was removed"
+    for subgraph in result["subgraphs"]:
+        assert set(subgraph["timings"]) == {"parse_seconds", "compare_seconds", "total_seconds"}
+
+
+def test_diff_subgraphs_aggregated_summary():
+    """
+    Tests that the release summary aggregates the changes of all subgraphs.
+    """
+    result = diff_subgraphs(SUBGRAPHS, 'algorithmic', max_workers=2)
+
+    assert result["release_notes"]["summary"] == (
+        "This release introduces 1 breaking change(s) and 1 non-breaking change(s): "
+        "Breaking changes: Type 'Weather' was removed. "
+        "Non-breaking changes: Added new field 'goodbye' in Query."
+    )
+
+
+def test_diff_subgraphs_parsing_failure():
+    """
+    Tests that a subgraph that cannot be parsed does not break the aggregated report.
+    """
+    subgraphs = SUBGRAPHS + [("broken", "type Query { hello: String }", "Invalid schema")]
+
+    result = diff_subgraphs(subgraphs, 'algorithmic', use_processes=False)
+
+    assert result["subgraphs"][2]["parsing_failed"]["parsing_failed"][0] == \
+           "Version 2 of the GraphQL schema could not be parsed"
+    assert result["release_notes"]["summary"].startswith("This release introduces 1 breaking change(s)")
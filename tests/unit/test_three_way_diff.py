@@ -0,0 +1,94 @@
+"""
+
+Unit-test the three-way diff of three_way_diff.
+
+"""
+# import the tested module
+import schema_diff_report
+from three_way_diff import three_way_diff_report
+
+BASE = """
+type Book { id: ID title: String year: Int author: String }
+enum Genre { FICTION POETRY }
+type Query { book(id: ID): Book genre: Genre }
+"""
+
+
+def branch(*replacements: tuple[str, str]) -> str:
+    schema = BASE
+    for old, new in replacements:
+        schema = schema.replace(old, new)
+    return schema
+
+
+def test_branch_changes_and_conflicts():
+    """
+    Tests that each branch gets its changes, and that edits of the same field or type conflict.
+    """
+    report = three_way_diff_report(
+        BASE,
+        branch(("title: String ", ""), ("author: String", "author: [String]"), ("Genre { FICTION", "Genre { DRAMA")),
+        branch(("title: String", "title: String!"), ("author: String", "author: [String]"), ("POETRY", "")),
+    )
+
+    assert [(change.get("field"), change["change"]) for change in report["branch_a"]["changes"]] == [
+        ("title", "Field 'title' was removed"), ("author", "Field type changed from 'String' to 'String!'"),
+        (None, "Value 'FICTION' was removed"), (None, "Added new value 'DRAMA'")
+    ]
+    assert [(change.get("field"), change["change"]) for change in report["branch_b"]["changes"]] == [
+        ("title", "Field type changed from 'String' to 'String!'"),
+        ("author", "Field type changed from 'String' to 'String!'"),
+        (None, "Value 'POETRY' was removed")
+    ]
+    # the same author change in both branches converges, the enum values changed are different
+    assert [(conflict["type"], conflict["member"]) for conflict in report["conflicts"]] == [("Book", "title")]
+    assert [change["change"] for change in report["conflicts"][0]["branch_b"]] == [
+        "Field type changed from 'String' to 'String!'"
+    ]
+
+
+def test_type_removal_conflicts_with_member_changes():
+    """
+    Tests that removing a type conflicts with any change of it in the other branch, and that
+    changes of arguments and enum values conflict at their level.
+    """
+    report = three_way_diff_report(
+        BASE,
+        branch(("type Book { id: ID title: String year: Int author: String }", "type Book { id: ID }"),
+               ("POETRY", "POETRY @deprecated"), ("book(id: ID)", "book(id: ID!)")),
+        branch(("type Book { id: ID title: String year: Int author: String }", "type Book { id: ID }"),
+               ("FICTION POETRY", "FICTION POETRY DRAMA"), ("genre: Genre", "genre: Genre @deprecated")),
+    )
+    # the same members removed from Book in both branches, and different members changed elsewhere
+    assert report["conflicts"] == []
+
+    report = three_way_diff_report(
+        BASE,
+        branch(("type Book { id: ID title: String year: Int author: String }", ""), ("book(id: ID): Book ", ""),
+               ("POETRY", "POETRY @deprecated")),
+        branch(("year: Int", "year: Int @deprecated"), ("FICTION POETRY", "FICTION")),
+    )
+    conflicts = {(conflict["type"], conflict["member"]): conflict for conflict in report["conflicts"]}
+    assert set(conflicts) == {("Book", None), ("Genre", "POETRY")}
+    assert [change["change"] for change in conflicts[("Book", None)]["branch_a"]] == ["Type 'Book' was removed"]
+
+
+def test_schemas_are_parsed_once(monkeypatch):
+    """
+    Tests that the base is parsed once for both branches, and identical schemas only once.
+    """
+    parsed = []
+    parse_schema = schema_diff_report.parse_schema
+
+    def counting_parse_schema(schema_str: str):
+        parsed.append(schema_str)
+        return parse_schema(schema_str)
+
+    monkeypatch.setattr("three_way_diff.parse_schema", counting_parse_schema)
+    branch_a = branch(("year: Int", ""))
+
+    report = three_way_diff_report(BASE, branch_a, branch_a)
+
+    assert len(parsed) == 2
+    assert report["branch_a"] == report["branch_b"]
+    assert report["conflicts"] == []
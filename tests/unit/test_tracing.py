@@ -0,0 +1,97 @@
+"""
+
+Unit-test the tracing spans of tracing, and their OTLP JSON export.
+
+"""
+import json
+
+import pytest
+
+# import the tested module
+import release_summary
+import tracing
+from diff_stages import DIFF_STAGES
+from llm_resilience import ResilientLLM
+from schema_diff_report import graphql_diff_report
+
+SCHEMA_V1 = "type Book { id: ID title: String } enum Genre { A B } type Query { book: Book }"
+SCHEMA_V2 = "type Book { id: ID } enum Genre { A C } type Query { book: Book }"
+
+
+@pytest.fixture
+def exported_spans(tmp_path, monkeypatch):
+    """
+    Enable tracing to a temporary file, returning a function reading its spans by trace.
+    """
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_PATH", str(path))
+
+    def read_traces() -> list[list[dict]]:
+        return [[span for resource_spans in json.loads(line)["resourceSpans"]
+                 for scope_spans in resource_spans["scopeSpans"] for span in scope_spans["spans"]]
+                for line in path.read_text().splitlines()]
+
+    return read_traces
+
+
+def test_diff_report_stages_are_traced(exported_spans):
+    """
+    Tests that a diff report exports one trace, whose stages are children of the report span.
+    """
+    graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'algorithmic')
+
+    [spans] = exported_spans()
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["graphql_diff_report"]
+
+    assert "parentSpanId" not in root
+    assert {span["traceId"] for span in spans} == {root["traceId"]}
+    assert {"key": "diff.identify_changes_technique", "value": {"stringValue": "algorithmic"}} in root["attributes"]
+    assert by_name["parsed_schemas_diff_report"]["parentSpanId"] == root["spanId"]
+    for stage in DIFF_STAGES:
+        assert stage in by_name
+    assert by_name["identify_changes"]["parentSpanId"] == by_name["parsed_schemas_diff_report"]["spanId"]
+
+
+@pytest.mark.parametrize("identify_changes_technique", ['algorithmic', 'single-pass'])
+def test_type_comparisons_are_sampled(exported_spans, monkeypatch, identify_changes_technique):
+    """
+    Tests that the type comparison spans are dropped when not sampled, unless they are slow.
+    """
+    monkeypatch.setattr(tracing, "TRACE_TYPE_SAMPLE_RATE", 0.0)
+    graphql_diff_report(SCHEMA_V1, SCHEMA_V2, identify_changes_technique, 'algorithmic')
+    monkeypatch.setattr(tracing, "TRACE_SLOW_TYPE_SECONDS", 0.0)
+    graphql_diff_report(SCHEMA_V1, SCHEMA_V2, identify_changes_technique, 'algorithmic')
+
+    dropped, kept = exported_spans()
+    assert "compare_type_fields" not in {span["name"] for span in dropped}
+    type_spans = {next(attribute["value"]["stringValue"] for attribute in span["attributes"]
+                       if attribute["key"] == "graphql.type.name"): span
+                  for span in kept if span["name"] == "compare_type_fields"}
+    assert set(type_spans) == {"Book", "Genre", "Query"}
+    assert {"key": "graphql.type.fields", "value": {"intValue": "2"}} in type_spans["Book"]["attributes"]
+    assert {"key": "graphql.type.enum_values", "value": {"intValue": "2"}} in type_spans["Genre"]["attributes"]
+
+
+def test_llm_calls_are_traced(exported_spans, monkeypatch):
+    """
+    Tests that each LLM call gets a client span, with an error status when it fails,
+    the summary falling back to the algorithmic one.
+    """
+    class FailingModel:
+        def run(self, inputs: dict) -> str:
+            raise TimeoutError("model timed out")
+
+    monkeypatch.setattr(release_summary, "initialize_langchain", lambda api_key, request_timeout=None: FailingModel())
+    monkeypatch.setattr(release_summary, "summarization_calls", ResilientLLM(max_retries=0))
+
+    report = graphql_diff_report(SCHEMA_V1, SCHEMA_V2, 'algorithmic', 'GPT3.5')
+    assert report["release_notes"]["fallback"]["technique"] == "algorithmic"
+
+    [spans] = exported_spans()
+    [llm_span] = [span for span in spans if span["name"] == "llm.summarize"]
+    stage_span = next(span for span in spans if span["name"] == "generate_release_summary")
+    assert llm_span["kind"] == tracing.SPAN_KIND_CLIENT
+    assert llm_span["parentSpanId"] == stage_span["spanId"]
+    assert llm_span["status"] == {"code": tracing.STATUS_CODE_ERROR,
+                                  "message": "LLMUnavailableError: The LLM call failed after 1 attempt(s): model timed out"}